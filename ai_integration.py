@@ -1,45 +1,84 @@
 ﻿import os
-import json
 import re
-from openai import OpenAI
-from dotenv import load_dotenv
+import threading
+import codec
+from config import LLM_REQUEST_TIMEOUT_S  # config loads .env
+from strategies import stay_recommendations
+from idempotency import payload_hash
 
-# Load environment variables from .env
-load_dotenv()
+MODEL = "gpt-5-nano"
+# Part of every cache key (llm_cache.py): bump it when the prompt changes so old answers are not reused
+PROMPT_VERSION = 1
 
-# Expect CHATGPT_API_KEY or fallback to OPENAI_API_KEY for flexibility
-OPENAI_API_KEY = os.getenv("CHATGPT_API_KEY") or os.getenv("OPENAI_API_KEY")
-if not OPENAI_API_KEY:
-    raise ValueError("OpenAI API key not found in CHATGPT_API_KEY or OPENAI_API_KEY environment variables.")
+_client = None
+_client_lock = threading.Lock()
 
-client = OpenAI(api_key=OPENAI_API_KEY)
-
-def get_chatgpt_analysis(payload):
+def get_client():
+    """
+    The OpenAI client, created on first use. The openai package (and httpx
+    under it) is only imported here, so processes and requests that never
+    reach ChatGPT (/healthcheck, /dashboard, local strategies, replay) don't
+    pay for it.
+    Raises ValueError if no key is set in CHATGPT_API_KEY or OPENAI_API_KEY.
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                # Expect CHATGPT_API_KEY or fallback to OPENAI_API_KEY for flexibility
+                api_key = os.getenv("CHATGPT_API_KEY") or os.getenv("OPENAI_API_KEY")
+                if not api_key:
+                    raise ValueError("OpenAI API key not found in CHATGPT_API_KEY or OPENAI_API_KEY environment variables.")
+                from openai import OpenAI
+                _client = OpenAI(api_key=api_key)
+    return _client
+
+def analysis_key(tick):
+    """
+    Canonical hash of everything a tick's prompt is built from: positions,
+    market summary and market history (order and key spellings do not
+    matter), plus the model and prompt version.
+    """
+    positions = sorted(zip(map(str, tick.tickers), tick.quantity, tick.purchase_price))
+    market = sorted((str(ticker), price, category or "")
+                    for ticker, price, category in zip(tick.market_tickers, tick.current_price, tick.category))
+    history = sorted((ticker, day or "", price)
+                     for ticker, price, day in zip(tick.history_tickers, tick.history_price, tick.history_day))
+    return payload_hash([MODEL, PROMPT_VERSION, positions, market, history])
+
+def get_chatgpt_analysis(tick):
     """
-    Sends trading tick payload to GPT-5 Nano for structured trade recommendations.
+    Sends a normalized trading tick (validators.Tick) to GPT-5 Nano for
+    structured trade recommendations.
     Returns list of trade decisions:
     [ {"action": "BUY|SELL|STAY", "ticker": "SYMBOL", "quantity": X}, ... ]
     """
-    positions = payload.get("Positions", payload.get("positions", []))
-    market_summary = (
-        payload.get("Market_Summary") or
-        payload.get("MarketSummary") or
-        payload.get("market_summary") or
-        payload.get("marketSummary") or []
-    )
-    market_history = payload.get("market_history", [])
+    positions = [
+        {"ticker": ticker, "quantity": quantity, "purchase_price": purchase_price}
+        for ticker, quantity, purchase_price in zip(tick.tickers, tick.quantity, tick.purchase_price)
+    ]
+    market_summary = [
+        {"ticker": ticker, "current_price": price, "category": category} if category is not None
+        else {"ticker": ticker, "current_price": price}
+        for ticker, price, category in zip(tick.market_tickers, tick.current_price, tick.category)
+    ]
+    market_history = [
+        {"ticker": ticker, "price": price, "day": day} if day is not None
+        else {"ticker": ticker, "price": price}
+        for ticker, price, day in zip(tick.history_tickers, tick.history_price, tick.history_day)
+    ]
 
     prompt = f"""
 You are a professional trading advisor AI. Analyze the portfolio positions, current market prices, and recent market history.
 
 CURRENT POSITIONS:
-{json.dumps(positions, indent=2)}
+{codec.dumps(positions)}
 
 MARKET SUMMARY:
-{json.dumps(market_summary, indent=2)}
+{codec.dumps(market_summary)}
 
 MARKET HISTORY (last 2 days):
-{json.dumps(market_history, indent=2)}
+{codec.dumps(market_history)}
 
 Provide your trading recommendations ONLY in the following JSON format (no other text):
 {{
@@ -52,14 +91,16 @@ Provide your trading recommendations ONLY in the following JSON format (no other
 }}
 """
 
+    client = get_client()
     try:
         response = client.chat.completions.create(
-            model="gpt-5-nano",
+            model=MODEL,
             messages=[
                 {"role": "system", "content": "You are a professional trading advisor. Respond ONLY with valid JSON in the specified format. No additional text."},
                 {"role": "user", "content": prompt}
             ],
             temperature=1,
+            timeout=LLM_REQUEST_TIMEOUT_S,
         )
     except Exception as e:
         print(f"[ERROR] OpenAI API call failed: {e}")
@@ -69,14 +110,14 @@ Provide your trading recommendations ONLY in the following JSON format (no other
     print(f"[DEBUG] GPT-5-Nano response: {response_text}")
 
     try:
-        result = json.loads(response_text)
-    except json.JSONDecodeError:
+        result = codec.loads(response_text)
+    except codec.JSONDecodeError:
         # Extract JSON if response contains extra text
         json_match = re.search(r'{.*"recommendations".*}', response_text, re.DOTALL)
         if json_match:
             try:
-                result = json.loads(json_match.group())
-            except json.JSONDecodeError as e:
+                result = codec.loads(json_match.group())
+            except codec.JSONDecodeError as e:
                 print(f"[ERROR] Failed to parse extracted JSON: {e}")
                 raise ValueError(f"Could not parse response as valid JSON: {response_text}")
         else:
@@ -91,10 +132,7 @@ Provide your trading recommendations ONLY in the following JSON format (no other
 
     if not recommendations:
         # If no recommendations, return stay for all positions
-        recommendations = [
-            {"action": "STAY", "ticker": pos.get("ticker"), "quantity": 0}
-            for pos in positions
-        ]
+        recommendations = stay_recommendations(tick)
         print("[DEBUG] No recommendations from GPT; returning STAY for all positions.")
 
     return recommendations
@@ -112,5 +150,6 @@ if __name__ == "__main__":
         ],
         "market_history": []
     }
-    ##trades = get_chatgpt_analysis(sample_payload)
+    ##from validators import normalize_tick_payload
+    ##trades = get_chatgpt_analysis(normalize_tick_payload(sample_payload)[0])
     ##print("Trade Decisions:", trades)
@@ -1,10 +1,28 @@
-﻿from flask import Flask, request, jsonify, render_template
-from config import API_KEY
-from validators import validate_tick_payload
+﻿from flask import Flask, Response, request, jsonify, render_template, stream_with_context
+from flask.json.provider import DefaultJSONProvider
+import codec
+from config import API_KEY, BATCH_TICK_MAX_ITEMS, STREAM_MAX_LINE_BYTES
+from validators import normalize_tick_payload, normalize_tick_batch, validate_strategy, validate_trading_log_query
 # UPDATED IMPORT: Changed to the new local analysis function
-from business import analyze_tick_payload, get_positions, get_trading_log, get_chart_growth_data 
+from business import (
+    process_tick, process_tick_batch, process_tick_stream, record_tick, get_positions, get_chart_growth_data, get_trading_log_page,
+    get_trading_log_count, query_trading_log, get_persistence_stats, get_read_cache_stats,
+    submit_tick_async, get_tick_status, get_async_tick_stats, get_idempotency_stats, get_llm_budget_stats,
+    get_llm_cache_stats, get_decision_reuse_stats, get_price_history, get_timeseries_stats
+)
+from tick_jobs import QueueFull, PoolUnavailable, TickInFlight
+
+class CodecJSONProvider(DefaultJSONProvider):
+    """Flask's JSON provider, encoding and decoding through codec (orjson when installed)."""
+    
+    def dumps(self, obj, **kwargs):
+        return codec.dumps(obj, indent=bool(kwargs.get("indent")), sort_keys=self.sort_keys, default=self.default)
+    
+    def loads(self, s, **kwargs):
+        return codec.loads(s)
 
 app = Flask(__name__)
+app.json = CodecJSONProvider(app)
 
 def authenticate():
     """Check if the API key in the request header OR query param is valid."""
@@ -15,6 +33,14 @@ def authenticate():
         return False
     return True
 
+def wants_async():
+    """Async /tick is opt-in: ?mode=async or a 'Prefer: respond-async' header."""
+    return request.args.get("mode") == "async" or "respond-async" in request.headers.get("Prefer", "")
+
+def requested_strategy():
+    """?strategy=<name> picks the decision strategy for this request; None uses the STRATEGY default."""
+    return request.args.get("strategy") or None
+
 @app.route('/healthcheck', methods=['GET'])
 def healthcheck():
     """Health check endpoint."""
@@ -28,29 +54,159 @@ def healthcheck():
 
 @app.route('/tick/<string:tick_id>', methods=['POST'])
 def tick(tick_id):
-    """Endpoint to receive and process trading tick data with a unique ID."""
+    """
+    Endpoint to receive and process trading tick data with a unique ID.
+    An invalid payload gets a 400 whose "message" is the first problem in the
+    original wording and whose "errors" lists every problem with its location,
+    e.g. ["Positions[0] missing required field: ticker", "MarketSummary[2].current_price must be numeric"].
+    """
     if not authenticate():
         return jsonify({"result": "failure", "message": "Unauthorized"}), 401
     
+    strategy = requested_strategy()
+    is_valid, error_message = validate_strategy(strategy)
+    if not is_valid:
+        return jsonify({"result": "failure", "message": error_message}), 400
+    
     try:
         data = request.get_json(force=True)
         print(f"[DEBUG] tick received data for ID {tick_id}:", data)
     except Exception:
         return jsonify({"result": "failure", "message": "Invalid JSON"}), 400
     
-    is_valid, error_message = validate_tick_payload(data)
-    print(f"[DEBUG] is_valid: {is_valid}, error_message: {error_message}")
+    # Validated and converted once; everything downstream works on the normalized tick
+    tick_data, errors = normalize_tick_payload(data)
+    print(f"[DEBUG] is_valid: {tick_data is not None}, errors: {errors}")
+    
+    if tick_data is None:
+        # "message" keeps the first problem for existing clients; "errors" lists all of them
+        return jsonify({"result": "failure", "message": errors.message, "errors": errors}), 400
+    
+    record_tick(tick_id, data)
+    
+    if wants_async():
+        try:
+            job = submit_tick_async(tick_data, tick_id, strategy)
+        except QueueFull as e:
+            return jsonify({"result": "failure", "message": str(e)}), 429, {"Retry-After": "5"}
+        except PoolUnavailable as e:
+            return jsonify({"result": "failure", "message": str(e)}), 503, {"Retry-After": "30"}
+        except TickInFlight as e:
+            return jsonify({"result": "failure", "message": str(e)}), 409
+        except Exception as e:
+            print(f"[ERROR] Processing error: {str(e)}")
+            return jsonify({"result": "failure", "message": f"Processing error: {str(e)}"}), 500
+        
+        return jsonify({
+            "result": "accepted",
+            "tick_id": tick_id,
+            "status": job["status"],
+            "summary": job["summary"],
+            "status_url": f"/tick/{tick_id}/status"
+        }), 202
+    
+    try:
+        result, replayed = process_tick(tick_data, tick_id, strategy)
+        print(f"[DEBUG] /tick response{' (replayed)' if replayed else ''}:", result)
+        return jsonify(result), 200, {"Idempotent-Replayed": "true" if replayed else "false"}
+    except Exception as e:
+        print(f"[ERROR] Processing error: {str(e)}")
+        return jsonify({"result": "failure", "message": f"Processing error: {str(e)}"}), 500
+
+@app.route('/tick/<string:tick_id>/status', methods=['GET'])
+def tick_status(tick_id):
+    """Status of an async tick; includes the decisions once the AI stage is done."""
+    if not authenticate():
+        return jsonify({"result": "failure", "message": "Unauthorized"}), 401
+    
+    job = get_tick_status(tick_id)
+    if job is None:
+        return jsonify({"result": "failure", "message": f"Unknown tick id: {tick_id}"}), 404
     
+    return jsonify({"result": "success", **job}), 200
+
+@app.route('/ticks', methods=['POST'])
+def ticks():
+    """
+    Batch of ticks in one request: a JSON array of {"id", "payload"} items.
+    Returns one result per item, in request order; an invalid item gets its
+    validation errors and does not stop the others.
+    """
+    if not authenticate():
+        return jsonify({"result": "failure", "message": "Unauthorized"}), 401
+    
+    strategy = requested_strategy()
+    is_valid, error_message = validate_strategy(strategy)
     if not is_valid:
         return jsonify({"result": "failure", "message": error_message}), 400
     
     try:
-        result = analyze_tick_payload(data, tick_id)
-        print(f"[DEBUG] /tick response:", result)
-        return jsonify(result), 200
+        data = request.get_json(force=True)
+    except Exception:
+        return jsonify({"result": "failure", "message": "Invalid JSON"}), 400
+    
+    items, error_message = normalize_tick_batch(data, BATCH_TICK_MAX_ITEMS)
+    if items is None:
+        return jsonify({"result": "failure", "message": error_message}), 400
+    
+    valid = []
+    for item, (tick_id, tick_data, errors) in zip(data, items):
+        if not errors:
+            record_tick(tick_id, item["payload"])
+            valid.append((tick_id, tick_data))
+    print(f"[DEBUG] /ticks received {len(items)} ticks, {len(valid)} valid")
+    try:
+        processed = iter(process_tick_batch(valid, strategy))
     except Exception as e:
         print(f"[ERROR] Processing error: {str(e)}")
         return jsonify({"result": "failure", "message": f"Processing error: {str(e)}"}), 500
+    
+    results = [
+        next(processed) if not errors
+        else {"id": tick_id, "result": "failure", "message": errors.message, "errors": errors}
+        for tick_id, tick_data, errors in items
+    ]
+    return jsonify({"result": "success", "results": results}), 200
+
+def read_lines(stream, max_bytes=STREAM_MAX_LINE_BYTES):
+    """
+    Lines of a request body as they arrive. A line longer than max_bytes is
+    not buffered: it is replaced by a marker that fails as invalid JSON and
+    the rest of it is skipped.
+    """
+    while True:
+        line = stream.readline(max_bytes + 1)
+        if not line:
+            return
+        if len(line) > max_bytes and not line.endswith(b"\n"):
+            while line and not line.endswith(b"\n"):
+                line = stream.readline(max_bytes + 1)
+            yield b"<line too long>"
+            continue
+        yield line
+
+@app.route('/ticks/stream', methods=['POST'])
+def ticks_stream():
+    """
+    Streaming tick ingestion over one connection: the request body is NDJSON
+    with one {"id", "payload"} object per line (send it chunked to keep the
+    connection open), and each result is streamed back as an NDJSON line in
+    input order as soon as it is ready.
+    """
+    if not authenticate():
+        return jsonify({"result": "failure", "message": "Unauthorized"}), 401
+    
+    strategy = requested_strategy()
+    is_valid, error_message = validate_strategy(strategy)
+    if not is_valid:
+        return jsonify({"result": "failure", "message": error_message}), 400
+    
+    @stream_with_context
+    def generate():
+        for result in process_tick_stream(read_lines(request.stream), strategy=strategy):
+            yield codec.dumpb(result) + b"\n"
+    
+    return Response(generate(), mimetype="application/x-ndjson")
 
 # CHART DATA API ENDPOINT (Uses local simulation)
 @app.route('/api/chart_data', methods=['GET'])
@@ -64,14 +220,97 @@ def api_chart_data():
         print(f"[ERROR] Chart data generation failed: {str(e)}")
         return jsonify({"result": "failure", "message": f"Chart data generation failed: {str(e)}"}), 500
 
+# TRADING LOG API ENDPOINT (Paged for the dashboard's incremental loading)
+@app.route('/api/trading_log', methods=['GET'])
+def api_trading_log():
+    """Returns one page of the trading log, newest first, starting before ?cursor=<id>."""
+    try:
+        cursor = request.args.get("cursor", type=int)
+        limit = request.args.get("limit", type=int)
+        if "limit" in request.args and (limit is None or limit < 1):
+            return jsonify({"result": "failure", "message": "limit must be a positive integer"}), 400
+        limit = limit or 50
+        
+        entries, next_cursor = get_trading_log_page(cursor=cursor, limit=min(limit, 500))
+        return jsonify({
+            "result": "success",
+            "data": entries,
+            "next_cursor": next_cursor,
+            "total": get_trading_log_count()
+        })
+    except Exception as e:
+        print(f"[ERROR] Trading log page failed: {str(e)}")
+        return jsonify({"result": "failure", "message": f"Trading log page failed: {str(e)}"}), 500
+
+@app.route('/api/trading_log/query', methods=['GET'])
+def api_trading_log_query():
+    """Filters the trading log by ?ticker=, ?action=, ?start_date= and ?end_date= (newest first, paged)."""
+    ticker = request.args.get("ticker")
+    action = request.args.get("action")
+    ticker = ticker.upper() if ticker else None
+    action = action.upper() if action else None
+    start_date = request.args.get("start_date") or None
+    end_date = request.args.get("end_date") or None
+    
+    is_valid, error_message = validate_trading_log_query(action, start_date, end_date)
+    if not is_valid:
+        return jsonify({"result": "failure", "message": error_message}), 400
+    
+    try:
+        cursor = request.args.get("cursor", type=int)
+        limit = request.args.get("limit", type=int)
+        if "limit" in request.args and (limit is None or limit < 1):
+            return jsonify({"result": "failure", "message": "limit must be a positive integer"}), 400
+        limit = limit or 100
+        
+        entries, next_cursor = query_trading_log(
+            ticker=ticker, action=action, start_date=start_date, end_date=end_date,
+            cursor=cursor, limit=min(limit, 500)
+        )
+        return jsonify({"result": "success", "data": entries, "next_cursor": next_cursor})
+    except Exception as e:
+        print(f"[ERROR] Trading log query failed: {str(e)}")
+        return jsonify({"result": "failure", "message": f"Trading log query failed: {str(e)}"}), 500
+
+@app.route('/api/price_history/<string:ticker>', methods=['GET'])
+def api_price_history(ticker):
+    """Accumulated daily prices of a ticker, oldest first; ?limit= keeps the most recent days."""
+    if not authenticate():
+        return jsonify({"result": "failure", "message": "Unauthorized"}), 401
+    
+    limit = request.args.get("limit", type=int)
+    if "limit" in request.args and (limit is None or limit < 1):
+        return jsonify({"result": "failure", "message": "limit must be a positive integer"}), 400
+    
+    return jsonify({"result": "success", "ticker": ticker, "data": get_price_history(ticker, limit)}), 200
+
+@app.route('/api/metrics', methods=['GET'])
+def api_metrics():
+    """Operational counters: persistence, read cache, async ticks, idempotency, LLM budget/cache/reuse, price history."""
+    if not authenticate():
+        return jsonify({"result": "failure", "message": "Unauthorized"}), 401
+    
+    return jsonify({
+        "result": "success",
+        "persistence": get_persistence_stats(),
+        "read_cache": get_read_cache_stats(),
+        "async_ticks": get_async_tick_stats(),
+        "idempotency": get_idempotency_stats(),
+        "llm_budget": get_llm_budget_stats(),
+        "llm_cache": get_llm_cache_stats(),
+        "decision_reuse": get_decision_reuse_stats(),
+        "timeseries": get_timeseries_stats()
+    }), 200
+
 @app.route('/dashboard', methods=['GET'])
 def dashboard():
     """Dashboard view for positions and trading history"""
     try:
         positions = get_positions()
-        trading_log = get_trading_log()
+        # The trading log itself is paged in by the browser from /api/trading_log
+        log_count = get_trading_log_count()
         # API_KEY is now passed only for client-side authentication for the dashboard features
-        return render_template('dashboard.html', positions=positions, trading_log=trading_log, api_key=API_KEY)
+        return render_template('dashboard.html', positions=positions, log_count=log_count, api_key=API_KEY)
     except Exception as e:
         return f"Error loading dashboard: {str(e)}", 500
 
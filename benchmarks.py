@@ -0,0 +1,472 @@
+"""
+Micro-benchmarks for the hot paths of the trading agent.
+
+Usage:
+    python benchmarks.py [name ...]
+
+With no arguments every benchmark runs. Each one prints a small table comparing
+the current implementation with the code it replaced.
+"""
+
+import random
+import sys
+import time
+
+import numpy as np
+
+
+def best_of(fn, repeat=5, number=1):
+    """Best wall time in seconds of `number` calls to fn, over `repeat` runs."""
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(number):
+            fn()
+        best = min(best, (time.perf_counter() - started) / number)
+    return best
+
+
+def fmt(seconds):
+    if seconds < 1e-3:
+        return f"{seconds * 1e6:9.1f} us"
+    if seconds < 1:
+        return f"{seconds * 1e3:9.2f} ms"
+    return f"{seconds:9.2f} s "
+
+
+def synthetic_tick(n_positions, n_tickers=None, seed=42):
+    """A tick payload with n_positions positions over n_tickers market tickers."""
+    rng = random.Random(seed)
+    n_tickers = n_tickers or max(10, n_positions)
+    tickers = [f"T{i:06d}" for i in range(n_tickers)]
+    market = [{"ticker": t, "current_price": round(rng.uniform(5, 500), 2), "category": "medium"} for t in tickers]
+    positions = [
+        {"ticker": rng.choice(tickers), "quantity": float(rng.randint(1, 100)), "purchase_price": round(rng.uniform(5, 500), 2)}
+        for _ in range(n_positions)
+    ]
+    positions.append({"ticker": "CASH", "quantity": 1000.0, "purchase_price": 1.0})
+    return {"Positions": positions, "Market_Summary": market, "market_history": []}
+
+
+# --- valuation ---------------------------------------------------------------
+
+def loop_valuation(positions, market_summary):
+    """The per-position loop analyze_tick_payload used before valuation.py."""
+    current_prices = {}
+    for item in market_summary:
+        ticker = item.get("ticker")
+        current_price = item.get("currentprice", item.get("current_price"))
+        if ticker and current_price is not None:
+            current_prices[ticker] = float(current_price)
+
+    unrealized_pnl = 0.0
+    positions_evaluated = 0
+    for position in positions:
+        ticker = position.get("ticker")
+        quantity = float(position.get("quantity", 0))
+        purchase_price = position.get("purchaseprice", position.get("purchase_price"))
+        if ticker in current_prices and purchase_price is not None:
+            unrealized_pnl += (current_prices[ticker] - float(purchase_price)) * quantity
+            positions_evaluated += 1
+    return unrealized_pnl, positions_evaluated
+
+
+def bench_valuation():
+    from valuation import (
+        LOOP_MAX_POSITIONS, price_index, position_arrays, join_rows, value_arrays, value_portfolio, value_tick
+    )
+    from validators import normalize_tick_payload
+
+    print("Portfolio valuation: Python loop vs valuation.py")
+    print("  dict path = value_portfolio: load dicts into arrays + join + value (convenience wrapper, not used on ticks)")
+    print(f"  value_tick = production path from a normalized tick (plain loop up to {LOOP_MAX_POSITIONS} positions)")
+    print("  revalue = value preloaded, prejoined arrays only")
+    print(f"{'positions':>10} | {'loop':>12} | {'dict path':>12} | {'speedup':>8} | "
+          f"{'value_tick':>12} | {'speedup':>8} | {'revalue':>12}")
+    for n in (10, 100, 1_000, 100_000):
+        payload = synthetic_tick(n)
+        positions, market = payload["Positions"], payload["Market_Summary"]
+        tick = normalize_tick_payload(payload)[0]
+
+        expected_pnl, expected_count = loop_valuation(positions, market)
+        for result in (value_portfolio(positions, market), value_tick(tick)):
+            assert result.positions_evaluated == expected_count
+            assert abs(result.total_unrealized_pnl - expected_pnl) <= 1e-6 * max(1.0, abs(expected_pnl))
+
+        repeat, number = (5, 200) if n <= 1_000 else (3, 1)
+        loop_time = best_of(lambda: loop_valuation(positions, market), repeat, number)
+        vector_time = best_of(lambda: value_portfolio(positions, market), repeat, number)
+        tick_time = best_of(lambda: value_tick(tick), repeat, number)
+        # Revaluing a book that is already loaded and joined (e.g. a new price vector for the same tickers)
+        index, prices = price_index(market)
+        tickers, quantity, purchase_price = position_arrays(positions)
+        rows = join_rows(tickers, index)
+        math_time = best_of(lambda: value_arrays(tickers, rows, quantity, purchase_price, prices), repeat, number)
+        print(f"{n:>10,} | {fmt(loop_time)} | {fmt(vector_time)} | {loop_time / vector_time:7.1f}x | "
+              f"{fmt(tick_time)} | {loop_time / tick_time:7.1f}x | {fmt(math_time)}")
+
+
+# --- payload normalization ---------------------------------------------------
+
+def legacy_tick_path(payload):
+    """
+    What tick intake cost before normalize_tick_payload: validate_tick_payload
+    parsed every number, then evaluate_tick resolved the key variants again and
+    re-parsed the same numbers into arrays.
+    """
+    from valuation import value_portfolio
+
+    positions = payload.get("Positions", payload.get("positions"))
+    market_summary = payload.get("MarketSummary", payload.get("Market_Summary", payload.get("marketSummary")))
+    for pos in positions:
+        if not isinstance(pos, dict) or "ticker" not in pos or "quantity" not in pos:
+            return None
+        float(pos["quantity"])
+        float(pos["purchaseprice"] if "purchaseprice" in pos else pos["purchase_price"])
+    for summary in market_summary:
+        if not isinstance(summary, dict) or "ticker" not in summary:
+            return None
+        float(summary["currentprice"] if "currentprice" in summary else summary["current_price"])
+    return value_portfolio(positions, market_summary)
+
+
+def bench_normalize():
+    from validators import normalize_tick_payload
+    from valuation import value_tick
+
+    print("Tick intake: validate + re-parse vs normalize_tick_payload + value_tick")
+    print(f"{'positions':>10} | {'before':>12} | {'normalized':>12} | {'speedup':>8}")
+    for n in (10, 1_000, 100_000):
+        payload = synthetic_tick(n)
+        repeat, number = (5, 200) if n <= 1_000 else (3, 1)
+        before = best_of(lambda: legacy_tick_path(payload), repeat, number)
+        after = best_of(lambda: value_tick(normalize_tick_payload(payload)[0]), repeat, number)
+        print(f"{n:>10,} | {fmt(before)} | {fmt(after)} | {before / after:7.1f}x")
+
+
+# --- schema validator --------------------------------------------------------
+
+def handwritten_normalize(data):
+    """The hand-written, stop-at-first-error normalizer TICK_SCHEMA replaced (market dedup omitted)."""
+    positions = data.get("Positions", data.get("positions"))
+    market_summary = data.get("MarketSummary", data.get("Market_Summary", data.get("marketSummary")))
+    if not isinstance(positions, list) or not positions:
+        return None, "Positions must be a non-empty list"
+    tickers, quantity, purchase_price = [], [], []
+    for pos in positions:
+        if not isinstance(pos, dict):
+            return None, "Each position must be an object"
+        if "purchaseprice" in pos:
+            cost = pos["purchaseprice"]
+        elif "purchase_price" in pos:
+            cost = pos["purchase_price"]
+        else:
+            return None, "Position missing required fields (ticker, quantity, purchaseprice)"
+        if "ticker" not in pos or "quantity" not in pos:
+            return None, "Position missing required fields (ticker, quantity, purchaseprice)"
+        try:
+            quantity.append(float(pos["quantity"]))
+            purchase_price.append(float(cost))
+        except (ValueError, TypeError):
+            return None, "Position quantity and purchaseprice must be numeric"
+        tickers.append(pos["ticker"])
+    if not isinstance(market_summary, list) or not market_summary:
+        return None, "Market Summary must be a non-empty list"
+    market_tickers, current_price, category = [], [], []
+    for summary in market_summary:
+        if not isinstance(summary, dict):
+            return None, "Each market summary entry must be an object"
+        if "currentprice" in summary:
+            price = summary["currentprice"]
+        elif "current_price" in summary:
+            price = summary["current_price"]
+        else:
+            return None, "Market summary missing required fields (ticker, currentprice)"
+        if "ticker" not in summary:
+            return None, "Market summary missing required fields (ticker, currentprice)"
+        try:
+            current_price.append(float(price))
+        except (ValueError, TypeError):
+            return None, "Market summary currentprice must be numeric"
+        market_tickers.append(summary["ticker"])
+        category.append(summary.get("category"))
+    return (tickers, quantity, purchase_price, market_tickers, current_price, category), None
+
+
+def bench_schema():
+    from validators import _validate_tick
+
+    print("Tick validation: hand-written (first error) vs TICK_SCHEMA (all errors)")
+    print("  +history = TICK_SCHEMA, also checking one market_history row per ticker (not checked by hand-written)")
+    print(f"{'positions':>10} | {'hand-written':>12} | {'TICK_SCHEMA':>12} | {'speedup':>8} | {'+history':>12}")
+    for n in (10, 1_000, 100_000):
+        payload = synthetic_tick(n)
+        with_history = dict(payload, market_history=[
+            {"ticker": item["ticker"], "price": item["current_price"], "day": "2025-04-03"}
+            for item in payload["Market_Summary"]
+        ])
+        assert not _validate_tick(with_history)[1]
+        repeat, number = (7, 200) if n <= 1_000 else (5, 1)
+        before = best_of(lambda: handwritten_normalize(payload), repeat, number)
+        after = best_of(lambda: _validate_tick(payload), repeat, number)
+        history = best_of(lambda: _validate_tick(with_history), repeat, number)
+        print(f"{n:>10,} | {fmt(before)} | {fmt(after)} | {before / after:7.1f}x | {fmt(history)}")
+
+
+# --- JSON codec --------------------------------------------------------------
+
+def bench_codec():
+    import json
+    import codec
+    from storage import TRADING_LOG_FILE
+
+    with open(TRADING_LOG_FILE, "rb") as f:
+        raw = f.read()
+    if raw.lstrip().startswith(b"["):
+        log = json.loads(raw)
+    else:
+        log = [json.loads(line) for line in raw.splitlines() if line.strip()]
+    lines = [json.dumps(entry).encode("utf-8") for entry in log]
+    pretty = json.dumps(log, indent=2)
+
+    line_count = raw.count(b"\n")
+    print(f"JSON on the trading log sample ({line_count} lines, {len(log)} entries): "
+          f"stdlib json vs codec ({codec.BACKEND})")
+    print(f"{'operation':<34} | {'stdlib':>12} | {'codec':>12} | {'speedup':>8}")
+    cases = [
+        ("parse whole log (indent=2 array)",
+         lambda: json.loads(pretty), lambda: codec.loads(pretty)),
+        ("write log as indent=2 / compact",
+         lambda: json.dumps(log, indent=2), lambda: codec.dumpb(log)),
+        ("encode JSON Lines (per entry)",
+         lambda: "".join(json.dumps(entry) + "\n" for entry in log),
+         lambda: b"".join(codec.dumpb(entry) + b"\n" for entry in log)),
+        ("decode JSON Lines (per line)",
+         lambda: [json.loads(line) for line in lines], lambda: [codec.loads(line) for line in lines]),
+        ("idempotency hash input (sorted)",
+         lambda: json.dumps(log, sort_keys=True, separators=(",", ":"), default=str).encode("utf-8"),
+         lambda: codec.dumpb(log, sort_keys=True, default=str)),
+    ]
+    for name, before, after in cases:
+        old, new = best_of(before, 7, 20), best_of(after, 7, 20)
+        print(f"{name:<34} | {fmt(old)} | {fmt(new)} | {old / new:7.1f}x")
+    print(f"  file size: indent=2 {len(pretty.encode('utf-8')):,} bytes, compact {len(codec.dumpb(log)):,} bytes")
+
+
+# --- batch valuation ---------------------------------------------------------
+
+def bench_batch():
+    from validators import normalize_tick_payload
+    from valuation import value_tick, value_ticks
+
+    print("Batch valuation: value_tick per tick vs value_ticks in one pass")
+    print(f"{'ticks x positions':>18} | {'per tick':>12} | {'one pass':>12} | {'speedup':>8}")
+    for batch, n in ((10, 20), (100, 20), (500, 20), (100, 1_000)):
+        ticks = [normalize_tick_payload(synthetic_tick(n, seed=i))[0] for i in range(batch)]
+        repeat, number = (5, 20) if batch * n <= 10_000 else (3, 2)
+        before = best_of(lambda: [value_tick(tick) for tick in ticks], repeat, number)
+        after = best_of(lambda: value_ticks(ticks), repeat, number)
+        print(f"{f'{batch} x {n:,}':>18} | {fmt(before)} | {fmt(after)} | {before / after:7.1f}x")
+
+
+# --- local strategies --------------------------------------------------------
+
+def bench_strategy():
+    from assign7_tester import make_payload
+    from strategies import STRATEGIES, get_strategy
+    from validators import normalize_tick_payload
+
+    print("Decision stage: local strategies per tick (the ChatGPT call takes seconds)")
+    print(f"{'tickers':>10} | " + " | ".join(f"{name:>14}" for name in STRATEGIES))
+    sample = normalize_tick_payload(make_payload())[0]
+    cases = [(len(sample.market_tickers), sample)]
+    for n in (100, 1_000):
+        payload = synthetic_tick(n, n)
+        payload["market_history"] = [
+            {"ticker": item["ticker"], "price": item["current_price"] * factor, "day": day}
+            for item in payload["Market_Summary"] for factor, day in ((0.97, "2025-04-02"), (1.01, "2025-04-03"))
+        ]
+        cases.append((n, normalize_tick_payload(payload)[0]))
+    for n, tick in cases:
+        times = [best_of(lambda: get_strategy(name)(tick), 5, 200 if n <= 100 else 20) for name in STRATEGIES]
+        print(f"{n:>10,} | " + " | ".join(f"{fmt(t):>14}" for t in times))
+
+
+# --- price history -----------------------------------------------------------
+
+def bench_timeseries():
+    from timeseries import TimeSeriesStore
+    from validators import normalize_tick_payload
+
+    print("Price history: merge one tick into TimeSeriesStore, then read a lookback window")
+    print(f"{'tickers':>10} | {'merge tick':>12} | {'window 250':>12} | {'list rebuild':>12}")
+    for n in (10, 100, 1_000):
+        payload = synthetic_tick(n, n)
+        payload["market_history"] = [
+            {"ticker": item["ticker"], "price": item["current_price"], "day": "day-1000"}
+            for item in payload["Market_Summary"]
+        ]
+        tick = normalize_tick_payload(payload)[0]
+        store = TimeSeriesStore(path="")
+        for day in range(1000):
+            store.merge((ticker, f"day-{day:04d}", float(day)) for ticker in tick.market_tickers)
+        rows = [{"ticker": "T000000", "day": f"day-{day:04d}", "price": float(day)} for day in range(1000)]
+        ticker = tick.market_tickers[0]
+        merge_time = best_of(lambda: store.merge_tick(tick), 5, 20)
+        window_time = best_of(lambda: store.prices(ticker, 250), 5, 200)
+        # What a consumer pays without the store: filter raw history rows and take the tail
+        rebuild_time = best_of(lambda: [row["price"] for row in rows if row["ticker"] == ticker][-250:], 5, 200)
+        print(f"{n:>10,} | {fmt(merge_time)} | {fmt(window_time)} | {fmt(rebuild_time)}")
+
+
+# --- indicators --------------------------------------------------------------
+
+def recompute_indicators(window_prices, ema_span=12, rsi_period=14):
+    """Every indicator recomputed from full (tickers x window) price windows, as without IndicatorBook."""
+    prices = window_prices
+    sma = prices.mean(axis=1)
+    zscore = (prices[:, -1] - sma) / np.maximum(prices.std(axis=1), 1e-12)
+    returns = np.diff(prices, axis=1) / prices[:, :-1]
+    volatility = returns.std(axis=1)
+    alpha = 2.0 / (ema_span + 1.0)
+    ema = prices[:, 0].copy()
+    for column in prices[:, 1:].T:
+        ema = alpha * column + (1 - alpha) * ema
+    change = np.diff(prices, axis=1)
+    gain, loss = np.maximum(change, 0).mean(axis=1), np.maximum(-change, 0).mean(axis=1)
+    rsi = 100 - 100 / (1 + gain / np.maximum(loss, 1e-12))
+    return sma, zscore, volatility, ema, rsi
+
+
+def bench_indicators():
+    from indicators import IndicatorBook
+
+    print("Indicators per new price point: recompute over the window vs IndicatorBook (O(1) per ticker)")
+    print(f"{'tickers x window':>17} | {'recompute':>12} | {'incremental':>12} | {'per ticker':>12} | {'speedup':>8}")
+    rng = np.random.default_rng(3)
+    for n, window in ((10, 20), (100, 250), (1_000, 250), (1_000, 1_000)):
+        tickers = [f"T{i:06d}" for i in range(n)]
+        history = 100 * np.cumprod(1 + rng.normal(0, 0.01, (n, window)), axis=1)
+        book = IndicatorBook(window=window)
+        for day in range(window):
+            book.update(tickers, [f"{day:08d}"] * n, history[:, day])
+        day = iter(range(window, 10 ** 9))
+        incremental = best_of(lambda: book.update(tickers, [f"{next(day):08d}"] * n, history[:, -1]), 5, 20)
+        recompute = best_of(lambda: recompute_indicators(history), 5, 20)
+        print(f"{f'{n:,} x {window:,}':>17} | {fmt(recompute)} | {fmt(incremental)} | "
+              f"{fmt(incremental / n)} | {recompute / incremental:7.1f}x")
+
+
+# --- cold start --------------------------------------------------------------
+
+def import_time(statement, repeat=5):
+    """Best wall time of a fresh interpreter running `statement`, minus an empty interpreter's."""
+    import subprocess
+
+    def run(code):
+        started = time.perf_counter()
+        subprocess.run([sys.executable, "-c", code], check=True, env=_no_llm_env())
+        return time.perf_counter() - started
+
+    baseline = min(run("pass") for _ in range(repeat))
+    return max(0.0, min(run(statement) for _ in range(repeat)) - baseline)
+
+
+def _no_llm_env():
+    # No API key: importing the app must not need one (ChatGPT is only reached on first use)
+    import os
+    return {k: v for k, v in os.environ.items() if k not in ("CHATGPT_API_KEY", "OPENAI_API_KEY")}
+
+
+def bench_startup():
+    import subprocess
+
+    print("Cold start: import time in a fresh interpreter (interpreter start-up subtracted)")
+    print(f"{'import':<46} | {'time':>12}")
+    cases = [
+        ("config", "import config"),
+        ("validators", "import validators"),
+        ("business", "import business"),
+        ("app (what a gunicorn worker loads)", "import app"),
+        ("openai + client (deferred to first LLM call)", "import openai; openai.OpenAI(api_key='x')"),
+        ("requests (deferred to first make_trade)", "import requests"),
+    ]
+    for name, statement in cases:
+        print(f"{name:<46} | {fmt(import_time(statement))}")
+
+    # Largest cumulative imports under app, from the interpreter's own -X importtime report
+    def importtime(statement):
+        report = subprocess.run([sys.executable, "-X", "importtime", "-c", statement], env=_no_llm_env(),
+                                capture_output=True, text=True, check=True).stderr
+        for line in report.splitlines():
+            parts = line.split("|")
+            if len(parts) == 3 and parts[1].strip().isdigit():
+                name = parts[2][1:]
+                # Nesting is shown by two spaces per level; app's own imports are one level down
+                yield len(name) - len(name.lstrip()), int(parts[1]), name.strip()
+
+    startup = {name for _, _, name in importtime("pass")}
+    rows = [(us, name) for depth, us, name in importtime("import app") if depth == 2 and name not in startup]
+    print("  top-level imports of app by cumulative time: "
+          + ", ".join(f"{name} {us / 1000:.0f} ms" for us, name in sorted(rows, reverse=True)[:6]))
+
+
+# --- LLM answer cache --------------------------------------------------------
+
+def bench_llm_cache():
+    import os
+    import tempfile
+
+    from ai_integration import analysis_key
+    from llm_cache import LLMCache
+    from validators import normalize_tick_payload
+
+    print("LLM answer cache per tick: prompt key, then a lookup (a ChatGPT call takes seconds)")
+    print(f"{'positions':>10} | {'key':>12} | {'memory hit':>12} | {'disk hit':>12} | {'miss':>12}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in (10, 100, 1_000):
+            payload = synthetic_tick(n)
+            payload["market_history"] = [
+                {"ticker": item["ticker"], "price": item["current_price"], "day": day}
+                for item in payload["Market_Summary"] for day in ("2025-04-02", "2025-04-03")
+            ]
+            tick = normalize_tick_payload(payload)[0]
+            key = analysis_key(tick)
+            recommendations = [{"action": "STAY", "ticker": t, "quantity": 0} for t in tick.tickers]
+            memory = LLMCache(db_file="")
+            memory.put(key, recommendations)
+            disk = LLMCache(max_entries=0, db_file=os.path.join(tmp, f"cache-{n}.db"))
+            disk.put(key, recommendations)
+            key_time = best_of(lambda: analysis_key(tick), 5, 20)
+            hit_time = best_of(lambda: memory.get(key), 5, 200)
+            disk_time = best_of(lambda: disk.get(key), 5, 20)
+            miss_time = best_of(lambda: memory.get("missing"), 5, 200)
+            print(f"{n:>10,} | {fmt(key_time)} | {fmt(hit_time)} | {fmt(disk_time)} | {fmt(miss_time)}")
+
+
+BENCHMARKS = {
+    "valuation": bench_valuation,
+    "normalize": bench_normalize,
+    "schema": bench_schema,
+    "codec": bench_codec,
+    "batch": bench_batch,
+    "strategy": bench_strategy,
+    "timeseries": bench_timeseries,
+    "indicators": bench_indicators,
+    "llm_cache": bench_llm_cache,
+    "startup": bench_startup,
+}
+
+
+def main():
+    names = sys.argv[1:] or list(BENCHMARKS)
+    for name in names:
+        if name not in BENCHMARKS:
+            print(f"Unknown benchmark {name!r}; choose from {', '.join(BENCHMARKS)}")
+            continue
+        BENCHMARKS[name]()
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,89 +1,284 @@
-﻿import json
-import os
-import requests
+﻿from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime
-from ai_integration import get_chatgpt_analysis
+import codec
+from ai_integration import get_chatgpt_analysis, analysis_key
 from local_analysis import get_simulated_growth # NEW IMPORT for local chart data
-from config import MAKE_TRADE_API_KEY, MAKE_TRADE_URL
+from valuation import value_tick, value_ticks
+from config import MAKE_TRADE_API_KEY, MAKE_TRADE_URL, BATCH_TICK_PARALLELISM, STREAM_TICK_WINDOW, STRATEGY, LLM_FALLBACK_STRATEGY
+from validators import TickErrors, normalize_tick_item
+from storage import get_store, get_writer
+from tick_jobs import get_tick_jobs
+from idempotency import get_idempotency_cache, payload_hash
+from recording import get_recorder
+from strategies import LLM_STRATEGY, get_strategy
+from llm_budget import get_latency_budget
+from llm_cache import get_llm_cache
+from decision_reuse import get_decision_reuse
+from timeseries import get_timeseries
+from indicators import get_indicators
 
-CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
-POSITIONS_FILE = os.path.join(CURRENT_DIR, "Assignment6PositionsSample.txt")
-TRADING_LOG_FILE = os.path.join(CURRENT_DIR, "Assignment6TradingLogSample.txt")
-
-def analyze_tick_payload(payload, tick_id):
+def analyze_tick_payload(tick, tick_id, strategy=None):
     """
     Analyzes tick payload, gets AI recommendations, and posts to make_trade.
     (This remains the core, Assignment 7 compliant trade logic using ChatGPT.)
     
     Args:
-        payload: The tick payload with positions and market data
+        tick: The normalized tick (validators.normalize_tick_payload)
         tick_id: Unique identifier for this tick
+        strategy: Decision strategy name (default STRATEGY, see strategies.py)
     
     Returns:
         Response dict with result, summary, and decisions
     """
-    positions = payload.get("Positions", payload.get("positions", []))
+    return complete_tick(tick, tick_id, evaluate_tick(tick), strategy)
+
+
+def record_tick(tick_id, payload):
+    """Append a valid incoming payload to the tick recording, if TICK_RECORD_FILE is set."""
+    recorder = get_recorder()
+    if recorder is not None:
+        recorder.record(tick_id, payload)
+
+
+def process_tick(tick, tick_id, strategy=None):
+    """
+    Idempotent entry point for /tick: a retry of the same tick_id with the
+    same payload and strategy gets the stored response of the first attempt
+    (waiting for it if it is still running) instead of re-running the AI and
+    make_trade.
+    
+    Returns:
+        (response dict, replayed) where replayed is True for a repeat
+    """
+    strategy = strategy or STRATEGY
+    key = ("sync", tick_id, payload_hash(tick._asdict()), strategy)
+    return get_idempotency_cache().run(key, lambda: analyze_tick_payload(tick, tick_id, strategy))
+
+
+def process_tick_batch(items, strategy=None):
+    """
+    Processes a batch of validated ticks: values them all in one vectorized
+    pass, then runs their decision stages (ChatGPT + make_trade) concurrently,
+    at most BATCH_TICK_PARALLELISM at a time. Each tick goes through the same
+    idempotency cache as /tick before anything else, so a tick already
+    processed is replayed without touching the price history or indicators.
+    
+    Args:
+        items: list of (tick_id, tick) pairs
+        strategy: Decision strategy name for every tick (default STRATEGY)
+    
+    Returns:
+        List of per-tick response dicts in input order, each with "id" and
+        "replayed"; a tick that failed gets result "failure" and a message
+    """
+    if not items:
+        return []
+    strategy = strategy or STRATEGY
+    valuations = value_ticks([tick for _, tick in items])
     
-    # Supports MarketSummary, Market_Summary, or marketSummary
-    if "MarketSummary" in payload:
-        market_summary = payload.get("MarketSummary")
-    elif "Market_Summary" in payload:
-        market_summary = payload.get("Market_Summary")
+    def run(tick_id, tick, valuation):
+        key = ("sync", tick_id, payload_hash(tick._asdict()), strategy)
+        return get_idempotency_cache().run(
+            key, lambda: complete_tick(tick, tick_id, evaluate_tick(tick, valuation), strategy)
+        )
+    
+    workers = max(1, min(BATCH_TICK_PARALLELISM, len(items)))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="batch-tick") as pool:
+        futures = [pool.submit(run, tick_id, tick, valuation) for (tick_id, tick), valuation in zip(items, valuations)]
+    
+    results = []
+    for (tick_id, _), future in zip(items, futures):
+        try:
+            result, replayed = future.result()
+            results.append({"id": tick_id, **result, "replayed": replayed})
+        except Exception as e:
+            print(f"[ERROR] Batch tick {tick_id} failed: {str(e)}")
+            results.append({"id": tick_id, "result": "failure", "message": f"Processing error: {str(e)}"})
+    return results
+
+
+def process_tick_stream(lines, window=STREAM_TICK_WINDOW, strategy=None):
+    """
+    Processes a stream of NDJSON ticks, one {"id", "payload"} object per line,
+    yielding one result dict per non-blank line in input order.
+    
+    At most `window` ticks are in flight at once (running concurrently on a
+    per-stream pool). When the window is full the oldest result is yielded
+    before another line is read, so a slow AI stage stops the stream from
+    being consumed instead of buffering it; the client then sees ordinary
+    TCP backpressure.
+    
+    Args:
+        lines: iterable of raw lines (bytes or str) from the request body
+        window: maximum ticks in flight
+        strategy: Decision strategy name for every tick (default STRATEGY)
+    """
+    pending = deque()
+    with ThreadPoolExecutor(max_workers=max(1, window), thread_name_prefix="stream-tick") as pool:
+        for number, line in enumerate(lines, 1):
+            if not line.strip():
+                continue
+            while len(pending) >= window:
+                yield pending.popleft().result()
+            pending.append(_submit_stream_line(pool, number, line, strategy))
+        while pending:
+            yield pending.popleft().result()
+
+
+def _submit_stream_line(pool, number, line, strategy=None):
+    """Future of the result dict for one stream line; bad lines resolve immediately."""
+    label = f"line {number}"
+    try:
+        item = codec.loads(line)
+    except (codec.JSONDecodeError, UnicodeDecodeError):
+        item = None
+        errors = TickErrors([f"{label} is not valid JSON"])
     else:
-        market_summary = payload.get("marketSummary", [])
-    
-    current_prices = {}
-    for item in market_summary:
-        ticker = item.get("ticker")
-        current_price = item.get("currentprice", item.get("current_price"))
-        if ticker and current_price is not None:
-            current_prices[ticker] = float(current_price)
-    
-    unrealized_pnl = 0.0
-    positions_evaluated = 0
-    
-    # Update positions for dashboard data: persist to file
-    updated_positions = []
-    for position in positions:
-        ticker = position.get("ticker")
-        quantity = float(position.get("quantity", 0))
-        purchase_price = position.get("purchaseprice", position.get("purchase_price"))
-        
-        if ticker in current_prices and purchase_price is not None:
-            current_price = current_prices[ticker]
-            pnl = (current_price - float(purchase_price)) * quantity
-            unrealized_pnl += pnl
-            positions_evaluated += 1
-            
-            updated_pos = {
-                "ticker": ticker,
-                "quantity": quantity,
-                "purchase_price": float(purchase_price),
-                "current_price": current_price,
-                "unrealized_pnl": round(pnl, 2)
-            }
-            updated_positions.append(updated_pos)
+        tick_id, tick, errors = normalize_tick_item(item, label)
     
-    # Save new positions file for dashboard
-    if updated_positions:
-        save_positions(updated_positions)
+    if errors:
+        done = Future()
+        done.set_result({"id": item.get("id") if isinstance(item, dict) else None, "line": number,
+                         "result": "failure", "message": errors.message, "errors": errors})
+        return done
+    
+    record_tick(tick_id, item["payload"])
+    
+    def run():
+        try:
+            result, replayed = process_tick(tick, tick_id, strategy)
+            return {"id": tick_id, "line": number, **result, "replayed": replayed}
+        except Exception as e:
+            print(f"[ERROR] Stream tick {tick_id} failed: {str(e)}")
+            return {"id": tick_id, "line": number, "result": "failure", "message": f"Processing error: {str(e)}"}
+    return pool.submit(run)
+
+
+def evaluate_tick(tick, valuation=None):
+    """
+    Valuation stage of a tick: prices every position against the market
+    summary, merges the tick's prices into the per-ticker price history and
+    indicators and prepares the TICK_UPDATE log entries. Fast and local, so the async /tick
+    mode can answer with the summary before any AI call.
+    A batch passes in the tick's valuation from value_ticks().
+    
+    Returns:
+        Dict with the response "summary", the updated "positions" snapshot
+        (None if nothing was priced), the tick's "log_entries" and the
+        "current_prices" lookup used by the decision stage
+    """
+    # Accumulate market_history beyond the couple of days each tick carries
+    get_timeseries().merge_tick(tick)
+    get_indicators().update_tick(tick)
+    
+    # Vectorized valuation: positions joined to market prices on ticker in one pass
+    current_prices = dict(zip(tick.market_tickers, tick.current_price))
+    if valuation is None:
+        valuation = value_tick(tick)
+    tickers = tick.tickers
+    
+    # Update positions for dashboard data
+    quantity = tick.quantity
+    purchase_price = tick.purchase_price
+    current_price = valuation.current_price.tolist()
+    pnl = valuation.unrealized_pnl.tolist()
+    updated_positions = [
+        {
+            "ticker": tickers[i],
+            "quantity": quantity[i],
+            "purchase_price": purchase_price[i],
+            "current_price": current_price[i],
+            "unrealized_pnl": round(pnl[i], 2)
+        }
+        for i in valuation.priced.nonzero()[0].tolist()
+    ]
+    
+    # Everything this tick writes is collected here and persisted once at the end
+    log_entries = []
     
     # Log tick event to trading log
-    for position in positions:
+    for ticker, position_quantity in zip(tickers, tick.quantity):
         log_entry = {
             "date": datetime.now().strftime("%Y-%m-%d"),
-            "ticker": position.get("ticker"),
+            "ticker": ticker,
             "action": "TICK_UPDATE",
-            "quantity": position.get("quantity", ""),
-            "price": current_prices.get(position.get("ticker")),
+            "quantity": position_quantity,
+            "price": current_prices.get(ticker),
             "note": "Tick received"
         }
-        append_to_trading_log(log_entry)
+        log_entries.append(log_entry)
     
-    # Get ChatGPT recommendations
+    return {
+        "summary": {
+            "positions_evaluated": valuation.positions_evaluated,
+            "unrealized_pnl": round(valuation.total_unrealized_pnl, 2)
+        },
+        "positions": updated_positions or None,
+        "log_entries": log_entries,
+        "current_prices": current_prices
+    }
+
+
+def complete_tick(tick, tick_id, evaluation, strategy=None):
+    """
+    Decision stage of a tick: gets recommendations from the strategy (ChatGPT
+    for "llm", otherwise a local one from strategies.py), posts them to
+    make_trade, then persists the tick's positions and log entries in one write.
+    A tick whose prompt ChatGPT has already answered reuses that answer (see
+    llm_cache.py), and one whose holdings and prices barely differ from the
+    last decided tick reuses its decision (see decision_reuse.py); otherwise
+    ChatGPT gets LLM_LATENCY_BUDGET_S to answer; past that, or when the call
+    fails, the tick is decided by LLM_FALLBACK_STRATEGY (see llm_budget.py).
+    
+    Args:
+        tick: The normalized tick
+        tick_id: Unique identifier for this tick
+        evaluation: Result of evaluate_tick(tick)
+        strategy: Decision strategy name (default STRATEGY)
+    
+    Returns:
+        Response dict with result, strategy, fallback, summary, and decisions
+    """
+    strategy = strategy or STRATEGY
+    current_prices = evaluation["current_prices"]
+    positions_to_save = evaluation["positions"]
+    log_entries = list(evaluation["log_entries"])
+    
+    # Get ChatGPT or local strategy recommendations
     decisions = []
+    fell_back = False
     try:
-        ai_recommendations = get_chatgpt_analysis(payload)
+        if strategy == LLM_STRATEGY:
+            cache = get_llm_cache()
+            reuse = get_decision_reuse()
+            key = analysis_key(tick)
+            ai_recommendations = cache.get(key)
+            reused = reuse.reuse(strategy, tick) if ai_recommendations is None else None
+            if ai_recommendations is not None:
+                note = "AI recommendation from ChatGPT (cached)"
+                reuse.remember(strategy, tick, ai_recommendations)
+            elif reused is not None:
+                ai_recommendations = reused
+                note = f"AI recommendation from ChatGPT (reused: prices within {reuse.epsilon:.2%})"
+            else:
+                ai_recommendations, outcome = get_latency_budget().run(
+                    tick_id,
+                    lambda: get_chatgpt_analysis(tick),
+                    lambda: get_strategy(LLM_FALLBACK_STRATEGY)(tick)
+                )
+                fell_back = outcome != "llm"
+                if fell_back:
+                    reason = "over its latency budget" if outcome == "timeout" else "call failed"
+                    note = f"Fallback to {LLM_FALLBACK_STRATEGY} strategy: ChatGPT {reason}"
+                else:
+                    # Only answers that made the budget are cached; a late one was never acted on
+                    note = "AI recommendation from ChatGPT"
+                    cache.put(key, ai_recommendations)
+                    reuse.remember(strategy, tick, ai_recommendations)
+        else:
+            ai_recommendations = get_strategy(strategy)(tick)
+            note = f"Recommendation from local {strategy} strategy"
         decisions = ai_recommendations
         
         # Log AI recommendations to trading log
@@ -94,37 +289,117 @@ def analyze_tick_payload(payload, tick_id):
                 "action": decision.get("action"),
                 "quantity": decision.get("quantity", 0),
                 "price": current_prices.get(decision.get("ticker"), "N/A"),
-                "note": f"AI recommendation from ChatGPT"
+                "note": note
             }
-            append_to_trading_log(log_entry)
+            log_entries.append(log_entry)
         
         # Post to make_trade endpoint
         if ai_recommendations:
             make_trade_response = post_to_make_trade(tick_id, ai_recommendations)
             if make_trade_response and "Positions" in make_trade_response:
                 # Update positions with the response from make_trade
-                new_positions = make_trade_response.get("Positions", [])
-                save_positions(new_positions)
+                positions_to_save = make_trade_response.get("Positions", [])
     
     except Exception as e:
         print(f"[ERROR] AI analysis failed: {str(e)}")
         # Continue without AI if it fails
         pass
     
+    # One write per tick: positions snapshot and all log entries together
+    persist_tick(positions_to_save, log_entries)
+    
     return {
         "result": "success",
-        "summary": {
-            "positions_evaluated": positions_evaluated,
-            "unrealized_pnl": round(unrealized_pnl, 2)
-        },
+        "strategy": strategy,
+        "fallback": fell_back,
+        "summary": evaluation["summary"],
         "decisions": decisions
     }
 
 
+def submit_tick_async(tick, tick_id, strategy=None):
+    """
+    Async variant of analyze_tick_payload: runs the valuation stage now and
+    queues the decision stage on the async worker pool.
+    
+    Returns:
+        The queued job record (tick_id, status, summary)
+    
+    Raises:
+        tick_jobs.QueueFull / tick_jobs.PoolUnavailable for backpressure,
+        tick_jobs.TickInFlight for a tick_id whose earlier job has not finished
+    """
+    strategy = strategy or STRATEGY
+    
+    def submit():
+        jobs = get_tick_jobs()
+        # Admitted before the valuation stage merges the tick into the price history and
+        # indicators, so a tick rejected with 429/503 is not counted twice when retried
+        jobs.reserve(tick_id)
+        try:
+            evaluation = evaluate_tick(tick)
+        except BaseException:
+            jobs.release(tick_id)
+            raise
+        return jobs.submit(
+            tick_id, evaluation["summary"], lambda: complete_tick(tick, tick_id, evaluation, strategy), reserved=True
+        )
+    
+    # A retried async submission reports the existing job instead of queueing another
+    key = ("async", tick_id, payload_hash(tick._asdict()), strategy)
+    job, replayed = get_idempotency_cache().run(key, submit)
+    if replayed:
+        job = get_tick_jobs().status(tick_id) or job
+    return job
+
+
+def get_tick_status(tick_id):
+    """Status record of an async tick, or None if unknown."""
+    return get_tick_jobs().status(tick_id)
+
+
+def get_idempotency_stats():
+    """Replay/wait counters of the idempotent tick cache."""
+    return get_idempotency_cache().stats()
+
+
+def get_price_history(ticker, limit=None):
+    """The accumulated price history of a ticker, oldest first, as [{"day", "price"}]."""
+    days, prices = get_timeseries().window(ticker, limit)
+    return [{"day": day, "price": price} for day, price in zip(days, prices.tolist())]
+
+
+def get_timeseries_stats():
+    """Tickers and points held by the price history."""
+    return get_timeseries().stats()
+
+
+def get_llm_cache_stats():
+    """Hit/miss counters of the ChatGPT answer cache."""
+    return get_llm_cache().stats()
+
+
+def get_decision_reuse_stats():
+    """How often the last ChatGPT decision was reused instead of calling again, and why not."""
+    return get_decision_reuse().stats()
+
+
+def get_llm_budget_stats():
+    """LLM decisions made within the latency budget vs by the fallback strategy."""
+    return get_latency_budget().stats()
+
+
+def get_async_tick_stats():
+    """Queue depth and outcome counters of the async tick pool."""
+    return get_tick_jobs().stats()
+
+
 def post_to_make_trade(tick_id, trades):
     """
     Posts trade recommendations to the make_trade endpoint.
     """
+    import requests  # deferred: most of the cost of importing business otherwise
+    
     if not MAKE_TRADE_API_KEY:
         print("[WARNING] MAKE_TRADE_API_KEY not configured, skipping make_trade call")
         return None
@@ -166,52 +441,99 @@ def get_chart_growth_data():
 
 
 def get_positions():
-    """Retrieve current positions from file."""
-    if os.path.exists(POSITIONS_FILE):
-        try:
-            with open(POSITIONS_FILE, "r") as f:
-                return json.load(f)
-        except Exception as e:
-            print(f"[ERROR] Failed to load positions: {str(e)}")
-            return []
-    return []
+    """Retrieve current positions from the configured store."""
+    try:
+        return get_store().read_positions()
+    except Exception as e:
+        print(f"[ERROR] Failed to load positions: {str(e)}")
+        return []
 
 
 def get_trading_log():
-    """Retrieve trading log from file."""
-    if os.path.exists(TRADING_LOG_FILE):
-        try:
-            with open(TRADING_LOG_FILE, "r") as f:
-                return json.load(f)
-        except Exception as e:
-            print(f"[ERROR] Failed to load trading log: {str(e)}")
-            return []
-    return []
+    """Retrieve trading log (oldest first) from the configured store."""
+    try:
+        return get_store().read_trading_log()
+    except Exception as e:
+        print(f"[ERROR] Failed to load trading log: {str(e)}")
+        return []
+
+
+def get_trading_log_page(cursor=None, limit=50):
+    """
+    Retrieve one page of the trading log, newest first.
+    
+    Args:
+        cursor: Return entries older than this entry id (None for the newest page)
+        limit: Maximum number of entries to return
+    
+    Returns:
+        (entries, next_cursor) where each entry carries its "id" and
+        next_cursor is None once the oldest entry has been returned
+    """
+    items, next_cursor = get_store().read_log_page(before=cursor, limit=limit)
+    return [{"id": entry_id, **entry} for entry_id, entry in items], next_cursor
+
+
+def query_trading_log(ticker=None, action=None, start_date=None, end_date=None, cursor=None, limit=100):
+    """
+    Filter the trading log by ticker, action and inclusive date range
+    (YYYY-MM-DD), newest first. Filters are answered from secondary indexes,
+    so cost tracks the number of matching entries rather than the log size.
+    
+    Returns:
+        (entries, next_cursor) in the same shape as get_trading_log_page
+    """
+    items, next_cursor = get_store().query_log(
+        ticker=ticker, action=action, start_date=start_date, end_date=end_date,
+        before=cursor, limit=limit
+    )
+    return [{"id": entry_id, **entry} for entry_id, entry in items], next_cursor
+
+
+def get_trading_log_count():
+    """Number of entries in the trading log."""
+    try:
+        return get_store().count_trading_log()
+    except Exception as e:
+        print(f"[ERROR] Failed to count trading log: {str(e)}")
+        return 0
 
 
 def save_positions(positions):
-    """Save positions to file."""
+    """Save positions to the configured store."""
     try:
-        with open(POSITIONS_FILE, "w") as f:
-            json.dump(positions, f, indent=2)
+        get_writer().submit(positions=positions)
     except Exception as e:
         print(f"[ERROR] Failed to save positions: {str(e)}")
 
 
 def append_to_trading_log(entry):
-    """Append entry to trading log file."""
-    log = []
-    if os.path.exists(TRADING_LOG_FILE):
-        try:
-            with open(TRADING_LOG_FILE, "r") as f:
-                log = json.load(f)
-        except Exception:
-            log = []
-    
-    log.append(entry)
-    
+    """Append a single entry to the trading log."""
+    try:
+        get_writer().submit(entries=[entry])
+    except Exception as e:
+        print(f"[ERROR] Failed to append to trading log: {str(e)}")
+
+
+def persist_tick(positions, log_entries):
+    """
+    Persist everything one tick produced in a single write: the latest
+    positions snapshot (or None to leave positions unchanged) plus all of
+    the tick's log entries. The persistence writer groups ticks that persist
+    at the same moment into one flush (one transaction with SQLite) and, in
+    background mode, does so off the request thread.
+    """
     try:
-        with open(TRADING_LOG_FILE, "w") as f:
-            json.dump(log, f, indent=2)
+        get_writer().submit(positions=positions, entries=log_entries)
     except Exception as e:
-        print(f"[ERROR] Failed to append to trading log: {str(e)}")
\ No newline at end of file
+        print(f"[ERROR] Failed to persist tick: {str(e)}")
+
+
+def get_persistence_stats():
+    """Queue depth and flush latency of the persistence writer."""
+    return get_writer().stats()
+
+
+def get_read_cache_stats():
+    """Hit/miss counters of the in-memory positions and trading log cache."""
+    return get_store().cache_stats()
@@ -0,0 +1,73 @@
+"""
+JSON codec used by request parsing, responses, persistence and prompts.
+
+Uses orjson when it is installed and the standard library otherwise; both
+produce the same compact JSON (no spaces, UTF-8). Output is compact unless
+indent=True is asked for, which only human-facing text should need.
+
+One difference remains: orjson writes NaN and +/-Infinity floats as null,
+where the standard library writes the non-standard NaN/Infinity literals.
+Tick payloads cannot carry them (validators rejects non-finite numbers), so
+only values computed here can hit it, and null is the valid JSON for them.
+
+    dumps(obj)  -> str        dumpb(obj) -> UTF-8 bytes
+    loads(s)    -> object     (accepts str or bytes)
+
+Objects orjson refuses (integers over 64 bits, non-string dict keys, ...)
+are retried through the standard library, so switching backends never turns
+a payload that used to serialize into an error. Parsing works the same way:
+text orjson rejects (integers over 64 bits, NaN/Infinity literals) is
+retried with json.loads, which raises the same JSONDecodeError for text that
+is not JSON at all.
+"""
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+BACKEND = "orjson" if orjson is not None else "json"
+
+# orjson.JSONDecodeError subclasses json.JSONDecodeError, so one except clause covers both
+JSONDecodeError = json.JSONDecodeError
+
+
+def _std_dumps(obj, indent=False, sort_keys=False, default=None):
+    if indent:
+        return json.dumps(obj, indent=2, sort_keys=sort_keys, default=default, ensure_ascii=False)
+    return json.dumps(obj, separators=(",", ":"), sort_keys=sort_keys, default=default, ensure_ascii=False)
+
+
+if orjson is not None:
+    def dumpb(obj, indent=False, sort_keys=False, default=None):
+        """Serialize obj to UTF-8 JSON bytes."""
+        option = (orjson.OPT_INDENT_2 if indent else 0) | (orjson.OPT_SORT_KEYS if sort_keys else 0)
+        try:
+            return orjson.dumps(obj, default=default, option=option or None)
+        except TypeError:
+            return _std_dumps(obj, indent, sort_keys, default).encode("utf-8")
+
+    def dumps(obj, indent=False, sort_keys=False, default=None):
+        """Serialize obj to a JSON string."""
+        return dumpb(obj, indent, sort_keys, default).decode("utf-8")
+
+    def loads(s):
+        """Parse JSON from str or bytes."""
+        try:
+            return orjson.loads(s)
+        except orjson.JSONDecodeError as error:
+            try:
+                return json.loads(s)
+            except UnicodeDecodeError:
+                raise error from None
+else:
+    def dumpb(obj, indent=False, sort_keys=False, default=None):
+        """Serialize obj to UTF-8 JSON bytes."""
+        return _std_dumps(obj, indent, sort_keys, default).encode("utf-8")
+
+    def dumps(obj, indent=False, sort_keys=False, default=None):
+        """Serialize obj to a JSON string."""
+        return _std_dumps(obj, indent, sort_keys, default)
+
+    loads = json.loads
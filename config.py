@@ -7,3 +7,89 @@ API_KEY = os.getenv("API_KEY", "lrd0036")
 CHATGPT_API_KEY = os.getenv("CHATGPT_API_KEY")
 MAKE_TRADE_API_KEY = os.getenv("MAKE_TRADE_API_KEY")
 MAKE_TRADE_URL = "https://mothership-crg7hzedd6ckfegv.eastus-01.azurewebsites.net/make_trade"
+
+# Persistence engine for positions and the trading log: "file" or "sqlite"
+STORAGE_ENGINE = os.getenv("STORAGE_ENGINE", "file").lower()
+SQLITE_DB_FILE = os.getenv("SQLITE_DB_FILE", os.path.join(os.path.dirname(os.path.abspath(__file__)), "trading.db"))
+
+# How long the first tick to reach the writer waits for others to join its flush
+GROUP_COMMIT_WINDOW_MS = float(os.getenv("GROUP_COMMIT_WINDOW_MS", "2"))
+
+# Persistence writer: "background" (dedicated writer thread) or "inline" (request thread)
+PERSIST_WRITER = os.getenv("PERSIST_WRITER", "background").lower()
+# "async" returns as soon as work is queued; "fsync" waits until it is on disk
+PERSIST_DURABILITY = os.getenv("PERSIST_DURABILITY", "async").lower()
+PERSIST_QUEUE_SIZE = int(os.getenv("PERSIST_QUEUE_SIZE", "1000"))
+
+# Async /tick mode: worker pool size, max queued+running ticks before 429, seconds the queue may stay
+# full with no tick finishing before 503 (0 = never), results kept, and age at which result files are swept
+TICK_ASYNC_WORKERS = int(os.getenv("TICK_ASYNC_WORKERS", "4"))
+TICK_ASYNC_QUEUE_SIZE = int(os.getenv("TICK_ASYNC_QUEUE_SIZE", "64"))
+TICK_ASYNC_SATURATION_S = float(os.getenv("TICK_ASYNC_SATURATION_S", "30"))
+TICK_JOB_RETENTION = int(os.getenv("TICK_JOB_RETENTION", "1000"))
+TICK_JOBS_DIR = os.getenv("TICK_JOBS_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "tick_jobs"))
+TICK_JOB_RESULT_TTL_S = float(os.getenv("TICK_JOB_RESULT_TTL_S", "86400"))
+
+# Idempotent /tick: how long a (tick_id, payload) result is replayed to retries
+IDEMPOTENCY_TTL_S = float(os.getenv("IDEMPOTENCY_TTL_S", "600"))
+IDEMPOTENCY_MAX_ENTRIES = int(os.getenv("IDEMPOTENCY_MAX_ENTRIES", "10000"))
+# SQLite file (e.g. shared_state.db) through which gunicorn workers share idempotent results; empty keeps them
+# per process. A worker's claim on an unfinished tick is taken over after IDEMPOTENCY_CLAIM_TIMEOUT_S
+IDEMPOTENCY_FILE = os.getenv("IDEMPOTENCY_FILE", "")
+IDEMPOTENCY_CLAIM_TIMEOUT_S = float(os.getenv("IDEMPOTENCY_CLAIM_TIMEOUT_S", "300"))
+
+# Batch /ticks: most ticks accepted per request, and how many AI calls run at once
+BATCH_TICK_MAX_ITEMS = int(os.getenv("BATCH_TICK_MAX_ITEMS", "500"))
+BATCH_TICK_PARALLELISM = int(os.getenv("BATCH_TICK_PARALLELISM", "4"))
+
+# Streaming /ticks/stream: ticks in flight per connection before input stops being read
+STREAM_TICK_WINDOW = int(os.getenv("STREAM_TICK_WINDOW", "8"))
+STREAM_MAX_LINE_BYTES = int(os.getenv("STREAM_MAX_LINE_BYTES", str(1024 * 1024)))
+
+# Tick recording for offline replay (replay.py): JSON Lines file, empty to disable
+TICK_RECORD_FILE = os.getenv("TICK_RECORD_FILE", "")
+
+# Decision strategy: "llm" (ChatGPT) or a local one from strategies.py; ?strategy= overrides per request
+STRATEGY = os.getenv("STRATEGY", "llm").lower()
+# Local strategies: relative move that triggers a trade, units per trade, most units held per ticker
+LOCAL_STRATEGY_THRESHOLD = float(os.getenv("LOCAL_STRATEGY_THRESHOLD", "0.01"))
+LOCAL_STRATEGY_TRADE_SIZE = float(os.getenv("LOCAL_STRATEGY_TRADE_SIZE", "5"))
+LOCAL_STRATEGY_MAX_POSITION = float(os.getenv("LOCAL_STRATEGY_MAX_POSITION", "100"))
+# Days of accumulated price history (timeseries.py) local strategies read; 0 reads only the tick's market_history
+LOCAL_STRATEGY_LOOKBACK = int(os.getenv("LOCAL_STRATEGY_LOOKBACK", "0"))
+# "rsi" local strategy: RSI at or below which it buys, at or above which it sells
+LOCAL_STRATEGY_RSI_OVERSOLD = float(os.getenv("LOCAL_STRATEGY_RSI_OVERSOLD", "30"))
+LOCAL_STRATEGY_RSI_OVERBOUGHT = float(os.getenv("LOCAL_STRATEGY_RSI_OVERBOUGHT", "70"))
+
+# LLM decision stage: seconds a tick waits for ChatGPT before using the fallback (0 = no budget),
+# concurrent ChatGPT calls, the hard timeout of one call, and where late answers are recorded
+LLM_LATENCY_BUDGET_S = float(os.getenv("LLM_LATENCY_BUDGET_S", "10"))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+LLM_REQUEST_TIMEOUT_S = float(os.getenv("LLM_REQUEST_TIMEOUT_S", "60"))
+LLM_LATE_ANSWER_FILE = os.getenv("LLM_LATE_ANSWER_FILE", os.path.join(os.path.dirname(os.path.abspath(__file__)), "late_llm_answers.jsonl"))
+# Strategy deciding a tick when the LLM overruns its budget or fails: "stay" (all STAY) or a local strategy
+LLM_FALLBACK_STRATEGY = os.getenv("LLM_FALLBACK_STRATEGY", "stay").lower()
+
+# Per-ticker price history merged from every tick (timeseries.py): .npz file (empty for memory only),
+# days kept per ticker, and how often a background thread saves it (0: only at exit)
+TIMESERIES_FILE = os.getenv("TIMESERIES_FILE", os.path.join(os.path.dirname(os.path.abspath(__file__)), "timeseries.npz"))
+TIMESERIES_MAX_POINTS = int(os.getenv("TIMESERIES_MAX_POINTS", "1000"))
+TIMESERIES_FLUSH_INTERVAL_S = float(os.getenv("TIMESERIES_FLUSH_INTERVAL_S", "30"))
+
+# Incremental indicators (indicators.py): SMA/volatility/z-score window, EMA span and RSI period, in price points
+INDICATOR_WINDOW = int(os.getenv("INDICATOR_WINDOW", "20"))
+INDICATOR_EMA_SPAN = float(os.getenv("INDICATOR_EMA_SPAN", "12"))
+INDICATOR_RSI_PERIOD = int(os.getenv("INDICATOR_RSI_PERIOD", "14"))
+
+# ChatGPT answer cache (llm_cache.py): entries kept in memory, seconds an answer is reused (0 = forever),
+# and an optional SQLite file (e.g. llm_cache.db) that keeps answers across restarts and for offline replay
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "1024"))
+LLM_CACHE_TTL_S = float(os.getenv("LLM_CACHE_TTL_S", "3600"))
+LLM_CACHE_FILE = os.getenv("LLM_CACHE_FILE", "")
+
+# Decision reuse (decision_reuse.py): relative price move under which the last ChatGPT decision is reused
+# while holdings are unchanged (0 = always call), and the most seconds a decision is reused for (0 = no limit)
+DECISION_REUSE_EPSILON = float(os.getenv("DECISION_REUSE_EPSILON", "0.001"))
+DECISION_REUSE_MAX_AGE_S = float(os.getenv("DECISION_REUSE_MAX_AGE_S", "300"))
+# SQLite file (may be the IDEMPOTENCY_FILE) through which gunicorn workers share the last decision; empty: per process
+DECISION_REUSE_FILE = os.getenv("DECISION_REUSE_FILE", "")
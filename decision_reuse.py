@@ -0,0 +1,162 @@
+"""
+Reuse of the last ChatGPT decision while the market barely moves.
+
+Consecutive ticks often differ by a few cents, and a fresh ChatGPT answer for
+each costs seconds. DecisionReuse remembers the last tick ChatGPT decided (its
+holdings, Market_Summary prices and recommendations). A new tick reuses those
+recommendations instead of calling ChatGPT when:
+
+- the holdings are the same (every ticker at the same quantity; a trade that
+  went through changes them, so a decision is never repeated on top of its
+  own fill),
+- the Market_Summary has the same tickers and every price is within
+  DECISION_REUSE_EPSILON of the remembered one (relative), and
+- the decision is at most DECISION_REUSE_MAX_AGE_S old (0: no limit).
+
+Prices are compared with the tick the decision was made on, not the previous
+tick, so small moves cannot add up unnoticed across reused ticks. market_history
+is not compared; it only repeats earlier prices. An epsilon of 0 turns reuse off.
+
+With DECISION_REUSE_FILE set, the last decision is kept in a SQLite file shared
+by the gunicorn workers, so a tick compares with the last decision any worker
+made; otherwise each worker remembers its own.
+"""
+import sqlite3
+import threading
+import time
+
+import codec
+from config import DECISION_REUSE_EPSILON, DECISION_REUSE_MAX_AGE_S, DECISION_REUSE_FILE
+
+
+def _holdings(tick):
+    held = {}
+    for ticker, quantity in zip(tick.tickers, tick.quantity):
+        held[ticker] = held.get(ticker, 0.0) + quantity
+    return held
+
+
+class DecisionReuse:
+    """The last LLM decision per strategy and the similarity gate in front of the next call."""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS decision_reuse (
+            strategy TEXT PRIMARY KEY,
+            decided_at REAL NOT NULL,
+            decision TEXT NOT NULL
+        );
+    """
+
+    def __init__(self, epsilon=DECISION_REUSE_EPSILON, max_age=DECISION_REUSE_MAX_AGE_S, db_file=DECISION_REUSE_FILE):
+        self.epsilon = epsilon
+        self.max_age = max_age
+        self.db_file = db_file
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        # strategy -> (decided_at, holdings, prices, recommendations)
+        self._last = {}
+        self.lookups = 0
+        self.reused = 0
+        self.no_decision = 0
+        self.expired = 0
+        self.holdings_changed = 0
+        self.price_moved = 0
+        if db_file:
+            self._connect().executescript(self.SCHEMA)
+
+    def _connect(self):
+        """One connection per thread; sqlite3 connections are not shareable."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_file, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=30000")
+            self._local.conn = conn
+        return conn
+
+    def _load(self, strategy):
+        """The last decision for strategy from the shared file, falling back to this process's own."""
+        try:
+            row = self._connect().execute(
+                "SELECT decided_at, decision FROM decision_reuse WHERE strategy = ?", (strategy,)
+            ).fetchone()
+        except sqlite3.Error as e:
+            print(f"[ERROR] Decision reuse read failed: {str(e)}")
+            return self._last.get(strategy)
+        if row is None:
+            return None
+        holdings, prices, recommendations = codec.loads(row[1])
+        return row[0], holdings, prices, recommendations
+
+    def reuse(self, strategy, tick):
+        """The remembered recommendations if the tick is close enough to their tick, else None."""
+        if self.epsilon <= 0:
+            return None
+        shared = self._load(strategy) if self.db_file else None
+        with self._lock:
+            self.lookups += 1
+            last = shared if self.db_file else self._last.get(strategy)
+            if last is None:
+                self.no_decision += 1
+                return None
+            decided_at, holdings, prices, recommendations = last
+            if self.max_age > 0 and time.time() - decided_at > self.max_age:
+                self.expired += 1
+                return None
+            if _holdings(tick) != holdings:
+                self.holdings_changed += 1
+                return None
+            current = dict(zip(tick.market_tickers, tick.current_price))
+            if current.keys() != prices.keys() or any(
+                abs(price - prices[ticker]) > self.epsilon * abs(prices[ticker])
+                for ticker, price in current.items()
+            ):
+                self.price_moved += 1
+                return None
+            self.reused += 1
+            return recommendations
+
+    def remember(self, strategy, tick, recommendations):
+        """Make recommendations, decided on tick, the ones later ticks are compared with."""
+        if self.epsilon <= 0:
+            return
+        last = (time.time(), _holdings(tick), dict(zip(tick.market_tickers, tick.current_price)), recommendations)
+        with self._lock:
+            self._last[strategy] = last
+        if self.db_file:
+            try:
+                self._connect().execute(
+                    "INSERT OR REPLACE INTO decision_reuse (strategy, decided_at, decision) VALUES (?, ?, ?)",
+                    (strategy, last[0], codec.dumps(last[1:])),
+                )
+            except sqlite3.Error as e:
+                print(f"[ERROR] Decision reuse write failed: {str(e)}")
+
+    def stats(self):
+        with self._lock:
+            return {
+                "epsilon": self.epsilon,
+                "shared": bool(self.db_file),
+                "max_age_s": self.max_age,
+                "lookups": self.lookups,
+                "reused": self.reused,
+                "reuse_rate": round(self.reused / self.lookups, 4) if self.lookups else 0.0,
+                "no_decision": self.no_decision,
+                "expired": self.expired,
+                "holdings_changed": self.holdings_changed,
+                "price_moved": self.price_moved,
+            }
+
+
+_reuse = None
+_reuse_lock = threading.Lock()
+
+def get_decision_reuse():
+    """Return the process-wide decision reuse gate, created on first use."""
+    global _reuse
+    if _reuse is None:
+        with _reuse_lock:
+            if _reuse is None:
+                _reuse = DecisionReuse()
+    return _reuse
@@ -0,0 +1,43 @@
+"""
+Gunicorn settings, picked up automatically by `gunicorn app:app` (including the
+Azure App Service startup command). The storage layer locks the text files
+across processes and SQLite handles its own locking, so several workers can
+process ticks at once.
+
+One worker is the default. State that keeps a retried tick from calling
+ChatGPT and make_trade again has to be shared before WEB_CONCURRENCY can go
+above 1, since a retry usually lands on another worker:
+
+- IDEMPOTENCY_FILE: idempotent /tick results (unless IDEMPOTENCY_TTL_S is 0)
+- DECISION_REUSE_FILE: the last ChatGPT decision (unless DECISION_REUSE_EPSILON is 0)
+
+Both may name the same SQLite file. With either missing, more than one worker
+refuses to start. Async tick status is shared through TICK_JOBS_DIR. The
+ChatGPT answer cache (unless LLM_CACHE_FILE is set), the read cache and the
+price history stay per worker; that only costs cache hits and history depth.
+Scale with GUNICORN_THREADS first.
+"""
+import os
+
+from config import IDEMPOTENCY_TTL_S, IDEMPOTENCY_FILE, DECISION_REUSE_EPSILON, DECISION_REUSE_FILE
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:" + os.getenv("PORT", "8000"))
+# Per-process state: see above before raising this
+workers = int(os.getenv("WEB_CONCURRENCY", "1"))
+threads = int(os.getenv("GUNICORN_THREADS", "4"))
+# A tick can wait on ChatGPT and make_trade for well over the 30s default
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+# Each worker must start its own persistence writer thread after the fork
+preload_app = False
+
+if workers > 1:
+    unshared = []
+    if IDEMPOTENCY_TTL_S > 0 and not IDEMPOTENCY_FILE:
+        unshared.append("IDEMPOTENCY_FILE")
+    if DECISION_REUSE_EPSILON > 0 and not DECISION_REUSE_FILE:
+        unshared.append("DECISION_REUSE_FILE")
+    if unshared:
+        raise SystemExit(
+            f"WEB_CONCURRENCY={workers} needs {' and '.join(unshared)} set so retried ticks are not "
+            f"run again on another worker; set them or run a single worker"
+        )
@@ -0,0 +1,209 @@
+"""
+Idempotent tick processing.
+
+The upstream retries /tick/<tick_id> on timeouts. Results are remembered per
+(tick_id, payload hash) for IDEMPOTENCY_TTL_S seconds, so a retry returns the
+stored response instead of calling ChatGPT, logging and posting to make_trade
+again. A duplicate that arrives while the first request is still running waits
+for that computation rather than starting its own.
+
+With IDEMPOTENCY_FILE set, results are also kept in a SQLite file shared by
+the gunicorn workers. The first worker to see a key claims it there; a retry
+that lands on another worker replays the stored result, or waits for the
+claiming worker to finish. A claim older than IDEMPOTENCY_CLAIM_TIMEOUT_S
+(its worker was killed mid-tick) is taken over. Without the file the cache is
+per process, and gunicorn.conf.py refuses to start more than one worker.
+"""
+import hashlib
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+import codec
+from config import IDEMPOTENCY_TTL_S, IDEMPOTENCY_MAX_ENTRIES, IDEMPOTENCY_FILE, IDEMPOTENCY_CLAIM_TIMEOUT_S
+
+
+# How often a worker waiting on another worker's claim checks the shared file
+SHARED_POLL_S = 0.05
+
+# _claim() result when this process now holds the claim
+_CLAIMED = object()
+
+
+def payload_hash(payload):
+    """Stable hash of a JSON payload (key order and whitespace do not matter)."""
+    return hashlib.sha256(codec.dumpb(payload, sort_keys=True, default=str)).hexdigest()
+
+
+class IdempotencyCache:
+    """Maps a key to the Future of its first computation, with TTL-based eviction and an optional SQLite tier."""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS idempotency (
+            key TEXT PRIMARY KEY,
+            claimed_at REAL NOT NULL,
+            expires_at REAL,
+            response TEXT
+        );
+        CREATE INDEX IF NOT EXISTS idempotency_expires_at ON idempotency (expires_at);
+    """
+
+    def __init__(self, ttl=IDEMPOTENCY_TTL_S, max_entries=IDEMPOTENCY_MAX_ENTRIES,
+                 db_file=IDEMPOTENCY_FILE, claim_timeout=IDEMPOTENCY_CLAIM_TIMEOUT_S):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.db_file = db_file
+        self.claim_timeout = claim_timeout
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        # key -> [future, expires_at]; expires_at stays None while in flight
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.waits = 0
+        self.shared_hits = 0
+        if db_file:
+            self._connect().executescript(self.SCHEMA)
+
+    def _connect(self):
+        """One connection per thread; sqlite3 connections are not shareable."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_file, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=30000")
+            self._local.conn = conn
+        return conn
+
+    def run(self, key, compute):
+        """
+        Return (result, replayed). The first caller for `key` runs compute();
+        later callers get the same result, waiting for it if still in flight.
+        A failed computation is not remembered, so the next retry runs again.
+        """
+        with self._lock:
+            self._evict(time.monotonic())
+            entry = self._entries.get(key)
+            if entry is None:
+                future = Future()
+                self._entries[key] = [future, None]
+                self.misses += 1
+                leader = True
+            else:
+                future = entry[0]
+                if future.done():
+                    self.hits += 1
+                else:
+                    self.waits += 1
+                leader = False
+
+        if not leader:
+            return future.result(), True
+
+        try:
+            result, replayed = self._run_shared(key, compute) if self.db_file else (compute(), False)
+        except BaseException as e:
+            with self._lock:
+                self._entries.pop(key, None)
+            future.set_exception(e)
+            raise
+        with self._lock:
+            if key in self._entries:
+                self._entries[key][1] = time.monotonic() + self.ttl
+        future.set_result(result)
+        return result, replayed
+
+    def _run_shared(self, key, compute):
+        """
+        run() across processes: claim key in the SQLite file and compute, or
+        return the result another worker stored for it, waiting while that
+        worker's claim is still unfinished. The result must be JSON-serializable.
+        """
+        shared_key = payload_hash(key)
+        try:
+            claimed = self._claim(shared_key)
+        except sqlite3.Error as e:
+            print(f"[ERROR] Shared idempotency read failed: {str(e)}")
+            return compute(), False
+        if claimed is not _CLAIMED:
+            with self._lock:
+                self.shared_hits += 1
+            return claimed, True
+
+        try:
+            result = compute()
+        except BaseException:
+            self._write("DELETE FROM idempotency WHERE key = ?", (shared_key,))
+            raise
+        self._write(
+            "UPDATE idempotency SET expires_at = ?, response = ? WHERE key = ?",
+            (time.time() + self.ttl, codec.dumps(result), shared_key),
+        )
+        return result, False
+
+    def _claim(self, shared_key):
+        """_CLAIMED once this process holds the claim on shared_key, or the result another worker stored."""
+        conn = self._connect()
+        while True:
+            now = time.time()
+            conn.execute("DELETE FROM idempotency WHERE expires_at <= ?", (now,))
+            # An unfinished claim this old belongs to a worker that died mid-tick
+            conn.execute(
+                "DELETE FROM idempotency WHERE key = ? AND expires_at IS NULL AND claimed_at <= ?",
+                (shared_key, now - self.claim_timeout),
+            )
+            if conn.execute(
+                "INSERT OR IGNORE INTO idempotency (key, claimed_at) VALUES (?, ?)", (shared_key, now)
+            ).rowcount == 1:
+                return _CLAIMED
+            row = conn.execute(
+                "SELECT response FROM idempotency WHERE key = ? AND expires_at IS NOT NULL", (shared_key,)
+            ).fetchone()
+            if row is not None:
+                return codec.loads(row[0])
+            time.sleep(SHARED_POLL_S)
+
+    def _write(self, sql, params):
+        try:
+            self._connect().execute(sql, params)
+        except sqlite3.Error as e:
+            print(f"[ERROR] Shared idempotency write failed: {str(e)}")
+
+    def _evict(self, now):
+        """Drop expired entries, then the oldest finished ones over max_entries; caller holds _lock."""
+        for key in list(self._entries):
+            expires_at = self._entries[key][1]
+            if expires_at is None:
+                continue  # still in flight
+            if expires_at <= now or len(self._entries) > self.max_entries:
+                del self._entries[key]
+            else:
+                # Entries finish roughly in insertion order; stop at the first live one
+                break
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "waits": self.waits,
+                "shared": bool(self.db_file),
+                "shared_hits": self.shared_hits,
+            }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_idempotency_cache():
+    """Return the process-wide idempotency cache."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = IdempotencyCache()
+    return _cache
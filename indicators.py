@@ -0,0 +1,230 @@
+"""
+Incremental technical indicators over the per-ticker price stream.
+
+An IndicatorBook holds running state for every ticker seen, one row per ticker
+in a set of NumPy arrays, and updates all the tickers of a tick at once. Each
+new price point costs O(1) per ticker however long the windows are: SMA and
+z-score keep running sums over a ring buffer of the last `window` prices,
+volatility the same over the last `window` returns, and EMA and RSI are
+recursive.
+
+Points are per (ticker, day), as in timeseries.py. A second price for the
+newest day replaces that day's point (the state before it is kept for that);
+a point older than the newest day is ignored, so the overlapping history each
+tick repeats is not counted twice.
+
+Indicators, per ticker (NaN until defined):
+    price       latest price
+    sma         mean of the last `window` prices
+    ema         exponential moving average, span `ema_span` (seeded with the first price)
+    ret         latest simple return
+    volatility  standard deviation of the last `window` returns
+    rsi         Wilder RSI over `rsi_period` (seeded with the first change)
+    zscore      (price - sma) / standard deviation of the last `window` prices
+    count       price points seen
+"""
+import threading
+from collections import defaultdict
+from datetime import datetime
+
+import numpy as np
+
+from config import INDICATOR_WINDOW, INDICATOR_EMA_SPAN, INDICATOR_RSI_PERIOD
+
+INDICATORS = ("price", "sma", "ema", "ret", "volatility", "rsi", "zscore", "count")
+
+# Columns of the per-ticker state matrix; "*_BEFORE" is the value before the newest day's point
+(_LAST, _PREV, _COUNT, _SUM_P, _SUMSQ_P, _SUM_R, _SUMSQ_R,
+ _EMA, _EMA_BEFORE, _GAIN, _GAIN_BEFORE, _LOSS, _LOSS_BEFORE) = range(13)
+_ROLLING = [_LAST, _EMA, _GAIN, _LOSS]
+_BEFORE = [_PREV, _EMA_BEFORE, _GAIN_BEFORE, _LOSS_BEFORE]
+
+
+class IndicatorBook:
+    """Running indicator state for many tickers, updated a vector of prices at a time."""
+
+    def __init__(self, window=INDICATOR_WINDOW, ema_span=INDICATOR_EMA_SPAN, rsi_period=INDICATOR_RSI_PERIOD):
+        self.window = max(2, window)
+        self.alpha = 2.0 / (ema_span + 1.0)
+        self.rsi_period = max(1, rsi_period)
+        self._rows = {}
+        self._lock = threading.Lock()
+        self._capacity = 0
+        self._allocate(16)
+
+    def _allocate(self, capacity):
+        """(Re)allocate the per-ticker state for `capacity` tickers, keeping existing rows."""
+        def grow(name, fill, shape, dtype=np.float64):
+            array = np.full((capacity, *shape), fill, dtype=dtype)
+            if self._capacity:
+                array[:self._capacity] = getattr(self, name)
+            setattr(self, name, array)
+
+        # One row per ticker: a single gather and scatter per update touches all of its state
+        grow("state", 0.0, (13,))
+        grow("last_day", "", (), object)
+        grow("price_ring", 0.0, (self.window,))
+        grow("return_ring", 0.0, (self.window,))
+        self._capacity = capacity
+
+    def _row_indexes(self, tickers):
+        rows = self._rows
+        missing = [ticker for ticker in tickers if ticker not in rows]
+        if missing:
+            needed = len(rows) + len(missing)
+            if needed > self._capacity:
+                self._allocate(max(needed, 2 * self._capacity))
+            for ticker in missing:
+                rows.setdefault(ticker, len(rows))
+        return np.fromiter((rows[ticker] for ticker in tickers), dtype=np.int64, count=len(tickers))
+
+    def update(self, tickers, days, prices):
+        """
+        Add one price point for each of `tickers` (no ticker twice), all
+        tickers in one vectorized step.
+        """
+        with self._lock:
+            self._update(self._row_indexes(tickers), np.asarray(days, dtype=object),
+                         np.asarray(prices, dtype=np.float64))
+
+    def _update(self, rows, days, prices):
+        last_day = self.last_day[rows]
+        keep = days >= last_day
+        if not keep.all():
+            rows, days, prices, last_day = rows[keep], days[keep], prices[keep], last_day[keep]
+        if not len(rows):
+            return
+        new = days > last_day
+        state = self.state[rows]
+
+        # A new day moves the "before" state forward; a repeat of the newest day reuses it
+        state[:, _BEFORE] = np.where(new[:, None], state[:, _ROLLING], state[:, _BEFORE])
+        count = state[:, _COUNT] + new
+        state[:, _COUNT] = count
+        state[:, _LAST] = prices
+        window = self.window
+
+        slot = (count - 1).astype(np.int64) % window
+        old = self.price_ring[rows, slot]
+        self.price_ring[rows, slot] = prices
+        state[:, _SUM_P] += prices - old
+        state[:, _SUMSQ_P] += prices * prices - old * old
+
+        first = count == 1
+        state[:, _EMA] = np.where(first, prices, self.alpha * prices + (1.0 - self.alpha) * state[:, _EMA_BEFORE])
+
+        # Returns and RSI need a previous point; rows without one write their old values back
+        prev = state[:, _PREV]
+        change = np.where(first, 0.0, prices - prev)
+        slot = (count - 2).astype(np.int64) % window
+        old = self.return_ring[rows, slot]
+        returns = np.where(first, old, np.divide(change, prev, out=np.zeros_like(change), where=prev != 0))
+        self.return_ring[rows, slot] = returns
+        state[:, _SUM_R] += returns - old
+        state[:, _SUMSQ_R] += returns * returns - old * old
+
+        seed = count == 2
+        n = self.rsi_period
+        gain, loss = np.maximum(change, 0.0), np.maximum(-change, 0.0)
+        state[:, _GAIN] = np.where(seed, gain, (state[:, _GAIN_BEFORE] * (n - 1) + gain) / n)
+        state[:, _LOSS] = np.where(seed, loss, (state[:, _LOSS_BEFORE] * (n - 1) + loss) / n)
+
+        self.state[rows] = state
+        self.last_day[rows] = days
+
+    def update_tick(self, tick):
+        """
+        Feed a normalized tick: its market_history rows oldest day first, then
+        the Market_Summary prices under the newest history day (today when the
+        tick has no history), as timeseries.TimeSeriesStore files them.
+        """
+        by_day = defaultdict(dict)
+        for ticker, price, day in zip(tick.history_tickers, tick.history_price, tick.history_day):
+            if day is not None:
+                by_day[day][ticker] = price
+        today = max(by_day, default=None) or datetime.now().strftime("%Y-%m-%d")
+        summary = by_day[today]
+        summary.update(zip(tick.market_tickers, tick.current_price))
+        for day in sorted(by_day):
+            points = by_day[day]
+            self.update(list(points), [day] * len(points), list(points.values()))
+
+    def snapshot(self, tickers):
+        """
+        Current indicators of `tickers` as a dict of arrays aligned with them
+        (NaN for a ticker never seen or an indicator not yet defined).
+        """
+        with self._lock:
+            known = np.fromiter((ticker in self._rows for ticker in tickers), dtype=bool, count=len(tickers))
+            rows = np.fromiter((self._rows.get(ticker, 0) for ticker in tickers), dtype=np.int64, count=len(tickers))
+            state = self.state[rows]
+        count = np.where(known, state[:, _COUNT], 0).astype(np.int64)
+        prices_n = np.minimum(count, self.window)
+        returns_n = np.minimum(np.maximum(count - 1, 0), self.window)
+        price, prev, ema = state[:, _LAST], state[:, _PREV], state[:, _EMA]
+        gain, loss = state[:, _GAIN], state[:, _LOSS]
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            sma = state[:, _SUM_P] / prices_n
+            price_std = np.sqrt(np.maximum(state[:, _SUMSQ_P] / prices_n - sma * sma, 0.0))
+            mean_r = state[:, _SUM_R] / returns_n
+            volatility = np.sqrt(np.maximum(state[:, _SUMSQ_R] / returns_n - mean_r * mean_r, 0.0))
+            rsi = np.where(loss > 0, 100.0 - 100.0 / (1.0 + gain / loss), np.where(gain > 0, 100.0, 50.0))
+            zscore = np.where(price_std > 1e-12, (price - sma) / price_std, 0.0)
+            ret = np.where(prev != 0, price / prev - 1.0, 0.0)
+
+        seen, changed = count >= 1, count >= 2
+        nan = np.nan
+        return {
+            "price": np.where(seen, price, nan),
+            "sma": np.where(seen, sma, nan),
+            "ema": np.where(seen, ema, nan),
+            "ret": np.where(changed, ret, nan),
+            "volatility": np.where(changed, volatility, nan),
+            "rsi": np.where(changed, rsi, nan),
+            "zscore": np.where(seen, zscore, nan),
+            "count": count,
+        }
+
+    def summary(self, tickers, digits=4):
+        """Compact {ticker: {indicator: value}} for prompts and APIs; undefined indicators are left out."""
+        snapshot = self.snapshot(tickers)
+        columns = [(name, snapshot[name].tolist()) for name in INDICATORS]
+        result = {}
+        for i, ticker in enumerate(tickers):
+            values = {}
+            for name, column in columns:
+                value = column[i]
+                if value == value:  # not NaN
+                    values[name] = round(value, digits) if name != "count" else value
+            result[ticker] = values
+        return result
+
+
+def indicator_series(prices, window=INDICATOR_WINDOW, ema_span=INDICATOR_EMA_SPAN, rsi_period=INDICATOR_RSI_PERIOD):
+    """
+    Indicators after every point of one price series (e.g. a timeseries.py
+    window), as a dict of arrays as long as `prices`; same definitions as
+    IndicatorBook, for backfills and checks.
+    """
+    book = IndicatorBook(window, ema_span, rsi_period)
+    columns = {name: [] for name in INDICATORS}
+    for i, price in enumerate(np.asarray(prices, dtype=np.float64).tolist()):
+        book.update(["_"], [f"{i:012d}"], [price])
+        snapshot = book.snapshot(["_"])
+        for name in INDICATORS:
+            columns[name].append(snapshot[name][0])
+    return {name: np.asarray(values) for name, values in columns.items()}
+
+
+_book = None
+_book_lock = threading.Lock()
+
+def get_indicators():
+    """Return the process-wide indicator book, created on first use."""
+    global _book
+    if _book is None:
+        with _book_lock:
+            if _book is None:
+                _book = IndicatorBook()
+    return _book
@@ -0,0 +1,141 @@
+"""
+Latency budget for the LLM decision stage.
+
+A ChatGPT call runs on a bounded thread pool and the tick waits for it at most
+LLM_LATENCY_BUDGET_S. When the budget runs out the tick is decided by the
+fallback strategy instead (LLM_FALLBACK_STRATEGY: all-STAY by default, or a
+local strategy from strategies.py) and is not held up any longer. The call is
+left to finish in the background; when its answer arrives it is only recorded,
+next to the fallback decisions that were acted on, in LLM_LATE_ANSWER_FILE
+(JSON Lines, readable with recording.load_recording) for later comparison. A
+call that had not started yet (all LLM_MAX_CONCURRENCY workers busy) is
+cancelled instead.
+
+An LLM call that fails within the budget is decided by the same fallback. A
+budget of 0 disables the pool and calls the LLM inline, still falling back
+when it fails.
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from config import LLM_LATENCY_BUDGET_S, LLM_MAX_CONCURRENCY, LLM_LATE_ANSWER_FILE
+from recording import TickRecorder
+
+
+class LatencyBudget:
+    """Runs LLM calls on a bounded pool and falls back when they overrun the budget or fail."""
+
+    def __init__(self, budget_s=LLM_LATENCY_BUDGET_S, workers=LLM_MAX_CONCURRENCY,
+                 late_answer_file=LLM_LATE_ANSWER_FILE):
+        self.budget_s = budget_s
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="llm-call") if budget_s > 0 else None
+        self._late_answers = TickRecorder(late_answer_file) if late_answer_file else None
+        self._lock = threading.Lock()
+        self.decided = 0
+        self.llm = 0
+        self.fallback = 0
+        self.timed_out = 0
+        self.failed = 0
+        self.cancelled = 0
+        self.late_answers = 0
+        self.late_failed = 0
+
+    def run(self, tick_id, call, fallback):
+        """
+        Return (recommendations, outcome): call()'s answer and "llm" when it
+        answers within the budget, otherwise fallback() and "timeout" (over the
+        budget) or "error" (call() raised within it).
+
+        Raises:
+            Whatever fallback() raises
+        """
+        if self._executor is None:
+            try:
+                recommendations = call()
+            except Exception as e:
+                return self._fall_back(tick_id, fallback, "error", e), "error"
+            return self._answered(recommendations), "llm"
+
+        started = time.monotonic()
+        future = self._executor.submit(call)
+        if wait([future], timeout=self.budget_s).done:
+            if future.exception() is not None:
+                return self._fall_back(tick_id, fallback, "error", future.exception()), "error"
+            return self._answered(future.result()), "llm"
+
+        recommendations = self._fall_back(tick_id, fallback, "timeout")
+        # A call still queued behind busy workers is dropped instead of spending a ChatGPT call nobody waits for
+        if future.cancel():
+            with self._lock:
+                self.cancelled += 1
+        else:
+            future.add_done_callback(lambda done: self._late(tick_id, done, recommendations, started))
+        return recommendations, "timeout"
+
+    def _answered(self, recommendations):
+        with self._lock:
+            self.decided += 1
+            self.llm += 1
+        return recommendations
+
+    def _fall_back(self, tick_id, fallback, outcome, error=None):
+        if outcome == "timeout":
+            print(f"[WARNING] LLM over its {self.budget_s}s budget for tick {tick_id}; used fallback decisions")
+        else:
+            print(f"[WARNING] LLM call for tick {tick_id} failed: {error}; used fallback decisions")
+        recommendations = fallback()
+        with self._lock:
+            self.decided += 1
+            self.fallback += 1
+            if outcome == "timeout":
+                self.timed_out += 1
+            else:
+                self.failed += 1
+        return recommendations
+
+    def _late(self, tick_id, future, fallback_recommendations, started):
+        """Record the answer of a call that overran its budget; it is not acted on."""
+        latency_s = round(time.monotonic() - started, 3)
+        if future.exception() is not None:
+            with self._lock:
+                self.late_failed += 1
+            print(f"[WARNING] Late LLM call for tick {tick_id} failed after {latency_s}s: {future.exception()}")
+            return
+        with self._lock:
+            self.late_answers += 1
+        if self._late_answers is not None:
+            self._late_answers.record(tick_id, {
+                "latency_s": latency_s,
+                "budget_s": self.budget_s,
+                "llm": future.result(),
+                "fallback": fallback_recommendations,
+            })
+
+    def stats(self):
+        with self._lock:
+            return {
+                "budget_s": self.budget_s,
+                "decided": self.decided,
+                "llm": self.llm,
+                "fallback": self.fallback,
+                "fallback_rate": round(self.fallback / self.decided, 4) if self.decided else 0.0,
+                "timed_out": self.timed_out,
+                "failed": self.failed,
+                "cancelled": self.cancelled,
+                "late_answers": self.late_answers,
+                "late_failed": self.late_failed,
+            }
+
+
+_budget = None
+_budget_lock = threading.Lock()
+
+def get_latency_budget():
+    """Return the process-wide LLM latency budget, created on first use."""
+    global _budget
+    if _budget is None:
+        with _budget_lock:
+            if _budget is None:
+                _budget = LatencyBudget()
+    return _budget
@@ -0,0 +1,152 @@
+"""
+Cache of ChatGPT recommendations in front of the LLM call.
+
+Ticks that would produce the same prompt (same positions, market summary and
+history, in any order; see ai_integration.analysis_key) reuse the answer of
+the first one instead of calling the API again. Only answers that arrived
+within the latency budget (llm_budget.py) and were acted on are cached. Entries
+live in an in-memory LRU of LLM_CACHE_MAX_ENTRIES for LLM_CACHE_TTL_S seconds
+(0: no expiry).
+
+With LLM_CACHE_FILE set, every answer is also written to a SQLite file that
+later processes read on a memory miss, so the cache survives restarts and is
+shared by gunicorn workers. replay.py can answer from that file alone
+(--llm-cache) to backtest on real ChatGPT answers without any network.
+"""
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+import codec
+from config import LLM_CACHE_MAX_ENTRIES, LLM_CACHE_TTL_S, LLM_CACHE_FILE
+
+
+class LLMCache:
+    """LRU + TTL cache of recommendation lists by prompt key, with an optional SQLite tier."""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS llm_cache (
+            key TEXT PRIMARY KEY,
+            created_at REAL NOT NULL,
+            response TEXT NOT NULL
+        );
+    """
+
+    def __init__(self, max_entries=LLM_CACHE_MAX_ENTRIES, ttl=LLM_CACHE_TTL_S, db_file=LLM_CACHE_FILE):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.db_file = db_file
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        # key -> (created_at, recommendations), least recently used first
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        if db_file:
+            conn = self._connect()
+            conn.executescript(self.SCHEMA)
+            if ttl > 0:
+                conn.execute("DELETE FROM llm_cache WHERE created_at < ?", (time.time() - ttl,))
+
+    def _connect(self):
+        """One connection per thread; sqlite3 connections are not shareable."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_file, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=30000")
+            self._local.conn = conn
+        return conn
+
+    def _fresh(self, created_at):
+        return self.ttl <= 0 or time.time() - created_at < self.ttl
+
+    def get(self, key):
+        """Cached recommendations for key, or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if self._fresh(entry[0]):
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[1]
+                del self._entries[key]
+
+        if self.db_file:
+            try:
+                row = self._connect().execute(
+                    "SELECT created_at, response FROM llm_cache WHERE key = ?", (key,)
+                ).fetchone()
+            except sqlite3.Error as e:
+                print(f"[ERROR] LLM cache read failed: {str(e)}")
+                row = None
+            if row is not None and self._fresh(row[0]):
+                recommendations = codec.loads(row[1])
+                with self._lock:
+                    self.disk_hits += 1
+                    self._remember(key, row[0], recommendations)
+                return recommendations
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key, recommendations):
+        """Cache recommendations for key and return them."""
+        created_at = time.time()
+        with self._lock:
+            self.stores += 1
+            self._remember(key, created_at, recommendations)
+        if self.db_file:
+            try:
+                self._connect().execute(
+                    "INSERT OR REPLACE INTO llm_cache (key, created_at, response) VALUES (?, ?, ?)",
+                    (key, created_at, codec.dumps(recommendations)),
+                )
+            except sqlite3.Error as e:
+                print(f"[ERROR] LLM cache write failed: {str(e)}")
+        return recommendations
+
+    def _remember(self, key, created_at, recommendations):
+        """Insert into the LRU, evicting the least recently used; caller holds _lock."""
+        if self.max_entries <= 0:
+            return
+        self._entries[key] = (created_at, recommendations)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_s": self.ttl,
+                "disk": bool(self.db_file),
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": round((self.hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+                "stores": self.stores,
+                "evictions": self.evictions,
+            }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_llm_cache():
+    """Return the process-wide LLM response cache, created on first use."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = LLMCache()
+    return _cache
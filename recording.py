@@ -0,0 +1,73 @@
+"""
+Records incoming tick payloads for offline replay (see replay.py).
+
+With TICK_RECORD_FILE set, every valid tick accepted by /tick, /ticks or
+/ticks/stream is appended to that file as one JSON line:
+
+    {"tick_id": "...", "received_at": <unix time>, "payload": {...}}
+
+Each record is written with a single append, so several gunicorn workers can
+share one recording file.
+"""
+import os
+import threading
+import time
+
+import codec
+from config import TICK_RECORD_FILE
+
+
+class TickRecorder:
+    """Appends tick payloads to a JSON Lines recording."""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self.recorded = 0
+        self.errors = 0
+
+    def record(self, tick_id, payload):
+        line = codec.dumpb({"tick_id": tick_id, "received_at": time.time(), "payload": payload}) + b"\n"
+        try:
+            with self._lock:
+                # O_APPEND: one write per record, so processes never interleave within a line
+                fd = os.open(self.path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+                try:
+                    os.write(fd, line)
+                finally:
+                    os.close(fd)
+                self.recorded += 1
+        except OSError as e:
+            self.errors += 1
+            print(f"[ERROR] Failed to record tick {tick_id}: {str(e)}")
+
+
+def load_recording(path):
+    """
+    Reads a recording back as a list of (tick_id, payload) pairs in the
+    order they were received. Unreadable lines are skipped.
+    """
+    ticks = []
+    with open(path, "rb") as f:
+        for number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                record = codec.loads(line)
+                ticks.append((record["tick_id"], record["payload"]))
+            except (codec.JSONDecodeError, KeyError, TypeError):
+                print(f"[WARNING] Skipping unreadable recording line {number}")
+    return ticks
+
+
+_recorder = None
+_recorder_lock = threading.Lock()
+
+def get_recorder():
+    """Return the process-wide recorder, or None when TICK_RECORD_FILE is not set."""
+    global _recorder
+    if _recorder is None and TICK_RECORD_FILE:
+        with _recorder_lock:
+            if _recorder is None:
+                _recorder = TickRecorder(TICK_RECORD_FILE)
+    return _recorder
@@ -0,0 +1,404 @@
+"""
+Offline tick replay and backtesting.
+
+Replays a tick recording (see recording.py) through business.analyze_tick_payload
+as fast as possible. ChatGPT and make_trade are swapped for deterministic local
+stand-ins and persistence goes to an in-memory store, so a replay makes no
+network calls and leaves the real files alone.
+
+Two modes:
+- backtest (default): the book starts from the first recorded tick's positions
+  and then evolves only through the stand-in's own trades, filled by
+  SimulatedBroker at each tick's prices. The equity curve measures the
+  strategy.
+- --recorded-positions: every tick is replayed exactly as recorded, which
+  measures system throughput on real traffic.
+
+Usage:
+    python replay.py synthesize <recording.jsonl> [ticks] [seed]
+    python replay.py run <recording.jsonl> [--recorded-positions] [--curve equity.csv]
+        [--strategy momentum|mean_reversion|rsi] [--llm-cache llm_cache.db] [--reuse-epsilon 0.001]
+
+--llm-cache decides from the ChatGPT answers saved in an LLM_CACHE_FILE
+(llm_cache.py) and STAYs on ticks it has no answer for. Answers are keyed on
+the positions too, so hits mostly need --recorded-positions.
+
+--reuse-epsilon puts the decision reuse gate (decision_reuse.py) in front of
+the advisor, to see how many calls it saves and what reusing costs in return.
+It is off by default.
+"""
+import argparse
+import random
+import time
+from collections import deque, namedtuple
+from contextlib import contextmanager
+
+import business
+import llm_budget
+import llm_cache
+import decision_reuse
+import indicators
+import storage
+import timeseries
+from recording import load_recording
+from ai_integration import analysis_key
+from strategies import LLM_STRATEGY, STRATEGIES, get_strategy, stay_recommendations
+from validators import normalize_tick_payload
+
+STAGES = ("validate", "valuation", "decision", "make_trade", "persist", "total")
+
+ReplayReport = namedtuple("ReplayReport", [
+    "ticks",             # ticks replayed
+    "skipped",           # recorded ticks that failed validation
+    "elapsed_s",
+    "ticks_per_sec",
+    "stages",            # stage -> {"count", "mean_ms", "p50_ms", "p95_ms", "max_ms"}
+    "equity_curve",      # [(tick_id, equity)] after each tick
+    "start_equity",
+    "final_equity",
+    "return_pct",
+    "max_drawdown_pct",
+    "fills",             # trades filled by the simulated broker
+    "reused",            # ticks decided by reusing the previous decision (--reuse-epsilon)
+])
+
+
+def threshold_advisor(buy_below=0.98, sell_above=1.02, size=1.0, lookback=0):
+    """
+    Deterministic stand-in for get_chatgpt_analysis: BUY `size` of a holding
+    whose price is buy_below x its reference price or less, SELL `size` at
+    sell_above x the reference or more, STAY otherwise. The reference is the
+    position's cost, or with lookback > 0 the mean of the ticker's last
+    `lookback` prices seen by this advisor.
+    """
+    history = {}
+
+    def advise(tick):
+        prices = dict(zip(tick.market_tickers, tick.current_price))
+        if lookback > 0:
+            for ticker, price in prices.items():
+                window = history.setdefault(ticker, deque(maxlen=lookback))
+                window.append(price)
+        decisions = []
+        for ticker, quantity, cost in zip(tick.tickers, tick.quantity, tick.purchase_price):
+            price = prices.get(ticker)
+            if ticker == "CASH" or price is None or cost <= 0:
+                continue
+            if lookback > 0:
+                window = history[ticker]
+                cost = sum(window) / len(window)
+            if price <= cost * buy_below:
+                decisions.append({"action": "BUY", "ticker": ticker, "quantity": size})
+            elif price >= cost * sell_above and quantity > 0:
+                decisions.append({"action": "SELL", "ticker": ticker, "quantity": min(size, quantity)})
+            else:
+                decisions.append({"action": "STAY", "ticker": ticker, "quantity": 0})
+        return decisions
+    return advise
+
+
+class SimulatedBroker:
+    """
+    Deterministic stand-in for make_trade: fills trades at the current tick's
+    prices against an in-memory book (BUYs are capped by available cash,
+    SELLs by the quantity held) and answers with the updated Positions, as
+    the real endpoint does.
+    """
+
+    def __init__(self, tick):
+        self.cash = 0.0
+        self.holdings = {}  # ticker -> [quantity, average cost]
+        for ticker, quantity, cost in zip(tick.tickers, tick.quantity, tick.purchase_price):
+            if ticker == "CASH":
+                self.cash += quantity * cost
+            else:
+                self.holdings[ticker] = [quantity, cost]
+        self.prices = {}
+        self.fills = 0
+
+    def mark(self, tick):
+        """Take the prices of the tick about to be processed."""
+        self.prices = dict(zip(tick.market_tickers, tick.current_price))
+
+    def make_trade(self, tick_id, trades):
+        for trade in trades:
+            ticker = trade.get("ticker")
+            price = self.prices.get(ticker)
+            try:
+                quantity = float(trade.get("quantity", 0))
+            except (TypeError, ValueError):
+                continue
+            if price is None or price <= 0 or quantity <= 0:
+                continue
+            if trade.get("action") == "BUY":
+                quantity = min(quantity, self.cash / price)
+                if quantity <= 0:
+                    continue
+                held, cost = self.holdings.get(ticker, (0.0, 0.0))
+                self.holdings[ticker] = [held + quantity, (held * cost + quantity * price) / (held + quantity)]
+                self.cash -= quantity * price
+                self.fills += 1
+            elif trade.get("action") == "SELL" and ticker in self.holdings:
+                held, cost = self.holdings[ticker]
+                quantity = min(quantity, held)
+                if held - quantity > 0:
+                    self.holdings[ticker] = [held - quantity, cost]
+                else:
+                    del self.holdings[ticker]
+                self.cash += quantity * price
+                self.fills += 1
+        return {"Positions": self.positions()}
+
+    def positions(self):
+        positions = [{"ticker": "CASH", "quantity": round(self.cash, 2), "purchase_price": 1.0}]
+        positions.extend(
+            {"ticker": ticker, "quantity": quantity, "purchase_price": round(cost, 4)}
+            for ticker, (quantity, cost) in sorted(self.holdings.items())
+        )
+        return positions
+
+    def equity(self):
+        """Cash plus holdings at the latest prices (cost when a ticker has no price)."""
+        return self.cash + sum(quantity * self.prices.get(ticker, cost)
+                               for ticker, (quantity, cost) in self.holdings.items())
+
+
+class StageTimer:
+    """Collects per-stage wall times and wraps functions so each call is timed."""
+
+    def __init__(self):
+        self.samples = {stage: [] for stage in STAGES}
+
+    def wrap(self, stage, fn):
+        samples = self.samples[stage]
+
+        def timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                samples.append(time.perf_counter() - started)
+        return timed
+
+    def summary(self):
+        summary = {}
+        for stage, samples in self.samples.items():
+            if not samples:
+                continue
+            ordered = sorted(samples)
+            summary[stage] = {
+                "count": len(ordered),
+                "mean_ms": round(sum(ordered) / len(ordered) * 1000.0, 4),
+                "p50_ms": round(ordered[len(ordered) // 2] * 1000.0, 4),
+                "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000.0, 4),
+                "max_ms": round(ordered[-1] * 1000.0, 4),
+            }
+        return summary
+
+
+@contextmanager
+def patched(module, **replacements):
+    """Temporarily replace module attributes."""
+    originals = {name: getattr(module, name) for name in replacements}
+    for name, value in replacements.items():
+        setattr(module, name, value)
+    try:
+        yield
+    finally:
+        for name, value in originals.items():
+            setattr(module, name, value)
+
+
+def replay(ticks, advisor=None, recorded_positions=False, reuse_epsilon=0.0):
+    """
+    Replays (tick_id, payload) pairs through analyze_tick_payload with local
+    stand-ins for ChatGPT and make_trade and an in-memory store.
+
+    Args:
+        ticks: recorded (tick_id, payload) pairs, in order
+        advisor: decision stand-in taking a Tick (default threshold_advisor()),
+            e.g. a local strategy from strategies.py
+        recorded_positions: replay each payload as recorded instead of
+            carrying the simulated book from tick to tick
+        reuse_epsilon: relative price move under which the previous
+            decision is reused instead of asking the advisor (0: always ask)
+
+    Returns:
+        ReplayReport
+    """
+    advisor = advisor or threshold_advisor()
+    timer = StageTimer()
+    broker = None
+    curve = []
+    skipped = 0
+    reuse = decision_reuse.DecisionReuse(epsilon=reuse_epsilon, max_age=0)
+
+    previous = storage.use_store(storage.MemoryStore(keep_log=False))
+    try:
+        # No latency budget (the stand-in answers at once; a thread hop per tick would skew timings),
+        # no LLM answer cache (the stand-in is not ChatGPT), decision reuse only when asked for and
+        # fresh in-memory price history and indicators, so strategies only see the recording
+        with patched(llm_budget, _budget=llm_budget.LatencyBudget(budget_s=0, late_answer_file="")), \
+                patched(llm_cache, _cache=llm_cache.LLMCache(max_entries=0, db_file="")), \
+                patched(decision_reuse, _reuse=reuse), \
+                patched(timeseries, _timeseries=timeseries.TimeSeriesStore(path="")), \
+                patched(indicators, _book=indicators.IndicatorBook()), patched(
+            business,
+            get_chatgpt_analysis=timer.wrap("decision", advisor),
+            post_to_make_trade=timer.wrap("make_trade", lambda tick_id, trades: broker.make_trade(tick_id, trades)),
+            evaluate_tick=timer.wrap("valuation", business.evaluate_tick),
+            persist_tick=timer.wrap("persist", business.persist_tick),
+        ):
+            validate = timer.wrap("validate", normalize_tick_payload)
+            analyze = timer.wrap("total", business.analyze_tick_payload)
+            started = time.perf_counter()
+            for tick_id, payload in ticks:
+                if broker is not None and not recorded_positions:
+                    payload = {**payload, "Positions": broker.positions()}
+                    payload.pop("positions", None)
+                tick, errors = validate(payload)
+                if errors:
+                    skipped += 1
+                    continue
+                if broker is None:
+                    broker = SimulatedBroker(tick)
+                broker.mark(tick)
+                # The advisor stands in for ChatGPT, so it runs whatever STRATEGY is configured
+                analyze(tick, tick_id, LLM_STRATEGY)
+                curve.append((tick_id, round(broker.equity(), 2)))
+            elapsed = time.perf_counter() - started
+    finally:
+        storage.use_store(*previous)
+
+    start_equity = curve[0][1] if curve else 0.0
+    final_equity = curve[-1][1] if curve else 0.0
+    peak, max_drawdown = float("-inf"), 0.0
+    for _, equity in curve:
+        peak = max(peak, equity)
+        if peak > 0:
+            max_drawdown = max(max_drawdown, (peak - equity) / peak)
+
+    return ReplayReport(
+        ticks=len(curve),
+        skipped=skipped,
+        elapsed_s=round(elapsed, 4),
+        ticks_per_sec=round(len(curve) / elapsed, 1) if elapsed > 0 else 0.0,
+        stages=timer.summary(),
+        equity_curve=curve,
+        start_equity=start_equity,
+        final_equity=final_equity,
+        return_pct=round((final_equity / start_equity - 1) * 100.0, 4) if start_equity else 0.0,
+        max_drawdown_pct=round(max_drawdown * 100.0, 4),
+        fills=broker.fills if broker is not None else 0,
+        reused=reuse.reused,
+    )
+
+
+def cached_advisor(db_file):
+    """
+    Decides from the ChatGPT answers saved in an LLM cache file, looked up by
+    the tick's prompt key; STAY for every position on a miss.
+    """
+    cache = llm_cache.LLMCache(max_entries=0, ttl=0, db_file=db_file)
+
+    def advise(tick):
+        recommendations = cache.get(analysis_key(tick))
+        return recommendations if recommendations is not None else stay_recommendations(tick)
+    advise.cache = cache
+    return advise
+
+
+def synthesize_recording(path, ticks=1000, seed=7):
+    """
+    Writes a synthetic recording: the assign7_tester sample tick with every
+    price following a seeded random walk (about 1% daily moves) and a two-day
+    market_history, one tick per simulated day.
+    """
+    from assign7_tester import make_payload
+    from recording import TickRecorder
+
+    rng = random.Random(seed)
+    base = make_payload()
+    prices = {item["ticker"]: item["current_price"] for item in base["Market_Summary"]}
+    categories = {item["ticker"]: item["category"] for item in base["Market_Summary"]}
+    previous = dict(prices)
+    open(path, "wb").close()
+    recorder = TickRecorder(path)
+    for day in range(ticks):
+        for ticker in prices:
+            previous[ticker] = prices[ticker]
+            prices[ticker] = round(max(1.0, prices[ticker] * (1 + rng.gauss(0.0003, 0.01))), 2)
+        payload = {
+            "Positions": base["Positions"],
+            "Market_Summary": [
+                {"ticker": t, "current_price": p, "category": categories[t]} for t, p in prices.items()
+            ],
+            "market_history": [
+                {"ticker": t, "price": price, "day": f"day-{day + offset}"}
+                for t in prices for offset, price in ((-1, previous[t]), (0, prices[t]))
+            ],
+        }
+        recorder.record(f"synthetic-{seed}-{day}", payload)
+
+
+def print_report(report):
+    print(f"Replayed {report.ticks} ticks in {report.elapsed_s:.3f}s ({report.ticks_per_sec:,.1f} ticks/s)"
+          + (f", skipped {report.skipped} invalid" if report.skipped else ""))
+    print(f"\n{'stage':<11} | {'count':>7} | {'mean ms':>9} | {'p50 ms':>9} | {'p95 ms':>9} | {'max ms':>9}")
+    for stage in STAGES:
+        if stage in report.stages:
+            s = report.stages[stage]
+            print(f"{stage:<11} | {s['count']:>7} | {s['mean_ms']:>9.4f} | {s['p50_ms']:>9.4f} | "
+                  f"{s['p95_ms']:>9.4f} | {s['max_ms']:>9.4f}")
+    print(f"\nEquity: {report.start_equity:,.2f} -> {report.final_equity:,.2f} "
+          f"({report.return_pct:+.2f}%), max drawdown {report.max_drawdown_pct:.2f}%, {report.fills} fills")
+    if report.reused:
+        print(f"Reused the previous decision on {report.reused} of {report.ticks} ticks "
+              f"({report.reused / report.ticks:.1%})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline tick replay and backtesting")
+    commands = parser.add_subparsers(dest="command", required=True)
+    synth = commands.add_parser("synthesize", help="write a synthetic tick recording")
+    synth.add_argument("recording")
+    synth.add_argument("ticks", nargs="?", type=int, default=1000)
+    synth.add_argument("seed", nargs="?", type=int, default=7)
+    run = commands.add_parser("run", help="replay a recording")
+    run.add_argument("recording")
+    run.add_argument("--recorded-positions", action="store_true",
+                     help="replay positions as recorded instead of the simulated book")
+    run.add_argument("--curve", help="write the equity curve to this CSV file")
+    run.add_argument("--reuse-epsilon", type=float, default=0.0,
+                     help="reuse the previous decision while prices move less than this (relative)")
+    strategy = run.add_mutually_exclusive_group()
+    strategy.add_argument("--strategy", choices=list(STRATEGIES),
+                          help="decide with this local strategy instead of the threshold advisor")
+    strategy.add_argument("--llm-cache", metavar="FILE",
+                          help="decide with the ChatGPT answers saved in this LLM cache file")
+    args = parser.parse_args()
+
+    if args.command == "synthesize":
+        synthesize_recording(args.recording, args.ticks, args.seed)
+        print(f"Wrote {args.ticks} synthetic ticks to {args.recording}")
+        return
+
+    if args.llm_cache:
+        advisor = cached_advisor(args.llm_cache)
+    else:
+        advisor = get_strategy(args.strategy) if args.strategy else None
+    report = replay(load_recording(args.recording), advisor, recorded_positions=args.recorded_positions,
+                    reuse_epsilon=args.reuse_epsilon)
+    print_report(report)
+    if args.llm_cache:
+        cache = advisor.cache.stats()
+        print(f"LLM cache: {cache['disk_hits']} answers found, {cache['misses']} ticks without one (STAY)")
+    if args.curve:
+        with open(args.curve, "w") as f:
+            f.write("tick_id,equity\n")
+            f.writelines(f"{tick_id},{equity}\n" for tick_id, equity in report.equity_curve)
+        print(f"Equity curve written to {args.curve}")
+
+
+if __name__ == "__main__":
+    main()
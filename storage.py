@@ -0,0 +1,910 @@
+"""
+Persistence engines for positions and the trading log.
+
+STORAGE_ENGINE=file (default) keeps the original text files: a JSON positions
+file and a JSON Lines trading log. STORAGE_ENGINE=sqlite stores both in a
+WAL-mode SQLite database so dashboard readers never block the tick writer and
+queries stay indexed as the log grows.
+
+Both engines expose the same interface:
+    read_positions()            -> list of position dicts
+    read_trading_log()          -> list of log entry dicts, oldest first
+    read_log_page(before, limit)-> newest-first (id, entry) pairs plus next cursor
+    query_log(ticker, action, start_date, end_date, before, limit)
+                                -> the same, filtered through secondary indexes
+    count_trading_log()         -> number of log entries
+    write(positions, entries)   -> persist one tick's changes as a unit
+
+MemoryStore implements the same interface in process memory for replays and
+backtests (see use_store()).
+"""
+import atexit
+import bisect
+import heapq
+import itertools
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+import codec
+from config import (
+    STORAGE_ENGINE, SQLITE_DB_FILE, GROUP_COMMIT_WINDOW_MS,
+    PERSIST_WRITER, PERSIST_DURABILITY, PERSIST_QUEUE_SIZE,
+)
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+POSITIONS_FILE = os.path.join(CURRENT_DIR, "Assignment6PositionsSample.txt")
+TRADING_LOG_FILE = os.path.join(CURRENT_DIR, "Assignment6TradingLogSample.txt")
+
+
+class _InterProcessLock:
+    """
+    Exclusive lock on a side file, held across processes (flock on POSIX,
+    msvcrt.locking on Windows) so several gunicorn workers can share the
+    text files. A thread lock is taken first because flock does not
+    serialize threads of the same process.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._thread_lock = threading.Lock()
+        self._fd = None
+
+    def __enter__(self):
+        self._thread_lock.acquire()
+        try:
+            self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            if fcntl is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_EX)
+            else:
+                while True:
+                    try:
+                        msvcrt.locking(self._fd, msvcrt.LK_LOCK, 1)
+                        break
+                    except OSError:
+                        # LK_LOCK gives up after ~10s of contention; keep waiting
+                        continue
+        except Exception:
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
+            self._thread_lock.release()
+            raise
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            if fcntl is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+            else:
+                os.lseek(self._fd, 0, os.SEEK_SET)
+                msvcrt.locking(self._fd, msvcrt.LK_UNLCK, 1)
+        finally:
+            os.close(self._fd)
+            self._fd = None
+            self._thread_lock.release()
+
+
+def _file_key(path):
+    """(inode, mtime_ns, size) of a file, or None when it does not exist."""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+
+class _CachingStore:
+    """
+    Process-level read cache shared by both engines.
+
+    Parsed positions and log entries stay in memory and are only revalidated
+    when the backing file's mtime/size changes (another process wrote) or
+    when this process's writer bumps the version counter. Readers get a
+    shallow copy of the cached list.
+    """
+
+    def __init__(self):
+        self._versions = itertools.count(1)
+        self.version = 0
+        self._cache_lock = threading.Lock()
+        self._cache_hits = 0
+        self._cache_misses = 0
+        self._positions = []
+        self._positions_key = None
+        self._log = []
+        self._log_key = None
+
+    def _bump_version(self):
+        self.version = next(self._versions)
+
+    def _cached(self, key_attr, key):
+        """Count a hit or miss for `key` against the stored key; caller holds _cache_lock."""
+        if getattr(self, key_attr) == key:
+            self._cache_hits += 1
+            return True
+        self._cache_misses += 1
+        return False
+
+    def cache_stats(self):
+        with self._cache_lock:
+            total = self._cache_hits + self._cache_misses
+            return {
+                "hits": self._cache_hits,
+                "misses": self._cache_misses,
+                "hit_rate": round(self._cache_hits / total, 4) if total else 0.0,
+                "version": self.version,
+            }
+
+
+class FileStore(_CachingStore):
+    """Positions in a JSON file, trading log as append-only JSON Lines."""
+
+    def __init__(self, positions_file=POSITIONS_FILE, log_file=TRADING_LOG_FILE, fsync=False):
+        super().__init__()
+        self.positions_file = positions_file
+        self.log_file = log_file
+        self.fsync = fsync
+        self._migrated = False
+        self._migrate_lock = threading.Lock()
+        self._lock = _InterProcessLock(log_file + ".lock")
+        self._reset_log_cache()
+
+    def read_positions(self):
+        file_key = _file_key(self.positions_file)
+        key = (file_key, self.version)
+        with self._cache_lock:
+            if not self._cached("_positions_key", key):
+                positions = []
+                if file_key is not None:
+                    with open(self.positions_file, "rb") as f:
+                        positions = codec.loads(f.read())
+                self._positions, self._positions_key = positions, key
+            return list(self._positions)
+
+    def read_trading_log(self):
+        with self._cache_lock:
+            return list(self._refresh_log())
+
+    def read_log_page(self, before=None, limit=50):
+        """
+        Newest-first page of (id, entry) pairs with id < before. Ids are
+        1-based line numbers, so a page is a slice of the cached log.
+        """
+        with self._cache_lock:
+            log = self._refresh_log()
+            end = len(log) if before is None else max(0, min(before - 1, len(log)))
+            start = max(0, end - limit)
+            items = [(i + 1, log[i]) for i in range(end - 1, start - 1, -1)]
+        return items, (start + 1 if start > 0 else None)
+
+    def count_trading_log(self):
+        with self._cache_lock:
+            return len(self._refresh_log())
+
+    def _refresh_log(self):
+        """Bring the cached log up to date and return it; caller holds _cache_lock."""
+        self._migrate()
+        file_key = _file_key(self.log_file)
+        key = (file_key, self.version)
+        if not self._cached("_log_key", key):
+            previous = self._log_key[0] if self._log_key else None
+            # Same inode and not shorter: the log was only appended to, so
+            # parse just the new tail. Anything else means a full reload.
+            if not (previous and file_key and previous[0] == file_key[0] and file_key[2] >= self._log_offset):
+                self._reset_log_cache()
+            if file_key is not None:
+                self._read_log_tail()
+            self._log_key = key
+        return self._log
+
+    def _read_log_tail(self):
+        with open(self.log_file, "rb") as f:
+            f.seek(self._log_offset)
+            chunk = f.read()
+        # Only consume complete lines; an append still in progress is picked up next time
+        end = chunk.rfind(b"\n") + 1
+        for line in chunk[:end].splitlines():
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                entry = codec.loads(line)
+            except (codec.JSONDecodeError, UnicodeDecodeError):
+                print(f"[WARNING] Skipping unreadable trading log line: {line[:80]!r}")
+                continue
+            self._log.append(entry)
+            self._index_entry(len(self._log), entry)
+        self._log_offset += end
+
+    def _reset_log_cache(self):
+        self._log = []
+        self._log_offset = 0
+        # Secondary indexes: value -> ascending list of entry ids
+        self._by_ticker = {}
+        self._by_action = {}
+        self._by_date = {}
+        self._dates = []
+
+    def _index_entry(self, entry_id, entry):
+        self._by_ticker.setdefault(entry.get("ticker"), []).append(entry_id)
+        self._by_action.setdefault(entry.get("action"), []).append(entry_id)
+        date = entry.get("date")
+        if isinstance(date, str):
+            if date not in self._by_date:
+                self._by_date[date] = []
+                bisect.insort(self._dates, date)
+            self._by_date[date].append(entry_id)
+
+    def query_log(self, ticker=None, action=None, start_date=None, end_date=None, before=None, limit=100):
+        """
+        Newest-first (id, entry) pairs matching every given filter, with id < before.
+
+        The smallest of the per-ticker, per-action and date-range id lists
+        drives the scan and the remaining filters are checked on each
+        candidate, so the cost follows the size of the most selective filter
+        rather than the size of the log.
+        """
+        if ticker is None and action is None and start_date is None and end_date is None:
+            return self.read_log_page(before=before, limit=limit)
+
+        with self._cache_lock:
+            log = self._refresh_log()
+            candidates = []
+            if ticker is not None:
+                candidates.append(self._by_ticker.get(ticker, []))
+            if action is not None:
+                candidates.append(self._by_action.get(action, []))
+            if start_date is not None or end_date is not None:
+                lo = bisect.bisect_left(self._dates, start_date) if start_date is not None else 0
+                hi = bisect.bisect_right(self._dates, end_date) if end_date is not None else len(self._dates)
+                date_lists = [self._by_date[date] for date in self._dates[lo:hi]]
+                # Only materialize the merged date range if it is the most selective filter
+                if not candidates or sum(len(ids) for ids in date_lists) < min(len(ids) for ids in candidates):
+                    candidates.append(list(heapq.merge(*date_lists)))
+            driver = min(candidates, key=len)
+
+            def matches(entry):
+                date = entry.get("date")
+                return (
+                    (ticker is None or entry.get("ticker") == ticker)
+                    and (action is None or entry.get("action") == action)
+                    and (start_date is None or (isinstance(date, str) and date >= start_date))
+                    and (end_date is None or (isinstance(date, str) and date <= end_date))
+                )
+
+            stop = len(driver) if before is None else bisect.bisect_left(driver, before)
+            items = []
+            for i in range(stop - 1, -1, -1):
+                entry_id = driver[i]
+                entry = log[entry_id - 1]
+                if matches(entry):
+                    if len(items) == limit:
+                        return items, items[-1][0]
+                    items.append((entry_id, entry))
+        return items, None
+
+    def write(self, positions=None, entries=()):
+        """
+        Append all entries in a single write() and replace the positions file.
+        The whole write holds the cross-process lock, so concurrent workers
+        never interleave appends. Positions go through a per-process temp
+        file + rename so readers never see a half-written file. With
+        fsync=True both files are fsynced before returning.
+        """
+        self._migrate()
+        with self._lock:
+            if entries:
+                with open(self.log_file, "ab") as f:
+                    f.write(b"".join(codec.dumpb(entry) + b"\n" for entry in entries))
+                    if self.fsync:
+                        f.flush()
+                        os.fsync(f.fileno())
+
+            if positions is not None:
+                tmp_file = f"{self.positions_file}.{os.getpid()}.tmp"
+                with open(tmp_file, "wb") as f:
+                    f.write(codec.dumpb(positions))
+                    if self.fsync:
+                        f.flush()
+                        os.fsync(f.fileno())
+                os.replace(tmp_file, self.positions_file)
+
+        self._bump_version()
+
+    def _migrate(self):
+        """
+        One-time conversion of the legacy trading log (a single JSON array
+        written with indent=2) into newline-delimited JSON. Runs at most once
+        per store; files already in JSON Lines format are left untouched.
+        """
+        if self._migrated:
+            return
+        with self._migrate_lock:
+            if not self._migrated:
+                # Another worker may be migrating; the format is re-checked under the lock
+                with self._lock:
+                    self._migrate_legacy_log()
+                self._migrated = True
+
+    def _migrate_legacy_log(self):
+        if not os.path.exists(self.log_file):
+            return
+
+        try:
+            with open(self.log_file, "r") as f:
+                head = f.read(64).lstrip()
+                if not head.startswith("["):
+                    return
+                f.seek(0)
+                legacy_log = codec.loads(f.read())
+        except Exception as e:
+            print(f"[ERROR] Failed to read legacy trading log for migration: {str(e)}")
+            return
+
+        # Write to a temp file and swap it in so a crash never leaves a half-migrated log
+        tmp_file = f"{self.log_file}.{os.getpid()}.migrating"
+        try:
+            with open(tmp_file, "wb") as f:
+                f.write(b"".join(codec.dumpb(entry) + b"\n" for entry in legacy_log))
+            os.replace(tmp_file, self.log_file)
+            print(f"[INFO] Migrated {len(legacy_log)} trading log entries to JSON Lines format")
+        except Exception as e:
+            print(f"[ERROR] Failed to migrate trading log: {str(e)}")
+
+
+class SQLiteStore(_CachingStore):
+    """
+    Positions and trading log in one SQLite database.
+
+    WAL journaling lets any number of readers run alongside the single writer,
+    and each write() is one transaction, so a tick's log entries and position
+    snapshot land together or not at all. date, ticker and action are real
+    columns with their own indexes; the full entry is kept as JSON so values
+    such as price "N/A" round-trip unchanged.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS positions (
+            seq      INTEGER PRIMARY KEY,
+            ticker   TEXT,
+            position TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS trading_log (
+            id     INTEGER PRIMARY KEY AUTOINCREMENT,
+            date   TEXT,
+            ticker TEXT,
+            action TEXT,
+            entry  TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_trading_log_ticker ON trading_log (ticker);
+        CREATE INDEX IF NOT EXISTS idx_trading_log_date ON trading_log (date);
+        CREATE INDEX IF NOT EXISTS idx_trading_log_action ON trading_log (action);
+    """
+
+    def __init__(self, db_file=SQLITE_DB_FILE, import_from=None, fsync=False):
+        super().__init__()
+        self.db_file = db_file
+        self.fsync = fsync
+        self._local = threading.local()
+        self._log_last_id = 0
+        conn = self._connect()
+        conn.executescript(self.SCHEMA)
+        if import_from is not None:
+            self._import_if_empty(import_from)
+
+    def _connect(self):
+        """One connection per thread; sqlite3 connections are not shareable."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_file, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            # NORMAL is crash-safe in WAL mode but may drop the last commits on
+            # power loss; FULL fsyncs the WAL on every commit
+            conn.execute("PRAGMA synchronous=FULL" if self.fsync else "PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=30000")
+            self._local.conn = conn
+        return conn
+
+    def _cache_key(self):
+        # Commits from any connection touch the WAL file (or the main file after a checkpoint)
+        return (_file_key(self.db_file), _file_key(self.db_file + "-wal"), self.version)
+
+    def read_positions(self):
+        key = self._cache_key()
+        with self._cache_lock:
+            if not self._cached("_positions_key", key):
+                rows = self._connect().execute("SELECT position FROM positions ORDER BY seq")
+                self._positions = [codec.loads(position) for (position,) in rows]
+                self._positions_key = key
+            return list(self._positions)
+
+    def read_trading_log(self):
+        key = self._cache_key()
+        with self._cache_lock:
+            if not self._cached("_log_key", key):
+                # Rows are append-only, so only fetch what was added since the last read
+                rows = self._connect().execute(
+                    "SELECT id, entry FROM trading_log WHERE id > ? ORDER BY id", (self._log_last_id,)
+                )
+                for row_id, entry in rows:
+                    self._log.append(codec.loads(entry))
+                    self._log_last_id = row_id
+                self._log_key = key
+            return list(self._log)
+
+    def read_log_page(self, before=None, limit=50):
+        """Newest-first page of (id, entry) pairs with id < before, walked on the primary key."""
+        conn = self._connect()
+        if before is None:
+            rows = conn.execute("SELECT id, entry FROM trading_log ORDER BY id DESC LIMIT ?", (limit,))
+        else:
+            rows = conn.execute(
+                "SELECT id, entry FROM trading_log WHERE id < ? ORDER BY id DESC LIMIT ?", (before, limit)
+            )
+        items = [(row_id, codec.loads(entry)) for row_id, entry in rows]
+        has_more = len(items) == limit and conn.execute(
+            "SELECT 1 FROM trading_log WHERE id < ? LIMIT 1", (items[-1][0],)
+        ).fetchone()
+        return items, (items[-1][0] if has_more else None)
+
+    def query_log(self, ticker=None, action=None, start_date=None, end_date=None, before=None, limit=100):
+        """Newest-first (id, entry) pairs matching every given filter, answered from the column indexes."""
+        clauses = []
+        params = []
+        for column, op, value in (
+            ("ticker", "=", ticker), ("action", "=", action),
+            ("date", ">=", start_date), ("date", "<=", end_date), ("id", "<", before),
+        ):
+            if value is not None:
+                clauses.append(f"{column} {op} ?")
+                params.append(value)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        rows = self._connect().execute(
+            f"SELECT id, entry FROM trading_log {where} ORDER BY id DESC LIMIT ?", (*params, limit + 1)
+        ).fetchall()
+        items = [(row_id, codec.loads(entry)) for row_id, entry in rows[:limit]]
+        return items, (items[-1][0] if len(rows) > limit else None)
+
+    def count_trading_log(self):
+        # Rows are never deleted, so the largest id is the row count (and is an index lookup)
+        (count,) = self._connect().execute("SELECT COALESCE(MAX(id), 0) FROM trading_log").fetchone()
+        return count
+
+    def write(self, positions=None, entries=()):
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._insert(conn, positions, entries)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        self._bump_version()
+
+    @staticmethod
+    def _insert(conn, positions, entries):
+        if entries:
+            conn.executemany(
+                "INSERT INTO trading_log (date, ticker, action, entry) VALUES (?, ?, ?, ?)",
+                [
+                    (entry.get("date"), entry.get("ticker"), entry.get("action"), codec.dumps(entry))
+                    for entry in entries
+                ],
+            )
+        if positions is not None:
+            conn.execute("DELETE FROM positions")
+            conn.executemany(
+                "INSERT INTO positions (seq, ticker, position) VALUES (?, ?, ?)",
+                [(seq, pos.get("ticker"), codec.dumps(pos)) for seq, pos in enumerate(positions)],
+            )
+
+    def _import_if_empty(self, file_store):
+        """
+        Seed a brand-new database from the existing text files. The emptiness
+        check and the import share one write transaction, so when several
+        workers start at once only the first one imports.
+        """
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            has_log = conn.execute("SELECT 1 FROM trading_log LIMIT 1").fetchone()
+            has_positions = conn.execute("SELECT 1 FROM positions LIMIT 1").fetchone()
+            positions, log = [], []
+            if not (has_log or has_positions):
+                try:
+                    positions = file_store.read_positions()
+                    log = file_store.read_trading_log()
+                except Exception as e:
+                    print(f"[ERROR] Failed to read text files for SQLite import: {str(e)}")
+                self._insert(conn, positions or None, log)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        if positions or log:
+            self._bump_version()
+            print(f"[INFO] Imported {len(positions)} positions and {len(log)} log entries into SQLite")
+
+
+class MemoryStore(_CachingStore):
+    """
+    Positions and trading log kept in process memory, for replays and
+    backtests that must not touch the real files. With keep_log=False log
+    entries are only counted, so long runs do not grow without bound.
+    """
+
+    def __init__(self, positions=None, keep_log=True):
+        super().__init__()
+        self.keep_log = keep_log
+        self._positions = list(positions or [])
+        self._entry_count = 0
+        self._lock = threading.Lock()
+
+    def read_positions(self):
+        with self._lock:
+            return list(self._positions)
+
+    def read_trading_log(self):
+        with self._lock:
+            return list(self._log)
+
+    def read_log_page(self, before=None, limit=50):
+        return self.query_log(before=before, limit=limit)
+
+    def query_log(self, ticker=None, action=None, start_date=None, end_date=None, before=None, limit=100):
+        """Newest-first (id, entry) pairs matching every given filter; a plain scan."""
+        with self._lock:
+            end = len(self._log) if before is None else max(0, min(before - 1, len(self._log)))
+            items = []
+            for i in range(end - 1, -1, -1):
+                entry = self._log[i]
+                date = entry.get("date")
+                if (
+                    (ticker is None or entry.get("ticker") == ticker)
+                    and (action is None or entry.get("action") == action)
+                    and (start_date is None or (isinstance(date, str) and date >= start_date))
+                    and (end_date is None or (isinstance(date, str) and date <= end_date))
+                ):
+                    if len(items) == limit:
+                        return items, items[-1][0]
+                    items.append((i + 1, entry))
+        return items, None
+
+    def count_trading_log(self):
+        with self._lock:
+            return self._entry_count
+
+    def write(self, positions=None, entries=()):
+        with self._lock:
+            if entries:
+                self._entry_count += len(entries)
+                if self.keep_log:
+                    self._log.extend(entries)
+            if positions is not None:
+                self._positions = list(positions)
+        self._bump_version()
+
+
+class _Batch:
+    """One caller's pending write, completed when its group flush finishes."""
+    __slots__ = ("positions", "entries", "done", "error")
+
+    def __init__(self, positions, entries):
+        self.positions = positions
+        self.entries = entries
+        self.done = threading.Event()
+        self.error = None
+
+
+class _FlushStats:
+    """Counters shared by both writers, reported through stats()."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.flushes = 0
+        self.batches_written = 0
+        self.entries_written = 0
+        self.errors = 0
+        self.last_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+        self.total_flush_ms = 0.0
+
+    def record(self, group, entries, elapsed_ms, failed):
+        with self._lock:
+            self.flushes += 1
+            self.batches_written += len(group)
+            self.entries_written += len(entries)
+            self.errors += 1 if failed else 0
+            self.last_flush_ms = elapsed_ms
+            self.max_flush_ms = max(self.max_flush_ms, elapsed_ms)
+            self.total_flush_ms += elapsed_ms
+
+    def as_dict(self):
+        with self._lock:
+            return {
+                "flushes": self.flushes,
+                "batches_written": self.batches_written,
+                "entries_written": self.entries_written,
+                "errors": self.errors,
+                "last_flush_ms": round(self.last_flush_ms, 3),
+                "max_flush_ms": round(self.max_flush_ms, 3),
+                "avg_flush_ms": round(self.total_flush_ms / self.flushes, 3) if self.flushes else 0.0,
+            }
+
+
+def _flush_group(store, group, flush_stats):
+    """
+    Merge pending batches into one store.write(): entries concatenated in
+    arrival order, latest positions snapshot wins. Every batch in the group
+    is marked done with the shared outcome.
+    """
+    positions = None
+    entries = []
+    for batch in group:
+        if batch.positions is not None:
+            positions = batch.positions
+        entries.extend(batch.entries)
+
+    error = None
+    started = time.perf_counter()
+    try:
+        store.write(positions=positions, entries=entries)
+    except Exception as e:
+        error = e
+        print(f"[ERROR] Persistence flush failed: {str(e)}")
+    flush_stats.record(group, entries, (time.perf_counter() - started) * 1000.0, error is not None)
+
+    for batch in group:
+        batch.error = error
+        batch.done.set()
+
+
+class GroupCommitter:
+    """
+    Coalesces writes from concurrent ticks into a single store.write(),
+    flushing on the caller's own thread (PERSIST_WRITER=inline).
+
+    The first caller to arrive while no flush is running becomes the leader:
+    it waits `window` seconds for other ticks to join, then flushes every
+    pending batch at once. Batches that arrive during that write are picked
+    up by the leader's next round. Followers simply block until the flush
+    that contains their batch completes, so submit() still returns only once
+    the data is written.
+    """
+
+    def __init__(self, store, window=GROUP_COMMIT_WINDOW_MS / 1000.0):
+        self.store = store
+        self.window = window
+        self._lock = threading.Lock()
+        self._pending = []
+        self._leader_active = False
+        self._stats = _FlushStats()
+
+    def submit(self, positions=None, entries=()):
+        batch = _Batch(positions, list(entries))
+        with self._lock:
+            self._pending.append(batch)
+            is_leader = not self._leader_active
+            if is_leader:
+                self._leader_active = True
+
+        if is_leader:
+            if self.window > 0:
+                time.sleep(self.window)
+            self._lead()
+        else:
+            batch.done.wait()
+
+        if batch.error is not None:
+            raise batch.error
+
+    def _lead(self):
+        while True:
+            with self._lock:
+                group, self._pending = self._pending, []
+                if not group:
+                    self._leader_active = False
+                    return
+            _flush_group(self.store, group, self._stats)
+
+    def flush(self, timeout=None):
+        """Inline writes are complete when submit() returns; nothing to wait for."""
+        return True
+
+    def close(self, timeout=None):
+        pass
+
+    def stats(self):
+        with self._lock:
+            depth = len(self._pending)
+        return {"writer": "inline", "durability": PERSIST_DURABILITY, "queue_depth": depth, **self._stats.as_dict()}
+
+
+class BackgroundWriter:
+    """
+    Takes persistence work off the request path (PERSIST_WRITER=background).
+
+    submit() puts the batch on a bounded queue and returns at once when
+    durability is "async" (fire-and-forget), or waits until the batch has been
+    written and fsynced when durability is "fsync". A single daemon thread
+    drains the queue and merges everything waiting into one store.write(),
+    so when the disk slows down each flush simply carries more work. A full
+    queue makes submit() block, which is the backpressure signal that the
+    disk has fallen behind.
+
+    The closed check and the enqueue happen under one lock that close() also
+    takes, so every batch is either queued ahead of the stop marker (and
+    written by the thread) or written inline after shutdown; none is dropped.
+    """
+
+    _STOP = object()
+
+    def __init__(self, store, max_queue=PERSIST_QUEUE_SIZE, durability=PERSIST_DURABILITY):
+        self.store = store
+        self.durability = durability
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._stats = _FlushStats()
+        self._closed = False
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name="persistence-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, positions=None, entries=()):
+        batch = _Batch(positions, list(entries))
+        with self._lock:
+            closed = self._closed
+            if not closed:
+                # Blocks while the queue is full; the writer thread keeps draining it meanwhile
+                self._queue.put(batch)
+        if closed:
+            # After shutdown there is no thread to drain the queue; write inline
+            self.store.write(positions=batch.positions, entries=batch.entries)
+            return
+
+        if self.durability == "fsync":
+            batch.done.wait()
+            if batch.error is not None:
+                raise batch.error
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            taken = 1
+            stop = item is self._STOP
+            group = [] if stop else [item]
+            while not stop:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                taken += 1
+                if item is self._STOP:
+                    stop = True
+                else:
+                    group.append(item)
+
+            if group:
+                _flush_group(self.store, group, self._stats)
+            for _ in range(taken):
+                self._queue.task_done()
+            if stop:
+                return
+
+    def flush(self, timeout=None):
+        """Block until everything queued so far has been written."""
+        if timeout is None:
+            self._queue.join()
+            return True
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def close(self, timeout=10):
+        """
+        Flush-on-shutdown: drain the queue, then stop the writer thread. If
+        the thread does not finish within timeout, batches it has not taken
+        yet are failed so that no fsync waiter blocks forever.
+        """
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(self._STOP)
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            self._fail_pending(RuntimeError(f"Persistence writer did not drain within {timeout}s of shutdown"))
+
+    def _fail_pending(self, error):
+        """Fail every batch still on the queue (the stop marker included)."""
+        failed = 0
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not self._STOP:
+                item.error = error
+                item.done.set()
+                failed += 1
+            self._queue.task_done()
+        if failed:
+            print(f"[ERROR] {error}; {failed} pending batches were not written")
+
+    def stats(self):
+        return {
+            "writer": "background",
+            "durability": self.durability,
+            "queue_depth": self._queue.qsize(),
+            "queue_capacity": self._queue.maxsize,
+            **self._stats.as_dict(),
+        }
+
+
+_store = None
+_writer = None
+_store_lock = threading.Lock()
+
+def get_store():
+    """Return the process-wide store selected by STORAGE_ENGINE."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                fsync = PERSIST_DURABILITY == "fsync"
+                if STORAGE_ENGINE == "sqlite":
+                    _store = SQLiteStore(SQLITE_DB_FILE, import_from=FileStore(), fsync=fsync)
+                else:
+                    _store = FileStore(fsync=fsync)
+    return _store
+
+
+def get_writer():
+    """Return the process-wide writer (selected by PERSIST_WRITER) in front of get_store()."""
+    global _writer
+    if _writer is None:
+        store = get_store()
+        with _store_lock:
+            if _writer is None:
+                if PERSIST_WRITER == "inline":
+                    _writer = GroupCommitter(store)
+                else:
+                    _writer = BackgroundWriter(store)
+                    atexit.register(shutdown_writer)
+    return _writer
+
+
+def use_store(store, writer=None):
+    """
+    Make `store` the process-wide store, behind `writer` (default: an inline
+    GroupCommitter with no wait window). The previous writer is flushed but
+    left running; returns the previous (store, writer) so callers can pass
+    them back to use_store() to restore them.
+    """
+    global _store, _writer
+    with _store_lock:
+        previous = (_store, _writer)
+        if _writer is not None:
+            _writer.flush()
+        _store = store
+        if writer is None and store is not None:
+            writer = GroupCommitter(store, window=0)
+        _writer = writer
+    return previous
+
+
+def shutdown_writer(timeout=10):
+    """Flush pending writes and stop the background writer (registered with atexit)."""
+    if _writer is not None:
+        _writer.close(timeout)
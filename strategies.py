@@ -0,0 +1,192 @@
+"""
+Local decision strategies: rule-based alternatives to the ChatGPT call that
+answer in microseconds instead of seconds.
+
+A strategy is any callable taking a normalized tick (validators.Tick) and
+returning recommendations in the shape get_chatgpt_analysis returns and
+post_to_make_trade sends on:
+
+    [{"action": "BUY|SELL|STAY", "ticker": "SYMBOL", "quantity": X}, ...]
+
+Strategies are registered by name as factories (keyword parameters in, a
+strategy out). "llm" is the name of the ChatGPT strategy itself; business.py
+routes it to ai_integration, so it is not in this registry. The deployment
+default is STRATEGY and a request can pick another one with ?strategy=<name>.
+
+Built-in local strategies, both comparing the Market_Summary price with the
+tick's market_history (oldest row first) or, with lookback > 0, the last
+`lookback` days of the accumulated price history (timeseries.py):
+- momentum: BUY when the price is `threshold` or more above the oldest price
+  in the history, SELL when it is as far below.
+- mean_reversion: BUY when the price is `threshold` or more below the mean of
+  the history, SELL when it is as far above.
+
+- rsi: BUY when the incremental RSI of indicators.py is oversold, SELL when
+  it is overbought.
+
+Position limits apply to all of them: a BUY is at most trade_size, never takes the
+holding above max_position and is capped by the CASH position; a SELL is at
+most trade_size and never more than is held.
+
+"stay" answers STAY for every position; it is the default fallback when the
+LLM overruns its latency budget or fails (see llm_budget.py).
+"""
+import threading
+
+import numpy as np
+
+from config import (
+    LOCAL_STRATEGY_THRESHOLD, LOCAL_STRATEGY_TRADE_SIZE, LOCAL_STRATEGY_MAX_POSITION, LOCAL_STRATEGY_LOOKBACK,
+    LOCAL_STRATEGY_RSI_OVERSOLD, LOCAL_STRATEGY_RSI_OVERBOUGHT
+)
+from indicators import get_indicators
+from timeseries import get_timeseries
+
+LLM_STRATEGY = "llm"
+
+
+def history_prices(tick):
+    """Price history per ticker from the tick's market_history, in payload order."""
+    history = {}
+    for ticker, price in zip(tick.history_tickers, tick.history_price):
+        history.setdefault(ticker, []).append(price)
+    return history
+
+
+def orders(tick, signals, trade_size=LOCAL_STRATEGY_TRADE_SIZE, max_position=LOCAL_STRATEGY_MAX_POSITION):
+    """
+    Recommendations for the tick's market tickers from one signal each
+    (1 BUY, -1 SELL, 0 STAY, in market_tickers order), under the position
+    limits: a BUY is at most trade_size, never takes the holding above
+    max_position and is capped by the CASH left; a SELL is at most
+    trade_size and never more than is held. A signal that cannot trade is STAY.
+    """
+    held = {}
+    cash = 0.0
+    for ticker, quantity, purchase_price in zip(tick.tickers, tick.quantity, tick.purchase_price):
+        if ticker == "CASH":
+            cash += quantity * purchase_price
+        else:
+            held[ticker] = held.get(ticker, 0.0) + quantity
+
+    decisions = []
+    for ticker, price, signal in zip(tick.market_tickers, tick.current_price, signals):
+        if ticker == "CASH":
+            continue
+        if signal > 0 and price > 0:
+            quantity = int(min(trade_size, max_position - held.get(ticker, 0.0), cash // price))
+            if quantity > 0:
+                cash -= quantity * price
+                decisions.append({"action": "BUY", "ticker": ticker, "quantity": quantity})
+                continue
+        elif signal < 0:
+            quantity = int(min(trade_size, held.get(ticker, 0.0)))
+            if quantity > 0:
+                decisions.append({"action": "SELL", "ticker": ticker, "quantity": quantity})
+                continue
+        decisions.append({"action": "STAY", "ticker": ticker, "quantity": 0})
+    return decisions
+
+
+def rule_strategy(reference, direction, threshold=LOCAL_STRATEGY_THRESHOLD,
+                  trade_size=LOCAL_STRATEGY_TRADE_SIZE, max_position=LOCAL_STRATEGY_MAX_POSITION,
+                  lookback=LOCAL_STRATEGY_LOOKBACK):
+    """
+    Builds a strategy from a reference price rule.
+
+    Args:
+        reference: function of a ticker's history prices (non-empty list)
+            returning the price the current one is compared with
+        direction: 1 to BUY above the reference (trend following), -1 to BUY
+            below it (mean reversion)
+        threshold: relative distance from the reference that triggers a trade
+        trade_size: most units bought or sold per ticker per tick
+        max_position: most units held of one ticker after a BUY
+        lookback: days of accumulated price history to read instead of the
+            tick's own market_history (0 for the tick's)
+    """
+    def decide(tick):
+        history = history_prices(tick) if lookback <= 0 else None
+        series = get_timeseries() if lookback > 0 else None
+        signals = []
+        for ticker, price in zip(tick.market_tickers, tick.current_price):
+            prices = history.get(ticker) if series is None else series.prices(ticker, lookback).tolist()
+            base = reference(prices) if prices else 0.0
+            move = direction * (price / base - 1.0) if base > 0 and price > 0 else 0.0
+            signals.append(1 if move >= threshold else -1 if move <= -threshold else 0)
+        return orders(tick, signals, trade_size, max_position)
+    return decide
+
+
+def stay_recommendations(tick):
+    """STAY for every position of the tick."""
+    return [{"action": "STAY", "ticker": ticker, "quantity": 0} for ticker in tick.tickers]
+
+
+def stay(**params):
+    """Never trades."""
+    return stay_recommendations
+
+
+def momentum(**params):
+    """Trend following against the oldest price in the history."""
+    return rule_strategy(lambda prices: prices[0], 1, **params)
+
+
+def mean_reversion(**params):
+    """Buys below and sells above the mean of the history."""
+    return rule_strategy(lambda prices: sum(prices) / len(prices), -1, **params)
+
+
+def rsi(oversold=LOCAL_STRATEGY_RSI_OVERSOLD, overbought=LOCAL_STRATEGY_RSI_OVERBOUGHT,
+        trade_size=LOCAL_STRATEGY_TRADE_SIZE, max_position=LOCAL_STRATEGY_MAX_POSITION):
+    """
+    Buys when the incremental RSI (indicators.py) is at or below oversold,
+    sells at or above overbought; a ticker with fewer than rsi_period price
+    changes seen does not trade.
+    """
+    def decide(tick):
+        book = get_indicators()
+        snapshot = book.snapshot(tick.market_tickers)
+        values = np.where(snapshot["count"] > book.rsi_period, snapshot["rsi"], np.nan)
+        signals = np.where(values <= oversold, 1, np.where(values >= overbought, -1, 0)).tolist()
+        return orders(tick, signals, trade_size, max_position)
+    return decide
+
+
+STRATEGIES = {
+    "stay": stay,
+    "momentum": momentum,
+    "mean_reversion": mean_reversion,
+    "rsi": rsi,
+}
+
+_instances = {}
+_instances_lock = threading.Lock()
+
+
+def register_strategy(name, factory):
+    """Make a strategy factory selectable by name (STRATEGY or ?strategy=)."""
+    with _instances_lock:
+        STRATEGIES[name] = factory
+        _instances.pop(name, None)
+
+
+def strategy_names():
+    """Every selectable strategy name, "llm" first."""
+    return [LLM_STRATEGY, *STRATEGIES]
+
+
+def get_strategy(name):
+    """
+    The local strategy registered as `name`, built once with its default
+    parameters. Raises KeyError for an unknown name (and for "llm", which
+    business.py handles itself).
+    """
+    strategy = _instances.get(name)
+    if strategy is None:
+        with _instances_lock:
+            strategy = _instances.get(name)
+            if strategy is None:
+                strategy = _instances[name] = STRATEGIES[name]()
+    return strategy
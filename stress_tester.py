@@ -0,0 +1,150 @@
+"""
+Stress tester for multi-worker deployments.
+
+Two modes:
+- http  (default): hammers /tick from many client processes against a server
+  started with several workers (e.g. `WEB_CONCURRENCY=4 gunicorn app:app`,
+  which picks up gunicorn.conf.py), then checks the trading log file for lost
+  or torn entries. The server is STRESS_BASE_URL, by default 127.0.0.1 on
+  PORT (8000, gunicorn.conf.py's default bind).
+- local: skips HTTP and has many processes write through storage.FileStore at
+  once against a scratch copy of the files, to exercise the cross-process lock
+  on its own.
+
+Usage:
+    python stress_tester.py [http|local] [processes] [ticks_per_process]
+"""
+
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import uuid
+from multiprocessing import Pool
+
+BASE_URL = os.getenv("STRESS_BASE_URL", "http://127.0.0.1:" + os.getenv("PORT", "8000")).rstrip("/")
+API_KEY = "lrd0036"
+TIMEOUT = 120
+
+def h(ok): return "✅ PASS" if ok else "❌ FAIL"
+
+def read_log_lines(log_file):
+    """Returns (entries, unreadable_line_count) for a JSON Lines log."""
+    entries, bad = [], 0
+    if not os.path.exists(log_file):
+        return entries, bad
+    with open(log_file, "r") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                entries.append(json.loads(line))
+            except json.JSONDecodeError:
+                bad += 1
+    return entries, bad
+
+def count_tick_updates(entries, marker):
+    return sum(1 for e in entries if e.get("action") == "TICK_UPDATE" and e.get("ticker") == marker)
+
+# --- http mode -------------------------------------------------------------
+
+def post_ticks(args):
+    worker, ticks, marker = args
+    import requests
+    from assign7_tester import make_payload
+
+    payload = make_payload()
+    # A unique ticker lets us count exactly the entries this run produced
+    payload["Positions"].append({"ticker": marker, "quantity": 1.0, "purchase_price": 1.0})
+    payload["Market_Summary"].append({"ticker": marker, "current_price": 1.0, "category": "low"})
+
+    ok = 0
+    for i in range(ticks):
+        tick_id = f"stress-{marker}-{worker}-{i}"
+        try:
+            r = requests.post(f"{BASE_URL}/tick/{tick_id}", json=payload, headers={"apikey": API_KEY}, timeout=TIMEOUT)
+            ok += r.status_code == 200
+        except Exception as e:
+            print(f"[worker {worker}] tick {i} failed: {e}")
+    return ok
+
+def run_http(processes, ticks):
+    from storage import TRADING_LOG_FILE
+
+    marker = "ST" + uuid.uuid4().hex[:6].upper()
+    print(f"Posting {processes} x {ticks} ticks to {BASE_URL} (marker ticker {marker})...")
+    started = time.perf_counter()
+    with Pool(processes) as pool:
+        succeeded = sum(pool.map(post_ticks, [(w, ticks, marker) for w in range(processes)]))
+    elapsed = time.perf_counter() - started
+    print(f"{succeeded}/{processes * ticks} ticks returned 200 in {elapsed:.1f}s ({succeeded / elapsed:.1f} ticks/s)")
+
+    # Background writers flush asynchronously; give them a moment to drain
+    expected = succeeded
+    for _ in range(30):
+        entries, bad = read_log_lines(TRADING_LOG_FILE)
+        if count_tick_updates(entries, marker) >= expected:
+            break
+        time.sleep(1)
+
+    got = count_tick_updates(entries, marker)
+    print("Every log line parses (no torn writes):", h(bad == 0), f"({bad} unreadable)")
+    print("No lost TICK_UPDATE entries:", h(got == expected), f"({got}/{expected})")
+
+# --- local mode ------------------------------------------------------------
+
+def write_batches(args):
+    positions_file, log_file, worker, ticks = args
+    from storage import FileStore
+
+    store = FileStore(positions_file, log_file)
+    for i in range(ticks):
+        entries = [
+            {"date": "2025-01-01", "ticker": f"W{worker}", "action": "TICK_UPDATE", "quantity": i, "price": j, "note": "stress"}
+            for j in range(5)
+        ]
+        store.write(positions=[{"ticker": f"W{worker}", "quantity": i, "purchase_price": 1.0}], entries=entries)
+    return ticks * 5
+
+def run_local(processes, ticks):
+    workdir = tempfile.mkdtemp(prefix="stress_")
+    positions_file = os.path.join(workdir, "positions.txt")
+    log_file = os.path.join(workdir, "log.txt")
+    print(f"{processes} processes x {ticks} batched writes into {workdir}...")
+
+    started = time.perf_counter()
+    with Pool(processes) as pool:
+        expected = sum(pool.map(write_batches, [(positions_file, log_file, w, ticks) for w in range(processes)]))
+    elapsed = time.perf_counter() - started
+    print(f"Wrote {expected} entries in {elapsed:.2f}s ({processes * ticks / elapsed:.0f} batches/s)")
+
+    entries, bad = read_log_lines(log_file)
+    per_worker_ok = all(
+        [e["quantity"] for e in entries if e["ticker"] == f"W{w}"] == [i for i in range(ticks) for _ in range(5)]
+        for w in range(processes)
+    )
+    with open(positions_file, "r") as f:
+        positions_ok = isinstance(json.load(f), list)
+
+    print("Every log line parses (no torn writes):", h(bad == 0), f"({bad} unreadable)")
+    print("No lost entries:", h(len(entries) == expected), f"({len(entries)}/{expected})")
+    print("Each worker's entries are complete and in order:", h(per_worker_ok))
+    print("Positions file is valid JSON after concurrent replaces:", h(positions_ok))
+    shutil.rmtree(workdir, ignore_errors=True)
+
+def main():
+    mode = sys.argv[1] if len(sys.argv) > 1 else "http"
+    processes = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    ticks = int(sys.argv[3]) if len(sys.argv) > 3 else (5 if mode == "http" else 200)
+
+    print(f"== Multi-worker stress test ({mode}) ==")
+    if mode == "local":
+        run_local(processes, ticks)
+    else:
+        run_http(processes, ticks)
+    print("\nDone.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Parallel parameter sweeps over a tick recording.
+
+Every combination of the parameter grid is one backtest: an isolated replay
+(see replay.py) of the same recording through the business.py tick pipeline,
+with the threshold advisor configured by that combination, an in-memory store
+and no file or network I/O. Runs are spread over a process pool, one per core
+by default; each worker process receives the recording once at start-up and
+then only the parameters of each run. Only the summary of each run travels
+back, not its equity curve.
+
+Usage:
+    python sweep.py <recording.jsonl> [--workers N]
+        [--buy-below 0.97,0.98,0.99] [--sell-above 1.01,1.02,1.03]
+        [--size 1,5] [--lookback 0,5,20] [--top 20] [--csv results.csv]
+"""
+import argparse
+import itertools
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from recording import load_recording
+
+PARAMETERS = ("buy_below", "sell_above", "size", "lookback")
+RESULT_COLUMNS = ("return_pct", "max_drawdown_pct", "final_equity", "fills", "ticks", "ticks_per_sec")
+
+_ticks = None
+
+
+def _init_worker(ticks):
+    # One copy of the recording per worker process, shared by all of its runs
+    global _ticks
+    _ticks = ticks
+
+
+def _run(params):
+    from replay import replay, threshold_advisor
+
+    report = replay(_ticks, advisor=threshold_advisor(**params))
+    return {**params, **{column: getattr(report, column) for column in RESULT_COLUMNS}}
+
+
+def parameter_grid(**values):
+    """Every combination of the given parameter value lists, as dicts."""
+    names = list(values)
+    return [dict(zip(names, combination)) for combination in itertools.product(*(values[name] for name in names))]
+
+
+def run_sweep(ticks, grid, workers=None):
+    """
+    Backtests every parameter dict in `grid` against `ticks` on a process pool.
+
+    Returns:
+        List of result dicts (parameters plus RESULT_COLUMNS), best return first
+    """
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        _init_worker(ticks)
+        results = [_run(params) for params in grid]
+    else:
+        chunksize = max(1, len(grid) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(ticks,)) as pool:
+            results = list(pool.map(_run, grid, chunksize=chunksize))
+    return sorted(results, key=lambda result: result["return_pct"], reverse=True)
+
+
+def print_table(results, top=None):
+    header = [*PARAMETERS, *RESULT_COLUMNS]
+    rows = results[:top] if top else results
+    widths = [max(len(name), 10) for name in header]
+    print(" | ".join(f"{name:>{width}}" for name, width in zip(header, widths)))
+    for result in rows:
+        print(" | ".join(f"{result[name]:>{width},}" for name, width in zip(header, widths)))
+
+
+def _floats(text):
+    return [float(value) for value in text.split(",")]
+
+
+def _ints(text):
+    return [int(value) for value in text.split(",")]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parallel parameter sweep over a tick recording")
+    parser.add_argument("recording")
+    parser.add_argument("--workers", type=int, default=None, help="processes (default: one per core)")
+    parser.add_argument("--buy-below", type=_floats, default=[0.97, 0.98, 0.99])
+    parser.add_argument("--sell-above", type=_floats, default=[1.01, 1.02, 1.03])
+    parser.add_argument("--size", type=_floats, default=[1.0, 5.0])
+    parser.add_argument("--lookback", type=_ints, default=[0, 5, 20])
+    parser.add_argument("--top", type=int, default=20, help="rows to print (0 for all)")
+    parser.add_argument("--csv", help="write every result to this CSV file")
+    args = parser.parse_args()
+
+    ticks = load_recording(args.recording)
+    grid = parameter_grid(buy_below=args.buy_below, sell_above=args.sell_above,
+                          size=args.size, lookback=args.lookback)
+    workers = args.workers or os.cpu_count() or 1
+    print(f"Sweeping {len(grid)} parameter sets over {len(ticks)} ticks on {workers} processes...")
+
+    started = time.perf_counter()
+    results = run_sweep(ticks, grid, workers)
+    elapsed = time.perf_counter() - started
+    print(f"Done in {elapsed:.2f}s ({len(grid) / elapsed:.2f} backtests/s, "
+          f"{len(grid) * len(ticks) / elapsed:,.0f} ticks/s overall)\n")
+    print_table(results, args.top)
+
+    if args.csv:
+        with open(args.csv, "w") as f:
+            f.write(",".join([*PARAMETERS, *RESULT_COLUMNS]) + "\n")
+            for result in results:
+                f.write(",".join(str(result[name]) for name in (*PARAMETERS, *RESULT_COLUMNS)) + "\n")
+        print(f"\nResults written to {args.csv}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Shared fixtures. The environment is set before any app module is imported, so
+config never points the tests at the sample files, timeseries.npz, the late
+answer file or a real OpenAI / make_trade endpoint.
+"""
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+os.environ.update({
+    "TIMESERIES_FILE": "",
+    "LLM_LATE_ANSWER_FILE": "",
+    "LLM_CACHE_FILE": "",
+    "TICK_RECORD_FILE": "",
+    "TICK_JOBS_DIR": tempfile.mkdtemp(prefix="tick_jobs_"),
+    "GROUP_COMMIT_WINDOW_MS": "0",
+})
+for name in ("CHATGPT_API_KEY", "OPENAI_API_KEY", "MAKE_TRADE_API_KEY"):
+    os.environ.pop(name, None)
+
+import pytest
+
+import decision_reuse
+import idempotency
+import indicators
+import llm_budget
+import llm_cache
+import recording
+import storage
+import tick_jobs
+import timeseries
+from config import API_KEY
+
+
+@pytest.fixture(autouse=True)
+def isolated_state(monkeypatch):
+    """
+    Every test gets an empty in-memory store behind an inline writer and fresh
+    process-wide caches, created lazily on first use.
+    """
+    previous = storage.use_store(storage.MemoryStore())
+    for module, name in (
+        (idempotency, "_cache"), (llm_cache, "_cache"), (decision_reuse, "_reuse"),
+        (llm_budget, "_budget"), (timeseries, "_timeseries"), (indicators, "_book"),
+        (recording, "_recorder"), (tick_jobs, "_jobs"),
+    ):
+        monkeypatch.setattr(module, name, None)
+    yield
+    storage.use_store(*previous)
+
+
+@pytest.fixture
+def client():
+    """Flask test client; send API_HEADERS (or ?apikey=) on authenticated routes."""
+    from app import app
+
+    return app.test_client()
+
+
+API_HEADERS = {"apikey": API_KEY}
+
+
+def make_payload(positions=None, market=None, history=None):
+    """A raw /tick payload; positions and market are {ticker: (quantity, purchase_price)} and {ticker: price}."""
+    positions = {"CASH": (1000.0, 1.0), "AAA": (10.0, 100.0)} if positions is None else positions
+    market = {"AAA": 101.0, "BBB": 50.0} if market is None else market
+    payload = {
+        "Positions": [
+            {"ticker": ticker, "quantity": quantity, "purchase_price": price}
+            for ticker, (quantity, price) in positions.items()
+        ],
+        "Market_Summary": [{"ticker": ticker, "current_price": price} for ticker, price in market.items()],
+    }
+    if history is not None:
+        payload["market_history"] = history
+    return payload
+
+
+def make_tick(positions=None, market=None, history=None):
+    """A normalized Tick built from make_payload()."""
+    from validators import normalize_tick_payload
+
+    tick, errors = normalize_tick_payload(make_payload(positions, market, history))
+    assert not errors, errors
+    return tick
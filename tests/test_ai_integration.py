@@ -0,0 +1,81 @@
+import subprocess
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+import ai_integration
+import business
+import storage
+from conftest import ROOT, make_tick
+
+
+class FakeClient:
+    """Answers every chat completion with `text` and keeps the requests."""
+
+    def __init__(self, text):
+        self.requests = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+        self.text = text
+
+    def create(self, **request):
+        self.requests.append(request)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=self.text))])
+
+
+# --- OpenAI client and requests deferred to first use (user-023) -------------
+
+def test_importing_the_app_does_not_import_openai_or_requests():
+    code = "import sys, app; print(sorted({'openai', 'httpx', 'requests'} & set(sys.modules)))"
+
+    output = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True)
+
+    assert output.stdout.strip() == "[]"
+
+
+def test_get_client_needs_a_key(monkeypatch):
+    monkeypatch.setattr(ai_integration, "_client", None)
+
+    with pytest.raises(ValueError, match="OpenAI API key not found"):
+        ai_integration.get_client()
+
+
+def test_get_client_is_built_once(monkeypatch):
+    monkeypatch.setattr(ai_integration, "_client", None)
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+
+    client = ai_integration.get_client()
+
+    assert client is ai_integration.get_client()
+    assert client.api_key == "sk-test"
+
+
+def test_missing_key_falls_back_on_an_llm_tick(monkeypatch):
+    monkeypatch.setattr(ai_integration, "_client", None)
+
+    result = business.analyze_tick_payload(make_tick(), "t1", "llm")
+
+    assert result["fallback"] is True
+    notes = {entry["note"] for entry in storage.get_store().read_trading_log()}
+    assert "Fallback to stay strategy: ChatGPT call failed" in notes
+
+
+@pytest.mark.parametrize("text", [
+    '{"recommendations": [{"action": "BUY", "ticker": "AAA", "quantity": 2}], "reasoning": "up"}',
+    'Sure! {"recommendations": [{"action": "BUY", "ticker": "AAA", "quantity": 2}]} Good luck.',
+])
+def test_chatgpt_answer_is_parsed(monkeypatch, text):
+    client = FakeClient(text)
+    monkeypatch.setattr(ai_integration, "_client", client)
+
+    assert ai_integration.get_chatgpt_analysis(make_tick()) == [{"action": "BUY", "ticker": "AAA", "quantity": 2}]
+    request, = client.requests
+    assert request["model"] == ai_integration.MODEL
+    assert '"ticker":"AAA"' in request["messages"][1]["content"]
+
+
+def test_unparseable_chatgpt_answer_raises(monkeypatch):
+    monkeypatch.setattr(ai_integration, "_client", FakeClient("I would not trade today."))
+
+    with pytest.raises(ValueError, match="Could not parse response"):
+        ai_integration.get_chatgpt_analysis(make_tick())
@@ -0,0 +1,64 @@
+import pytest
+
+import storage
+
+
+def entry(i, ticker="AAA", action="BUY", date="2025-04-01"):
+    return {"date": date, "ticker": ticker, "action": action, "quantity": i, "price": 10.0, "note": ""}
+
+
+# --- trading log pages (user-006) --------------------------------------------
+
+def test_trading_log_api_pages_with_a_cursor(client):
+    storage.get_store().write(entries=[entry(i) for i in range(1, 6)])
+
+    first = client.get("/api/trading_log?limit=3").get_json()
+    assert [e["id"] for e in first["data"]] == [5, 4, 3]
+    assert first["total"] == 5
+
+    second = client.get(f"/api/trading_log?limit=3&cursor={first['next_cursor']}").get_json()
+    assert [e["id"] for e in second["data"]] == [2, 1]
+    assert second["data"][0]["quantity"] == 2
+    assert second["next_cursor"] is None
+
+
+@pytest.mark.parametrize("limit", ["0", "-1", "abc"])
+def test_trading_log_api_rejects_a_bad_limit(client, limit):
+    response = client.get(f"/api/trading_log?limit={limit}")
+    assert response.status_code == 400
+
+
+def test_dashboard_renders_only_the_log_count(client):
+    storage.get_store().write(positions=[{"ticker": "AAA", "quantity": 1.0, "purchase_price": 2.0,
+                                          "current_price": 2.0, "unrealized_pnl": 0.0}],
+                              entries=[entry(i) for i in range(1, 4)])
+
+    response = client.get("/dashboard")
+
+    assert response.status_code == 200
+    assert b"/api/trading_log" in response.data
+
+
+# --- trading log queries (user-007) ------------------------------------------
+
+def test_trading_log_query_filters_case_insensitively(client):
+    storage.get_store().write(entries=[entry(1, "AAA", "BUY"), entry(2, "BBB", "BUY"), entry(3, "AAA", "SELL")])
+
+    data = client.get("/api/trading_log/query?ticker=aaa&action=buy").get_json()
+
+    assert data["result"] == "success"
+    assert [(e["id"], e["ticker"], e["action"]) for e in data["data"]] == [(1, "AAA", "BUY")]
+
+
+@pytest.mark.parametrize("query, message", [
+    ("action=HOLD", "action must be one of"),
+    ("start_date=2025-4-1", "start_date must be a date in YYYY-MM-DD format"),
+    ("end_date=2025-02-30", "end_date must be a date in YYYY-MM-DD format"),
+    ("start_date=2025-04-02&end_date=2025-04-01", "start_date must not be after end_date"),
+    ("limit=0", "limit must be a positive integer"),
+])
+def test_trading_log_query_rejects_bad_filters(client, query, message):
+    response = client.get(f"/api/trading_log/query?{query}")
+
+    assert response.status_code == 400
+    assert message in response.get_json()["message"]
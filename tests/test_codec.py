@@ -0,0 +1,66 @@
+import json
+import math
+
+import pytest
+
+import codec
+from conftest import API_HEADERS, make_payload
+from validators import normalize_tick_payload
+
+
+# --- orjson-backed JSON codec (user-014) -------------------------------------
+
+def test_dumps_is_compact_utf8_and_round_trips():
+    value = {"ticker": "ÄÖ", "prices": [1.5, 2, None], "ok": True}
+
+    text = codec.dumps(value)
+
+    assert text == '{"ticker":"ÄÖ","prices":[1.5,2,null],"ok":true}'
+    assert codec.dumpb(value) == text.encode("utf-8")
+    assert codec.loads(text) == value
+    assert codec.loads(text.encode("utf-8")) == value
+
+
+def test_indent_and_sort_keys_match_the_standard_library():
+    value = {"b": 1, "a": [1, 2]}
+
+    assert codec.dumps(value, indent=True, sort_keys=True) == json.dumps(value, indent=2, sort_keys=True)
+    assert codec.dumps(value, sort_keys=True) == '{"a":[1,2],"b":1}'
+
+
+def test_objects_orjson_refuses_fall_back_to_the_standard_library():
+    big = 2 ** 70
+
+    assert codec.dumps({"n": big}) == '{"n":%d}' % big
+    assert codec.dumps({1: "x"}) == '{"1":"x"}'
+    assert codec.dumps({"d": object()}, default=lambda o: "obj") == '{"d":"obj"}'
+
+
+def test_text_orjson_refuses_falls_back_to_the_standard_library():
+    assert codec.loads('{"n": %d}' % 2 ** 70) == {"n": 2 ** 70}
+    assert math.isnan(codec.loads("[NaN]")[0])
+    assert codec.loads(b"[Infinity]") == [math.inf]
+
+
+@pytest.mark.parametrize("text", ["", "{", "[1,]", b"\xff\xfe"])
+def test_invalid_json_raises_jsondecodeerror(text):
+    with pytest.raises(codec.JSONDecodeError):
+        codec.loads(text)
+
+
+@pytest.mark.parametrize("value", [1e400, "NaN", "inf", "-Infinity"])
+def test_validator_rejects_non_finite_numbers(value):
+    tick, errors = normalize_tick_payload(make_payload(market={"AAA": value}))
+
+    assert tick is None
+    assert errors.message == "Market summary currentprice must be numeric"
+    assert list(errors) == ["MarketSummary[0].current_price must be a finite number"]
+
+
+def test_nan_literal_in_a_request_body_is_a_400(client):
+    body = codec.dumps(make_payload()).replace('"current_price":101.0', '"current_price":NaN')
+
+    response = client.post("/tick/nan", data=body, content_type="application/json", headers=API_HEADERS)
+
+    assert response.status_code == 400
+    assert response.get_json()["errors"] == ["MarketSummary[0].current_price must be a finite number"]
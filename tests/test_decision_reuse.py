@@ -0,0 +1,116 @@
+from types import SimpleNamespace
+
+import pytest
+
+import business
+import decision_reuse
+import llm_cache
+import replay
+from conftest import make_payload, make_tick
+from decision_reuse import DecisionReuse
+from llm_cache import LLMCache
+
+ANSWER = [{"action": "BUY", "ticker": "AAA", "quantity": 1}]
+
+
+# --- reuse of the last decision while prices barely move (user-025) ----------
+
+def test_nothing_to_reuse_before_a_decision():
+    reuse = DecisionReuse(epsilon=0.01, max_age=0)
+
+    assert reuse.reuse("llm", make_tick()) is None
+    assert reuse.stats()["no_decision"] == 1
+
+
+@pytest.mark.parametrize("market, reused", [
+    ({"AAA": 101.0, "BBB": 50.0}, True),
+    ({"AAA": 101.0 * 1.0099, "BBB": 50.0 * 0.9901}, True),
+    ({"AAA": 101.0 * 1.0101, "BBB": 50.0}, False),
+    ({"AAA": 101.0}, False),
+    ({"AAA": 101.0, "BBB": 50.0, "CCC": 1.0}, False),
+])
+def test_prices_must_stay_within_epsilon_of_the_decided_tick(market, reused):
+    reuse = DecisionReuse(epsilon=0.01, max_age=0)
+    reuse.remember("llm", make_tick(), ANSWER)
+
+    assert (reuse.reuse("llm", make_tick(market=market)) == ANSWER) is reused
+    assert reuse.stats()["price_moved"] == (0 if reused else 1)
+
+
+def test_small_moves_cannot_add_up_across_reused_ticks():
+    reuse = DecisionReuse(epsilon=0.01, max_age=0)
+    reuse.remember("llm", make_tick(market={"AAA": 100.0}), ANSWER)
+
+    assert reuse.reuse("llm", make_tick(market={"AAA": 100.8})) == ANSWER
+    assert reuse.reuse("llm", make_tick(market={"AAA": 101.6})) is None
+
+
+def test_changed_holdings_are_never_reused():
+    reuse = DecisionReuse(epsilon=0.01, max_age=0)
+    reuse.remember("llm", make_tick(), ANSWER)
+
+    assert reuse.reuse("llm", make_tick(positions={"CASH": (899.0, 1.0), "AAA": (11.0, 100.0)})) is None
+    # Same holdings at a different cost are the same book
+    assert reuse.reuse("llm", make_tick(positions={"CASH": (1000.0, 1.0), "AAA": (10.0, 95.0)})) == ANSWER
+    assert reuse.stats()["holdings_changed"] == 1
+
+
+def test_decisions_expire_after_max_age(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(decision_reuse, "time", SimpleNamespace(time=lambda: now[0]))
+    reuse = DecisionReuse(epsilon=0.01, max_age=30)
+    reuse.remember("llm", make_tick(), ANSWER)
+
+    now[0] += 30
+    assert reuse.reuse("llm", make_tick()) == ANSWER
+    now[0] += 1
+    assert reuse.reuse("llm", make_tick()) is None
+    assert reuse.stats()["expired"] == 1
+
+
+def test_epsilon_0_turns_reuse_off():
+    reuse = DecisionReuse(epsilon=0, max_age=0)
+    reuse.remember("llm", make_tick(), ANSWER)
+
+    assert reuse.reuse("llm", make_tick()) is None
+    assert reuse.stats()["lookups"] == 0
+
+
+def test_decisions_are_kept_per_strategy():
+    reuse = DecisionReuse(epsilon=0.01, max_age=0)
+    reuse.remember("llm", make_tick(), ANSWER)
+
+    assert reuse.reuse("other", make_tick()) is None
+    assert reuse.stats()["reuse_rate"] == 0.0
+
+
+def test_shared_file_reuses_another_workers_decision(tmp_path):
+    db_file = str(tmp_path / "shared.db")
+    DecisionReuse(epsilon=0.01, max_age=0, db_file=db_file).remember("llm", make_tick(), ANSWER)
+    other = DecisionReuse(epsilon=0.01, max_age=0, db_file=db_file)
+
+    assert other.reuse("llm", make_tick(market={"AAA": 101.5, "BBB": 50.0})) == ANSWER
+    assert other.reuse("llm", make_tick(positions={"AAA": (11.0, 100.0)})) is None
+    assert other.reuse("rsi", make_tick()) is None
+
+
+def test_llm_ticks_reuse_the_last_decision(monkeypatch):
+    calls = []
+    monkeypatch.setattr(business, "get_chatgpt_analysis", lambda tick: calls.append(tick) or ANSWER)
+    monkeypatch.setattr(decision_reuse, "_reuse", DecisionReuse(epsilon=0.01, max_age=0))
+    monkeypatch.setattr(llm_cache, "_cache", LLMCache(max_entries=0, db_file=""))
+
+    business.analyze_tick_payload(make_tick(), "t1", "llm")
+    result = business.analyze_tick_payload(make_tick(market={"AAA": 101.5, "BBB": 50.0}), "t2", "llm")
+    business.analyze_tick_payload(make_tick(market={"AAA": 110.0, "BBB": 50.0}), "t3", "llm")
+
+    assert result["decisions"] == ANSWER and result["fallback"] is False
+    assert len(calls) == 2
+    assert decision_reuse.get_decision_reuse().stats()["reused"] == 1
+
+
+def test_replay_reports_reused_ticks():
+    ticks = [(f"t{i}", make_payload(market={"AAA": price})) for i, price in enumerate([100.0, 100.05, 100.1, 105.0])]
+
+    assert replay.replay(ticks, recorded_positions=True).reused == 0
+    assert replay.replay(ticks, recorded_positions=True, reuse_epsilon=0.001).reused == 2
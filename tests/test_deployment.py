@@ -0,0 +1,57 @@
+import importlib.util
+import os
+
+import pytest
+
+import config
+from conftest import ROOT
+
+
+def load_module(name, filename):
+    spec = importlib.util.spec_from_file_location(name, os.path.join(ROOT, filename))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+# --- gunicorn workers and the stress tester (user-008) -----------------------
+
+def test_gunicorn_defaults_to_one_worker(monkeypatch):
+    monkeypatch.delenv("WEB_CONCURRENCY", raising=False)
+    monkeypatch.setenv("PORT", "8123")
+
+    conf = load_module("gunicorn_conf", "gunicorn.conf.py")
+
+    assert conf.workers == 1
+    assert conf.bind == "0.0.0.0:8123"
+    assert conf.preload_app is False
+
+
+def test_gunicorn_workers_follow_web_concurrency(monkeypatch, tmp_path):
+    monkeypatch.setenv("WEB_CONCURRENCY", "4")
+    monkeypatch.setattr(config, "IDEMPOTENCY_FILE", str(tmp_path / "shared.db"))
+    monkeypatch.setattr(config, "DECISION_REUSE_FILE", str(tmp_path / "shared.db"))
+
+    assert load_module("gunicorn_conf", "gunicorn.conf.py").workers == 4
+
+
+def test_gunicorn_refuses_several_workers_with_per_process_state(monkeypatch, tmp_path):
+    monkeypatch.setenv("WEB_CONCURRENCY", "2")
+    monkeypatch.setattr(config, "IDEMPOTENCY_FILE", "")
+    monkeypatch.setattr(config, "DECISION_REUSE_FILE", str(tmp_path / "shared.db"))
+
+    with pytest.raises(SystemExit, match="needs IDEMPOTENCY_FILE set"):
+        load_module("gunicorn_conf", "gunicorn.conf.py")
+
+    # Features that are turned off need no shared file
+    monkeypatch.setattr(config, "IDEMPOTENCY_TTL_S", 0)
+    assert load_module("gunicorn_conf", "gunicorn.conf.py").workers == 2
+
+
+def test_stress_tester_targets_gunicorns_port(monkeypatch):
+    monkeypatch.delenv("STRESS_BASE_URL", raising=False)
+    monkeypatch.delenv("PORT", raising=False)
+    assert load_module("stress_tester", "stress_tester.py").BASE_URL == "http://127.0.0.1:8000"
+
+    monkeypatch.setenv("STRESS_BASE_URL", "http://example.test:9000/")
+    assert load_module("stress_tester", "stress_tester.py").BASE_URL == "http://example.test:9000"
@@ -0,0 +1,166 @@
+import threading
+import time
+
+import pytest
+
+import business
+import storage
+import timeseries
+from conftest import API_HEADERS, make_payload, make_tick
+from idempotency import IdempotencyCache, payload_hash
+
+
+def test_repeat_key_replays_the_first_result():
+    cache = IdempotencyCache()
+    calls = []
+
+    assert cache.run("k", lambda: calls.append(1) or "first") == ("first", False)
+    assert cache.run("k", lambda: calls.append(1) or "second") == ("first", True)
+    assert cache.run("other", lambda: "other") == ("other", False)
+
+    assert len(calls) == 1
+    assert cache.stats() == {"entries": 2, "hits": 1, "misses": 2, "waits": 0, "shared": False, "shared_hits": 0}
+
+
+def test_duplicate_in_flight_waits_for_the_first_computation():
+    cache = IdempotencyCache()
+    started, release = threading.Event(), threading.Event()
+    results = []
+
+    def slow():
+        started.set()
+        release.wait(5)
+        return "answer"
+
+    first = threading.Thread(target=lambda: results.append(cache.run("k", slow)))
+    first.start()
+    assert started.wait(1)
+    second = threading.Thread(target=lambda: results.append(cache.run("k", lambda: "never")))
+    second.start()
+    time.sleep(0.05)
+    release.set()
+    first.join(1)
+    second.join(1)
+
+    assert sorted(results) == [("answer", False), ("answer", True)]
+    assert cache.stats()["waits"] == 1
+
+
+def test_failure_is_not_remembered():
+    cache = IdempotencyCache()
+
+    def fail():
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        cache.run("k", fail)
+
+    assert cache.run("k", lambda: "retried") == ("retried", False)
+
+
+def test_entries_expire_after_the_ttl():
+    cache = IdempotencyCache(ttl=0.05)
+    cache.run("k", lambda: 1)
+    time.sleep(0.06)
+
+    assert cache.run("k", lambda: 2) == (2, False)
+
+
+def test_oldest_finished_entries_are_evicted_over_max_entries():
+    cache = IdempotencyCache(max_entries=2)
+    for key in "abc":
+        cache.run(key, lambda: key)
+    cache.run("d", lambda: "d")
+
+    # Eviction runs before the new key is added, so one entry over the limit remains
+    assert cache.stats()["entries"] == 3
+    assert cache.run("a", lambda: "again") == ("again", False)
+    assert cache.run("d", lambda: "again") == ("d", True)
+
+
+def test_shared_file_replays_a_result_computed_by_another_worker(tmp_path):
+    db_file = str(tmp_path / "shared.db")
+    first, second = IdempotencyCache(db_file=db_file), IdempotencyCache(db_file=db_file)
+
+    assert first.run(("sync", "t1"), lambda: {"result": "success"}) == ({"result": "success"}, False)
+    assert second.run(("sync", "t1"), lambda: {"result": "again"}) == ({"result": "success"}, True)
+    assert second.stats()["shared_hits"] == 1
+
+
+def test_shared_file_waits_for_another_workers_unfinished_claim(tmp_path):
+    db_file = str(tmp_path / "shared.db")
+    first, second = IdempotencyCache(db_file=db_file), IdempotencyCache(db_file=db_file)
+    started, release = threading.Event(), threading.Event()
+    results = []
+
+    def slow():
+        started.set()
+        release.wait(5)
+        return "answer"
+
+    worker = threading.Thread(target=lambda: results.append(first.run("k", slow)))
+    worker.start()
+    assert started.wait(1)
+    threading.Timer(0.1, release.set).start()
+
+    assert second.run("k", lambda: "never") == ("answer", True)
+    worker.join(1)
+    assert results == [("answer", False)]
+
+
+def test_shared_claim_is_dropped_on_failure_and_taken_over_when_stale(tmp_path):
+    db_file = str(tmp_path / "shared.db")
+
+    def fail():
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        IdempotencyCache(db_file=db_file).run("k", fail)
+    assert IdempotencyCache(db_file=db_file).run("k", lambda: "retried") == ("retried", False)
+
+    # A claim whose worker died is never finished
+    stale = IdempotencyCache(db_file=db_file, claim_timeout=0.05)
+    stale._claim(payload_hash("dead"))
+    time.sleep(0.06)
+    assert stale.run("dead", lambda: "taken over") == ("taken over", False)
+
+
+def test_payload_hash_ignores_key_order():
+    assert payload_hash({"a": 1, "b": [1, 2]}) == payload_hash({"b": [1, 2], "a": 1})
+    assert payload_hash({"a": 1}) != payload_hash({"a": 2})
+
+
+# --- /tick and /ticks --------------------------------------------------------
+
+def test_retried_tick_is_replayed_without_running_again(client):
+    payload = make_payload()
+
+    first = client.post("/tick/r1?strategy=stay", json=payload, headers=API_HEADERS)
+    logged = business.get_trading_log_count()
+    retry = client.post("/tick/r1?strategy=stay", json=payload, headers=API_HEADERS)
+
+    assert first.headers["Idempotent-Replayed"] == "false"
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert retry.get_json() == first.get_json()
+    assert business.get_trading_log_count() == logged
+
+
+def test_same_tick_id_with_another_payload_runs_again(client):
+    client.post("/tick/r1?strategy=stay", json=make_payload(), headers=API_HEADERS)
+
+    other = client.post("/tick/r1?strategy=stay", json=make_payload(market={"AAA": 99.0}), headers=API_HEADERS)
+
+    assert other.headers["Idempotent-Replayed"] == "false"
+
+
+def test_replayed_batch_tick_does_not_touch_price_history():
+    tick = make_tick(history=[{"ticker": "AAA", "price": 100.0, "day": "2025-04-01"}])
+    business.process_tick_batch([("b1", tick)], strategy="stay")
+    merges = timeseries.get_timeseries().stats()["merges"]
+    logged = storage.get_store().count_trading_log()
+
+    [result] = business.process_tick_batch([("b1", tick)], strategy="stay")
+
+    assert result["replayed"] is True
+    assert timeseries.get_timeseries().stats()["merges"] == merges
+    assert storage.get_store().count_trading_log() == logged
@@ -0,0 +1,142 @@
+import numpy as np
+import pytest
+
+import indicators
+import strategies
+from conftest import make_tick
+from indicators import INDICATORS, IndicatorBook, indicator_series
+
+PRICES = [100.0, 101.5, 99.0, 102.0, 104.5, 103.0, 98.0, 97.5, 101.0, 105.0, 106.5, 104.0]
+
+
+def reference(prices, window, ema_span, rsi_period):
+    """Indicators after the last of `prices`, recomputed from scratch."""
+    prices = np.asarray(prices)
+    recent = prices[-window:]
+    returns = prices[1:] / prices[:-1] - 1.0
+    alpha = 2.0 / (ema_span + 1.0)
+    ema = prices[0]
+    for price in prices[1:]:
+        ema = alpha * price + (1.0 - alpha) * ema
+    changes = np.diff(prices)
+    gain, loss = max(changes[0], 0.0), max(-changes[0], 0.0)
+    for change in changes[1:]:
+        gain = (gain * (rsi_period - 1) + max(change, 0.0)) / rsi_period
+        loss = (loss * (rsi_period - 1) + max(-change, 0.0)) / rsi_period
+    return {
+        "price": prices[-1],
+        "sma": recent.mean(),
+        "ema": ema,
+        "ret": returns[-1],
+        "volatility": returns[-window:].std(),
+        "rsi": 100.0 - 100.0 / (1.0 + gain / loss),
+        "zscore": (prices[-1] - recent.mean()) / recent.std(),
+        "count": len(prices),
+    }
+
+
+# --- incremental indicator book (user-022) -----------------------------------
+
+@pytest.mark.parametrize("n", [3, 5, len(PRICES)])
+def test_incremental_indicators_match_a_full_recomputation(n):
+    book = IndicatorBook(window=4, ema_span=3, rsi_period=3)
+    for day, price in enumerate(PRICES[:n]):
+        book.update(["AAA"], [f"d{day:02d}"], [price])
+
+    snapshot = book.snapshot(["AAA"])
+
+    for name, value in reference(PRICES[:n], 4, 3, 3).items():
+        assert snapshot[name][0] == pytest.approx(value), name
+
+
+def test_indicator_series_is_the_book_after_every_point():
+    columns = indicator_series(PRICES, window=4, ema_span=3, rsi_period=3)
+
+    assert set(columns) == set(INDICATORS)
+    assert columns["count"].tolist() == list(range(1, len(PRICES) + 1))
+    assert np.isnan(columns["rsi"][0]) and np.isnan(columns["ret"][0]) and columns["sma"][0] == 100.0
+    assert columns["ema"][-1] == pytest.approx(reference(PRICES, 4, 3, 3)["ema"])
+
+
+def test_repeated_day_replaces_its_point_and_older_days_are_ignored():
+    book, expected = IndicatorBook(window=3, ema_span=3, rsi_period=2), IndicatorBook(window=3, ema_span=3, rsi_period=2)
+    for day, price in enumerate([100.0, 102.0, 101.0]):
+        expected.update(["AAA"], [f"d{day}"], [price])
+    for day, price in [("d0", 100.0), ("d1", 99.0), ("d1", 102.0), ("d2", 150.0), ("d0", 80.0), ("d2", 101.0)]:
+        book.update(["AAA"], [day], [price])
+
+    got, want = book.snapshot(["AAA"]), expected.snapshot(["AAA"])
+
+    for name in INDICATORS:
+        assert got[name][0] == pytest.approx(want[name][0]), name
+
+
+def test_many_tickers_update_together_like_one_at_a_time():
+    tickers = [f"T{i:02d}" for i in range(40)]
+    together, alone = IndicatorBook(window=5), IndicatorBook(window=5)
+    rng = np.random.default_rng(1)
+    for day in range(8):
+        prices = (100.0 + rng.normal(0, 2, len(tickers))).tolist()
+        together.update(tickers, [f"d{day}"] * len(tickers), prices)
+        for ticker, price in zip(reversed(tickers), reversed(prices)):
+            alone.update([ticker], [f"d{day}"], [price])
+
+    got, want = together.snapshot(tickers), alone.snapshot(tickers)
+
+    for name in INDICATORS:
+        np.testing.assert_allclose(got[name], want[name], err_msg=name)
+
+
+def test_unknown_tickers_and_undefined_indicators_are_nan():
+    book = IndicatorBook()
+    book.update(["AAA"], ["d0"], [10.0])
+
+    snapshot = book.snapshot(["AAA", "ZZZ"])
+
+    assert snapshot["count"].tolist() == [1, 0]
+    assert np.isnan(snapshot["price"][1]) and np.isnan(snapshot["rsi"][0])
+    assert book.summary(["AAA", "ZZZ"]) == {
+        "AAA": {"price": 10.0, "sma": 10.0, "ema": 10.0, "zscore": 0.0, "count": 1},
+        "ZZZ": {"count": 0},
+    }
+
+
+def test_update_tick_feeds_history_then_the_summary_price():
+    book = IndicatorBook(window=3)
+    tick = make_tick(market={"AAA": 103.0, "BBB": 50.0}, history=[
+        {"ticker": "AAA", "price": 101.0, "day": "2025-04-02"},
+        {"ticker": "AAA", "price": 100.0, "day": "2025-04-01"},
+        {"ticker": "AAA", "price": 1.0},
+    ])
+
+    book.update_tick(tick)
+    book.update_tick(tick)
+
+    snapshot = book.snapshot(["AAA", "BBB"])
+    assert snapshot["count"].tolist() == [2, 1]
+    assert snapshot["price"].tolist() == [103.0, 50.0]
+    assert snapshot["ret"][0] == pytest.approx(0.03)
+
+
+def test_rsi_strategy_buys_oversold_and_sells_overbought(monkeypatch):
+    book = IndicatorBook(rsi_period=2)
+    for day, prices in enumerate([[100.0, 100.0], [90.0, 110.0], [80.0, 120.0]]):
+        book.update(["AAA", "BBB"], [f"d{day}"] * 2, prices)
+    monkeypatch.setattr(indicators, "_book", book)
+    tick = make_tick(positions={"CASH": (1000.0, 1.0), "BBB": (10.0, 100.0)},
+                     market={"AAA": 80.0, "BBB": 120.0, "CCC": 10.0})
+
+    assert strategies.rsi(trade_size=2)(tick) == [
+        {"action": "BUY", "ticker": "AAA", "quantity": 2},
+        {"action": "SELL", "ticker": "BBB", "quantity": 2},
+        {"action": "STAY", "ticker": "CCC", "quantity": 0},
+    ]
+
+
+def test_rsi_strategy_waits_for_rsi_period_changes(monkeypatch):
+    book = IndicatorBook(rsi_period=3)
+    for day, price in enumerate([100.0, 90.0, 80.0]):
+        book.update(["AAA"], [f"d{day}"], [price])
+    monkeypatch.setattr(indicators, "_book", book)
+
+    assert strategies.rsi()(make_tick(market={"AAA": 80.0}))[0]["action"] == "STAY"
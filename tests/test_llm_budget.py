@@ -0,0 +1,120 @@
+import threading
+import time
+
+import pytest
+
+import business
+import llm_budget
+import storage
+from conftest import make_tick
+from llm_budget import LatencyBudget
+from recording import load_recording
+
+FALLBACK = [{"action": "STAY", "ticker": "AAA", "quantity": 0}]
+ANSWER = [{"action": "BUY", "ticker": "AAA", "quantity": 1}]
+
+
+def wait_until(condition):
+    deadline = time.monotonic() + 5
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def fail():
+    raise RuntimeError("boom")
+
+
+# --- LLM latency budget with fallback (user-020) -----------------------------
+
+def test_answer_within_the_budget_is_used():
+    budget = LatencyBudget(budget_s=1, workers=1, late_answer_file="")
+
+    assert budget.run("t1", lambda: ANSWER, lambda: FALLBACK) == (ANSWER, "llm")
+    assert budget.stats()["llm"] == 1 and budget.stats()["fallback_rate"] == 0.0
+
+
+def test_failed_call_falls_back():
+    budget = LatencyBudget(budget_s=1, workers=1, late_answer_file="")
+
+    assert budget.run("t1", fail, lambda: FALLBACK) == (FALLBACK, "error")
+    assert budget.stats()["failed"] == 1 and budget.stats()["timed_out"] == 0
+
+
+def test_budget_0_calls_inline_and_still_falls_back():
+    budget = LatencyBudget(budget_s=0, late_answer_file="")
+    callers = []
+
+    assert budget.run("t1", lambda: callers.append(threading.current_thread()) or ANSWER, lambda: FALLBACK) == (ANSWER, "llm")
+    assert budget.run("t2", fail, lambda: FALLBACK) == (FALLBACK, "error")
+    assert callers == [threading.current_thread()]
+    assert budget.stats()["decided"] == 2
+
+
+def test_slow_call_falls_back_and_its_late_answer_is_recorded(tmp_path):
+    path = str(tmp_path / "late.jsonl")
+    budget = LatencyBudget(budget_s=0.05, workers=1, late_answer_file=path)
+    release = threading.Event()
+
+    started = time.monotonic()
+    result = budget.run("t1", lambda: release.wait(5) and ANSWER, lambda: FALLBACK)
+
+    assert result == (FALLBACK, "timeout")
+    assert time.monotonic() - started < 1
+    release.set()
+    wait_until(lambda: budget.stats()["late_answers"] == 1)
+    (tick_id, record), = load_recording(path)
+    assert tick_id == "t1"
+    assert record["llm"] == ANSWER and record["fallback"] == FALLBACK and record["budget_s"] == 0.05
+
+
+def test_late_failure_is_counted_not_recorded(tmp_path):
+    path = str(tmp_path / "late.jsonl")
+    budget = LatencyBudget(budget_s=0.05, workers=1, late_answer_file=path)
+    release = threading.Event()
+
+    def slow_failure():
+        release.wait(5)
+        raise RuntimeError("late boom")
+
+    assert budget.run("t1", slow_failure, lambda: FALLBACK)[1] == "timeout"
+    release.set()
+    wait_until(lambda: budget.stats()["late_failed"] == 1)
+    assert budget.stats()["late_answers"] == 0
+
+
+def test_queued_call_past_the_budget_is_cancelled():
+    budget = LatencyBudget(budget_s=0.05, workers=1, late_answer_file="")
+    release = threading.Event()
+    calls = []
+    budget.run("busy", lambda: release.wait(5), lambda: FALLBACK)
+
+    assert budget.run("queued", lambda: calls.append(1), lambda: FALLBACK) == (FALLBACK, "timeout")
+    release.set()
+    wait_until(lambda: budget.stats()["late_answers"] == 1)
+
+    assert calls == []
+    assert budget.stats()["cancelled"] == 1 and budget.stats()["timed_out"] == 2
+
+
+def test_fallback_errors_propagate():
+    budget = LatencyBudget(budget_s=0, late_answer_file="")
+
+    with pytest.raises(RuntimeError, match="boom"):
+        budget.run("t1", fail, fail)
+
+
+@pytest.mark.parametrize("budget_s, call, outcome, note", [
+    (1, lambda tick: ANSWER, False, "AI recommendation from ChatGPT"),
+    (1, lambda tick: fail(), True, "Fallback to stay strategy: ChatGPT call failed"),
+    (0.05, lambda tick: time.sleep(0.3) or ANSWER, True, "Fallback to stay strategy: ChatGPT over its latency budget"),
+])
+def test_llm_ticks_go_through_the_budget(monkeypatch, budget_s, call, outcome, note):
+    monkeypatch.setattr(llm_budget, "_budget", LatencyBudget(budget_s=budget_s, workers=1, late_answer_file=""))
+    monkeypatch.setattr(business, "get_chatgpt_analysis", call)
+
+    result = business.analyze_tick_payload(make_tick(), "t1", "llm")
+
+    assert result["fallback"] is outcome
+    assert result["decisions"] == (business.get_strategy("stay")(make_tick()) if outcome else ANSWER)
+    assert {entry["note"] for entry in storage.get_store().read_trading_log()} == {"Tick received", note}
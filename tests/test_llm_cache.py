@@ -0,0 +1,142 @@
+import time
+from types import SimpleNamespace
+
+import business
+import llm_budget
+import llm_cache
+import replay
+from ai_integration import analysis_key
+from conftest import make_payload, make_tick
+from llm_budget import LatencyBudget
+from llm_cache import LLMCache
+from validators import normalize_tick_payload
+
+ANSWER = [{"action": "BUY", "ticker": "AAA", "quantity": 1}]
+
+
+def clock(monkeypatch, start=1000.0):
+    now = [start]
+    monkeypatch.setattr(llm_cache, "time", SimpleNamespace(time=lambda: now[0]))
+    return now
+
+
+def make_tick_from(payload):
+    tick, errors = normalize_tick_payload(payload)
+    assert not errors, errors
+    return tick
+
+
+# --- ChatGPT answer cache (user-024) -----------------------------------------
+
+def test_analysis_key_ignores_order_and_key_spellings():
+    payload = make_payload(positions={"CASH": (1000.0, 1.0), "AAA": (10.0, 100.0)}, market={"AAA": 101.0, "BBB": 50.0},
+                           history=[{"ticker": "AAA", "price": 99.0, "day": "d1"}, {"ticker": "BBB", "price": 49.0, "day": "d1"}])
+    shuffled = {
+        "positions": [{"ticker": "AAA", "quantity": 10, "purchaseprice": 100}, {"ticker": "CASH", "quantity": 1000, "purchase_price": 1}],
+        "MarketSummary": [{"ticker": "BBB", "current_price": 50}, {"ticker": "AAA", "currentprice": 101}],
+        "market_history": [{"ticker": "BBB", "price": 49, "Day": "d1"}, {"ticker": "AAA", "price": 99, "day": "d1"}],
+    }
+
+    assert analysis_key(make_tick_from(shuffled)) == analysis_key(make_tick_from(payload))
+    assert analysis_key(make_tick(market={"AAA": 101.01, "BBB": 50.0})) != analysis_key(make_tick())
+    assert analysis_key(make_tick(positions={"CASH": (999.0, 1.0), "AAA": (10.0, 100.0)})) != analysis_key(make_tick())
+
+
+def test_lru_evicts_the_least_recently_used():
+    cache = LLMCache(max_entries=2, db_file="")
+    cache.put("a", [1])
+    cache.put("b", [2])
+    cache.get("a")
+    cache.put("c", [3])
+
+    assert (cache.get("a"), cache.get("b"), cache.get("c")) == ([1], None, [3])
+    assert cache.stats()["evictions"] == 1 and cache.stats()["entries"] == 2
+
+
+def test_entries_expire_after_the_ttl(monkeypatch):
+    now = clock(monkeypatch)
+    cache = LLMCache(ttl=10, db_file="")
+    cache.put("a", [1])
+
+    now[0] += 9.9
+    assert cache.get("a") == [1]
+    now[0] += 0.2
+    assert cache.get("a") is None
+    assert cache.stats()["entries"] == 0 and cache.stats()["misses"] == 1
+
+
+def test_sqlite_tier_survives_a_restart_and_expires(tmp_path, monkeypatch):
+    path = str(tmp_path / "llm_cache.db")
+    now = clock(monkeypatch)
+    LLMCache(ttl=60, db_file=path).put("a", ANSWER)
+
+    restarted = LLMCache(ttl=60, db_file=path)
+    assert restarted.get("a") == ANSWER
+    assert restarted.get("a") == ANSWER
+    assert (restarted.stats()["disk_hits"], restarted.stats()["hits"]) == (1, 1)
+
+    now[0] += 61
+    assert LLMCache(ttl=60, db_file=path).get("a") is None
+    assert LLMCache(ttl=0, db_file=path).get("a") is None
+
+
+def test_memory_off_still_reads_the_file(tmp_path):
+    path = str(tmp_path / "llm_cache.db")
+    cache = LLMCache(max_entries=0, db_file=path)
+    cache.put("a", ANSWER)
+
+    assert cache.get("a") == ANSWER
+    assert cache.stats()["entries"] == 0 and cache.stats()["disk_hits"] == 1
+
+
+def answer_with(monkeypatch, call):
+    calls = []
+
+    def counted(tick):
+        calls.append(tick)
+        return call(tick)
+
+    monkeypatch.setattr(business, "get_chatgpt_analysis", counted)
+    return calls
+
+
+def test_repeated_prompt_is_answered_from_the_cache(monkeypatch):
+    calls = answer_with(monkeypatch, lambda tick: ANSWER)
+    monkeypatch.setattr(llm_cache, "_cache", LLMCache(db_file=""))
+
+    first = business.analyze_tick_payload(make_tick(), "t1", "llm")
+    second = business.analyze_tick_payload(make_tick(), "t2", "llm")
+
+    assert first["decisions"] == second["decisions"] == ANSWER
+    assert len(calls) == 1
+    assert llm_cache.get_llm_cache().stats()["hits"] == 1
+
+
+def test_late_or_failed_answers_are_not_cached(monkeypatch):
+    monkeypatch.setattr(llm_budget, "_budget", LatencyBudget(budget_s=0.05, workers=1, late_answer_file=""))
+    monkeypatch.setattr(llm_cache, "_cache", LLMCache(db_file=""))
+    calls = answer_with(monkeypatch, lambda tick: time.sleep(0.2) or ANSWER)
+
+    assert business.analyze_tick_payload(make_tick(), "t1", "llm")["fallback"] is True
+    time.sleep(0.3)
+
+    assert llm_cache.get_llm_cache().stats()["stores"] == 0
+    assert llm_budget.get_latency_budget().stats()["late_answers"] == 1
+
+    monkeypatch.setattr(business, "get_chatgpt_analysis", lambda tick: calls.append(tick) or 1 / 0)
+    business.analyze_tick_payload(make_tick(), "t2", "llm")
+
+    assert len(calls) == 2
+    assert llm_cache.get_llm_cache().stats()["stores"] == 0
+
+
+def test_replay_can_decide_from_a_cache_file(tmp_path):
+    path = str(tmp_path / "llm_cache.db")
+    ticks = [("t0", make_payload(market={"AAA": 101.0})), ("t1", make_payload(market={"AAA": 102.0}))]
+    LLMCache(db_file=path).put(analysis_key(make_tick(market={"AAA": 101.0})), ANSWER)
+    advisor = replay.cached_advisor(path)
+
+    report = replay.replay(ticks, advisor, recorded_positions=True)
+
+    assert report.fills == 1
+    assert (advisor.cache.stats()["disk_hits"], advisor.cache.stats()["misses"]) == (1, 1)
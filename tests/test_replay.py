@@ -0,0 +1,123 @@
+import pytest
+
+import business
+import recording
+import replay
+import storage
+from conftest import API_HEADERS, make_payload, make_tick
+from recording import TickRecorder, load_recording
+
+
+# --- tick recording and offline replay (user-017) ----------------------------
+
+def test_recording_round_trips_and_skips_unreadable_lines(tmp_path):
+    path = str(tmp_path / "ticks.jsonl")
+    recorder = TickRecorder(path)
+    recorder.record("t1", make_payload())
+    with open(path, "ab") as f:
+        f.write(b"{broken\n\n[1]\n")
+    recorder.record("t2", {"a": 1})
+
+    assert load_recording(path) == [("t1", make_payload()), ("t2", {"a": 1})]
+    assert recorder.recorded == 2 and recorder.errors == 0
+
+
+def test_recorder_counts_write_errors(tmp_path):
+    recorder = TickRecorder(str(tmp_path / "missing" / "ticks.jsonl"))
+
+    recorder.record("t1", {})
+
+    assert recorder.recorded == 0 and recorder.errors == 1
+
+
+def test_endpoints_record_only_valid_ticks(client, monkeypatch, tmp_path):
+    path = str(tmp_path / "ticks.jsonl")
+    monkeypatch.setattr(recording, "_recorder", TickRecorder(path))
+
+    client.post("/tick/t1?strategy=stay", json=make_payload(), headers=API_HEADERS)
+    client.post("/tick/bad?strategy=stay", json={"Positions": []}, headers=API_HEADERS)
+    client.post("/ticks?strategy=stay", json=[{"id": "t2", "payload": make_payload()}, {"id": "t3"}],
+                headers=API_HEADERS)
+
+    assert [tick_id for tick_id, _ in load_recording(path)] == ["t1", "t2"]
+
+
+def test_broker_fills_within_cash_and_holdings():
+    broker = replay.SimulatedBroker(make_tick(positions={"CASH": (250.0, 1.0), "AAA": (2.0, 90.0)}))
+    broker.mark(make_tick(market={"AAA": 100.0, "BBB": 50.0}))
+
+    positions = broker.make_trade("t1", [
+        {"action": "BUY", "ticker": "AAA", "quantity": 5},
+        {"action": "SELL", "ticker": "BBB", "quantity": 1},
+        {"action": "BUY", "ticker": "ZZZ", "quantity": 1},
+        {"action": "BUY", "ticker": "BBB", "quantity": "x"},
+    ])["Positions"]
+
+    assert positions == [
+        {"ticker": "CASH", "quantity": 0.0, "purchase_price": 1.0},
+        {"ticker": "AAA", "quantity": 4.5, "purchase_price": 95.5556},
+    ]
+    assert broker.fills == 1
+    assert broker.equity() == pytest.approx(450.0)
+
+    broker.make_trade("t2", [{"action": "SELL", "ticker": "AAA", "quantity": 10}])
+
+    assert broker.holdings == {} and broker.cash == pytest.approx(450.0)
+
+
+def test_threshold_advisor_trades_around_cost():
+    advise = replay.threshold_advisor(buy_below=0.9, sell_above=1.1, size=2)
+    tick = make_tick(positions={"CASH": (1000.0, 1.0), "AAA": (1.0, 100.0), "BBB": (5.0, 100.0), "CCC": (5.0, 100.0)},
+                     market={"AAA": 120.0, "BBB": 85.0, "CCC": 100.0})
+
+    assert advise(tick) == [
+        {"action": "SELL", "ticker": "AAA", "quantity": 1.0},
+        {"action": "BUY", "ticker": "BBB", "quantity": 2},
+        {"action": "STAY", "ticker": "CCC", "quantity": 0},
+    ]
+
+
+def ticks(prices):
+    return [(f"t{i}", make_payload(market={"AAA": price})) for i, price in enumerate(prices)]
+
+
+def test_replay_carries_the_simulated_book_between_ticks():
+    report = replay.replay(ticks([100.0, 97.0, 101.0]), replay.threshold_advisor(size=5))
+
+    # t1 buys 5 AAA at 97, bringing the average cost to 99, so t2 sells 5 at 101
+    assert report.ticks == 3 and report.skipped == 0
+    assert report.fills == 2
+    assert [equity for _, equity in report.equity_curve] == [2000.0, 1970.0, 2030.0]
+    assert report.return_pct == 1.5
+    assert report.max_drawdown_pct == 1.5
+    assert {"validate", "valuation", "decision", "make_trade", "persist", "total"} <= set(report.stages)
+
+
+def test_replay_with_recorded_positions_decides_on_the_recorded_book():
+    report = replay.replay(ticks([100.0, 97.0, 101.0]), replay.threshold_advisor(size=5), recorded_positions=True)
+
+    # The recorded cost stays 100, so 101 is not high enough to sell
+    assert report.fills == 1
+    assert [equity for _, equity in report.equity_curve] == [2000.0, 1970.0, 2030.0]
+
+
+def test_replay_skips_invalid_ticks_and_leaves_the_real_store_alone():
+    store, advisor = storage.get_store(), business.get_chatgpt_analysis
+
+    report = replay.replay([("bad", {"Positions": []})] + ticks([100.0, 101.0]))
+
+    assert report.ticks == 2 and report.skipped == 1
+    assert store.count_trading_log() == 0
+    assert storage.get_store() is store
+    assert business.get_chatgpt_analysis is advisor
+
+
+def test_synthetic_recording_is_deterministic(tmp_path):
+    first, second = str(tmp_path / "a.jsonl"), str(tmp_path / "b.jsonl")
+    replay.synthesize_recording(first, ticks=20, seed=3)
+    replay.synthesize_recording(second, ticks=20, seed=3)
+
+    recorded = load_recording(first)
+    assert [payload for _, payload in recorded] == [payload for _, payload in load_recording(second)]
+    assert len(recorded) == 20 and recorded[0][0] == "synthetic-3-0"
+    assert replay.replay(recorded).ticks == 20
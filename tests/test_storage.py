@@ -0,0 +1,458 @@
+import json
+import multiprocessing
+import threading
+import time
+
+import pytest
+
+import business
+import storage
+from conftest import make_tick
+from storage import FileStore
+
+
+def entry(i, ticker="AAA", action="BUY", date="2025-04-01"):
+    return {"date": date, "ticker": ticker, "action": action, "quantity": i, "price": 10.0 + i, "note": f"entry {i}"}
+
+
+@pytest.fixture
+def file_store(tmp_path):
+    return FileStore(str(tmp_path / "positions.txt"), str(tmp_path / "log.txt"))
+
+
+# --- append-only JSON Lines log (user-001) -----------------------------------
+
+def test_appends_one_json_line_per_entry(file_store):
+    file_store.write(entries=[entry(1), entry(2)])
+    file_store.write(entries=[entry(3)])
+
+    with open(file_store.log_file) as f:
+        lines = f.read().splitlines()
+    assert [json.loads(line) for line in lines] == [entry(1), entry(2), entry(3)]
+    assert file_store.read_trading_log() == [entry(1), entry(2), entry(3)]
+
+
+def test_append_does_not_rewrite_earlier_lines(file_store):
+    file_store.write(entries=[entry(1)])
+    with open(file_store.log_file, "rb") as f:
+        before = f.read()
+
+    file_store.write(entries=[entry(2)])
+
+    with open(file_store.log_file, "rb") as f:
+        after = f.read()
+    assert after.startswith(before)
+
+
+def test_migrates_legacy_json_array_log_once(tmp_path):
+    log_file = tmp_path / "log.txt"
+    legacy = [entry(1), entry(2)]
+    log_file.write_text(json.dumps(legacy, indent=2))
+
+    store = FileStore(str(tmp_path / "positions.txt"), str(log_file))
+    assert store.read_trading_log() == legacy
+    store.write(entries=[entry(3)])
+
+    assert [json.loads(line) for line in log_file.read_text().splitlines()] == legacy + [entry(3)]
+    # A second store on the migrated file reads it as JSON Lines, unchanged
+    assert FileStore(str(tmp_path / "positions.txt"), str(log_file)).read_trading_log() == legacy + [entry(3)]
+
+
+def test_skips_unreadable_lines(file_store):
+    with open(file_store.log_file, "w") as f:
+        f.write(json.dumps(entry(1)) + "\n{not json\n" + json.dumps(entry(2)) + "\n")
+
+    assert file_store.read_trading_log() == [entry(1), entry(2)]
+
+
+def test_ignores_a_partly_written_last_line(file_store):
+    with open(file_store.log_file, "w") as f:
+        f.write(json.dumps(entry(1)) + "\n" + json.dumps(entry(2))[:10])
+
+    assert file_store.read_trading_log() == [entry(1)]
+
+
+def test_positions_round_trip(file_store):
+    assert file_store.read_positions() == []
+    positions = [{"ticker": "AAA", "quantity": 5.0, "purchase_price": 10.0}]
+
+    file_store.write(positions=positions)
+
+    assert file_store.read_positions() == positions
+
+
+def test_business_log_helpers_keep_list_of_dicts_shape(file_store):
+    storage.use_store(file_store)
+
+    business.append_to_trading_log(entry(1))
+    business.append_to_trading_log(entry(2))
+
+    assert business.get_trading_log() == [entry(1), entry(2)]
+    assert business.get_trading_log_count() == 2
+
+
+# --- SQLite engine (user-002) ------------------------------------------------
+
+@pytest.fixture
+def sqlite_store(tmp_path):
+    return storage.SQLiteStore(str(tmp_path / "trading.db"))
+
+
+def test_sqlite_uses_wal_and_indexes_ticker_date_action(sqlite_store):
+    conn = sqlite_store._connect()
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    indexed = {row[2] for row in conn.execute("PRAGMA index_list(trading_log)")
+               for row in conn.execute(f"PRAGMA index_info({row[1]})")}
+    assert {"ticker", "date", "action"} <= indexed
+
+
+def test_sqlite_round_trips_entries_and_positions(sqlite_store):
+    positions = [{"ticker": "AAA", "quantity": 5.0, "purchase_price": 10.0}]
+    odd = dict(entry(2), price="N/A")
+
+    sqlite_store.write(positions=positions, entries=[entry(1), odd])
+
+    assert sqlite_store.read_positions() == positions
+    assert sqlite_store.read_trading_log() == [entry(1), odd]
+    assert sqlite_store.count_trading_log() == 2
+
+
+def test_sqlite_write_is_one_transaction(sqlite_store):
+    sqlite_store.write(positions=[{"ticker": "AAA"}], entries=[entry(1)])
+
+    with pytest.raises(TypeError):
+        # The entries are inserted and the old positions deleted before the
+        # snapshot fails to serialize; none of it may land
+        sqlite_store.write(positions=[{"ticker": "BBB", "quantity": object()}], entries=[entry(2)])
+
+    assert sqlite_store.read_trading_log() == [entry(1)]
+    assert sqlite_store.read_positions() == [{"ticker": "AAA"}]
+
+
+def test_sqlite_sees_writes_from_another_connection(tmp_path):
+    db_file = str(tmp_path / "trading.db")
+    reader = storage.SQLiteStore(db_file)
+    assert reader.read_trading_log() == []
+
+    storage.SQLiteStore(db_file).write(entries=[entry(1)])
+
+    assert reader.read_trading_log() == [entry(1)]
+
+
+def test_sqlite_imports_text_files_only_into_an_empty_database(tmp_path, file_store):
+    positions = [{"ticker": "AAA", "quantity": 1.0, "purchase_price": 2.0}]
+    file_store.write(positions=positions, entries=[entry(1), entry(2)])
+    db_file = str(tmp_path / "trading.db")
+
+    store = storage.SQLiteStore(db_file, import_from=file_store)
+    assert store.read_positions() == positions
+    assert store.read_trading_log() == [entry(1), entry(2)]
+
+    file_store.write(entries=[entry(3)])
+    assert storage.SQLiteStore(db_file, import_from=file_store).count_trading_log() == 2
+
+
+# --- one write per tick, group commit across ticks (user-003) ----------------
+
+class CountingStore(storage.MemoryStore):
+    """MemoryStore that records the entries of every write() call."""
+
+    def __init__(self, fail=False):
+        super().__init__()
+        self.fail = fail
+        self.writes = []
+
+    def write(self, positions=None, entries=()):
+        self.writes.append(list(entries))
+        if self.fail:
+            raise OSError("disk full")
+        super().write(positions, entries)
+
+
+def test_a_tick_persists_all_its_entries_in_one_write():
+    store = CountingStore()
+    storage.use_store(store)
+
+    business.analyze_tick_payload(make_tick(), "t1", strategy="stay")
+
+    assert len(store.writes) == 1
+    actions = [e["action"] for e in store.writes[0]]
+    assert actions == ["TICK_UPDATE", "TICK_UPDATE", "STAY", "STAY"]
+
+
+def test_group_committer_coalesces_concurrent_ticks():
+    store = CountingStore()
+    committer = storage.GroupCommitter(store, window=0.05)
+
+    threads = [threading.Thread(target=committer.submit, kwargs={"entries": [entry(i)]}) for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(store.writes) < 8
+    assert sorted(e["quantity"] for e in store.read_trading_log()) == list(range(8))
+    assert committer.stats()["batches_written"] == 8
+
+
+def test_group_committer_latest_positions_win_and_entries_keep_order():
+    store = CountingStore()
+    group = [storage._Batch([{"ticker": "A"}], [entry(1)]), storage._Batch(None, [entry(2)]),
+             storage._Batch([{"ticker": "B"}], [entry(3)])]
+
+    storage._flush_group(store, group, storage._FlushStats())
+
+    assert store.writes == [[entry(1), entry(2), entry(3)]]
+    assert store.read_positions() == [{"ticker": "B"}]
+    assert all(batch.done.is_set() and batch.error is None for batch in group)
+
+
+def test_group_committer_raises_the_flush_error_to_the_caller():
+    committer = storage.GroupCommitter(CountingStore(fail=True), window=0)
+
+    with pytest.raises(OSError, match="disk full"):
+        committer.submit(entries=[entry(1)])
+    assert committer.stats()["errors"] == 1
+
+
+# --- background writer (user-004) --------------------------------------------
+
+class BlockingStore(CountingStore):
+    """CountingStore whose write() waits until `release` is set."""
+
+    def __init__(self, fail=False):
+        super().__init__(fail)
+        self.release = threading.Event()
+        self.writing = threading.Event()
+
+    def write(self, positions=None, entries=()):
+        self.writing.set()
+        self.release.wait(5)
+        super().write(positions, entries)
+
+
+def test_background_writer_returns_before_the_write_in_async_mode():
+    store = BlockingStore()
+    writer = storage.BackgroundWriter(store, durability="async")
+
+    writer.submit(entries=[entry(1)])
+    assert store.writing.wait(1)
+    writer.submit(entries=[entry(2)])
+    assert store.read_trading_log() == []
+    assert writer.stats()["queue_depth"] == 1
+
+    store.release.set()
+    assert writer.flush(timeout=5)
+    assert store.read_trading_log() == [entry(1), entry(2)]
+    stats = writer.stats()
+    assert stats["queue_depth"] == 0 and stats["flushes"] >= 1 and stats["max_flush_ms"] > 0
+    writer.close()
+
+
+def test_background_writer_waits_and_raises_in_fsync_mode():
+    writer = storage.BackgroundWriter(CountingStore(fail=True), durability="fsync")
+
+    with pytest.raises(OSError, match="disk full"):
+        writer.submit(entries=[entry(1)])
+    assert writer.stats()["errors"] == 1
+    writer.close()
+
+
+def test_background_writer_close_drains_the_queue_then_writes_inline():
+    store = CountingStore()
+    writer = storage.BackgroundWriter(store, durability="async")
+    for i in range(5):
+        writer.submit(entries=[entry(i)])
+
+    writer.close()
+    assert len(store.read_trading_log()) == 5
+
+    writer.submit(entries=[entry(5)])
+    assert [e["quantity"] for e in store.read_trading_log()] == list(range(6))
+
+
+def test_background_writer_close_fails_waiters_it_could_not_drain():
+    store = BlockingStore()
+    writer = storage.BackgroundWriter(store, durability="fsync")
+    errors = []
+
+    def submit(i):
+        try:
+            writer.submit(entries=[entry(i)])
+        except RuntimeError as e:
+            errors.append(e)
+
+    first = threading.Thread(target=submit, args=(1,))
+    first.start()
+    assert store.writing.wait(1)
+    second = threading.Thread(target=submit, args=(2,))
+    second.start()
+    while writer.stats()["queue_depth"] < 1:
+        time.sleep(0.01)
+
+    writer.close(timeout=0.1)
+    second.join(1)
+    assert not second.is_alive()
+    assert len(errors) == 1 and "did not drain" in str(errors[0])
+
+    store.release.set()
+    first.join(1)
+
+
+# --- read cache (user-005) ---------------------------------------------------
+
+def test_repeated_reads_hit_the_cache(file_store):
+    file_store.write(positions=[{"ticker": "AAA"}], entries=[entry(1)])
+    file_store.read_positions()
+    file_store.read_trading_log()
+    misses = file_store.cache_stats()["misses"]
+
+    for _ in range(3):
+        assert file_store.read_positions() == [{"ticker": "AAA"}]
+        assert file_store.read_trading_log() == [entry(1)]
+
+    stats = file_store.cache_stats()
+    assert stats["misses"] == misses and stats["hits"] >= 6
+
+
+def test_own_write_invalidates_the_cache(file_store):
+    file_store.write(entries=[entry(1)])
+    assert file_store.read_trading_log() == [entry(1)]
+    version = file_store.cache_stats()["version"]
+
+    file_store.write(entries=[entry(2)])
+
+    assert file_store.cache_stats()["version"] > version
+    assert file_store.read_trading_log() == [entry(1), entry(2)]
+
+
+@pytest.mark.parametrize("engine", ["file", "sqlite"])
+def test_write_by_another_process_is_seen(tmp_path, engine):
+    def open_store():
+        if engine == "sqlite":
+            return storage.SQLiteStore(str(tmp_path / "trading.db"))
+        return FileStore(str(tmp_path / "positions.txt"), str(tmp_path / "log.txt"))
+
+    reader, other = open_store(), open_store()
+    reader.write(positions=[{"ticker": "AAA"}], entries=[entry(1)])
+    assert reader.read_trading_log() == [entry(1)]
+    assert reader.read_positions() == [{"ticker": "AAA"}]
+
+    other.write(positions=[{"ticker": "BBB", "quantity": 2.0}], entries=[entry(2)])
+
+    assert reader.read_trading_log() == [entry(1), entry(2)]
+    assert reader.read_positions() == [{"ticker": "BBB", "quantity": 2.0}]
+
+
+def test_readers_get_a_copy_of_the_cached_list(file_store):
+    file_store.write(entries=[entry(1)])
+
+    file_store.read_trading_log().append(entry(2))
+
+    assert file_store.read_trading_log() == [entry(1)]
+
+
+# --- cursor pagination (user-006) --------------------------------------------
+
+@pytest.fixture(params=["file", "sqlite", "memory"])
+def any_store(request, tmp_path):
+    if request.param == "file":
+        return FileStore(str(tmp_path / "positions.txt"), str(tmp_path / "log.txt"))
+    if request.param == "sqlite":
+        return storage.SQLiteStore(str(tmp_path / "trading.db"))
+    return storage.MemoryStore()
+
+
+def test_log_pages_walk_newest_first_to_the_oldest(any_store):
+    any_store.write(entries=[entry(i) for i in range(1, 6)])
+
+    page, cursor = any_store.read_log_page(limit=2)
+    assert [(entry_id, e["quantity"]) for entry_id, e in page] == [(5, 5), (4, 4)]
+    page, cursor = any_store.read_log_page(before=cursor, limit=2)
+    assert [entry_id for entry_id, _ in page] == [3, 2]
+    page, cursor = any_store.read_log_page(before=cursor, limit=2)
+    assert [entry_id for entry_id, _ in page] == [1]
+    assert cursor is None
+
+
+def test_log_page_cursor_is_stable_while_entries_are_appended(any_store):
+    any_store.write(entries=[entry(i) for i in range(1, 5)])
+    _, cursor = any_store.read_log_page(limit=2)
+
+    any_store.write(entries=[entry(5), entry(6)])
+
+    page, _ = any_store.read_log_page(before=cursor, limit=2)
+    assert [e["quantity"] for _, e in page] == [2, 1]
+    assert any_store.count_trading_log() == 6
+
+
+# --- indexed log queries (user-007) ------------------------------------------
+
+QUERY_LOG = [
+    entry(1, "AAA", "BUY", "2025-04-01"),
+    entry(2, "BBB", "SELL", "2025-04-01"),
+    entry(3, "AAA", "SELL", "2025-04-02"),
+    entry(4, "AAA", "BUY", "2025-04-03"),
+    entry(5, "BBB", "BUY", "2025-04-04"),
+]
+
+
+@pytest.mark.parametrize("filters, expected", [
+    ({"ticker": "AAA"}, [4, 3, 1]),
+    ({"action": "BUY"}, [5, 4, 1]),
+    ({"start_date": "2025-04-02"}, [5, 4, 3]),
+    ({"end_date": "2025-04-01"}, [2, 1]),
+    ({"start_date": "2025-04-02", "end_date": "2025-04-03"}, [4, 3]),
+    ({"ticker": "AAA", "action": "BUY", "start_date": "2025-04-02"}, [4]),
+    ({"ticker": "CCC"}, []),
+    ({}, [5, 4, 3, 2, 1]),
+])
+def test_query_log_filters(any_store, filters, expected):
+    any_store.write(entries=QUERY_LOG)
+
+    items, cursor = any_store.query_log(**filters)
+
+    assert [entry_id for entry_id, _ in items] == expected
+    assert [e["quantity"] for _, e in items] == expected
+    assert cursor is None
+
+
+def test_query_log_pages_with_a_cursor(any_store):
+    any_store.write(entries=QUERY_LOG)
+
+    items, cursor = any_store.query_log(ticker="AAA", limit=2)
+    assert [entry_id for entry_id, _ in items] == [4, 3]
+    items, cursor = any_store.query_log(ticker="AAA", before=cursor, limit=2)
+    assert [entry_id for entry_id, _ in items] == [1]
+    assert cursor is None
+
+
+# --- several worker processes on one set of files (user-008) -----------------
+
+def _write_from_process(positions_file, log_file, worker, count):
+    store = FileStore(positions_file, log_file)
+    for i in range(count):
+        store.write(positions=[{"ticker": f"W{worker}", "quantity": float(i)}],
+                    entries=[entry(i, ticker=f"W{worker}"), entry(i, ticker=f"W{worker}", action="SELL")])
+
+
+def test_concurrent_processes_never_tear_or_lose_entries(tmp_path):
+    positions_file, log_file = str(tmp_path / "positions.txt"), str(tmp_path / "log.txt")
+    context = multiprocessing.get_context("spawn")
+    workers = [context.Process(target=_write_from_process, args=(positions_file, log_file, w, 40)) for w in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(60)
+        assert worker.exitcode == 0
+
+    with open(log_file) as f:
+        lines = f.read().splitlines()
+    log = [json.loads(line) for line in lines]
+    assert len(log) == 4 * 40 * 2
+    for w in range(4):
+        mine = [(e["quantity"], e["action"]) for e in log if e["ticker"] == f"W{w}"]
+        # Each write's two entries stay adjacent and in order
+        assert mine == [(i, action) for i in range(40) for action in ("BUY", "SELL")]
+    positions = FileStore(positions_file, log_file).read_positions()
+    assert len(positions) == 1 and positions[0]["quantity"] == 39.0
@@ -0,0 +1,113 @@
+import pytest
+
+import strategies
+from conftest import API_HEADERS, make_payload, make_tick
+from validators import validate_strategy
+
+
+def history(**prices):
+    return [{"ticker": ticker, "price": price, "day": f"day-{i}"}
+            for ticker, series in prices.items() for i, price in enumerate(series)]
+
+
+# --- local decision strategies (user-019) ------------------------------------
+
+def test_momentum_follows_the_move_from_the_oldest_price():
+    decide = strategies.momentum(threshold=0.05, trade_size=3)
+    tick = make_tick(positions={"CASH": (1000.0, 1.0), "AAA": (10.0, 1.0), "BBB": (10.0, 1.0)},
+                     market={"AAA": 110.0, "BBB": 90.0, "CCC": 102.0, "DDD": 50.0},
+                     history=history(AAA=[100.0, 120.0], BBB=[100.0, 80.0], CCC=[100.0]))
+
+    assert decide(tick) == [
+        {"action": "BUY", "ticker": "AAA", "quantity": 3},
+        {"action": "SELL", "ticker": "BBB", "quantity": 3},
+        {"action": "STAY", "ticker": "CCC", "quantity": 0},
+        {"action": "STAY", "ticker": "DDD", "quantity": 0},
+    ]
+
+
+def test_mean_reversion_trades_against_the_mean():
+    decide = strategies.mean_reversion(threshold=0.05, trade_size=3)
+    tick = make_tick(positions={"CASH": (1000.0, 1.0), "BBB": (10.0, 1.0)},
+                     market={"AAA": 90.0, "BBB": 110.0},
+                     history=history(AAA=[80.0, 120.0], BBB=[100.0, 100.0]))
+
+    assert decide(tick) == [
+        {"action": "BUY", "ticker": "AAA", "quantity": 3},
+        {"action": "SELL", "ticker": "BBB", "quantity": 3},
+    ]
+
+
+@pytest.mark.parametrize("positions, signal, expected", [
+    # BUY capped by trade_size, by max_position and by the cash left
+    ({"CASH": (1000.0, 1.0)}, 1, ("BUY", 5)),
+    ({"CASH": (1000.0, 1.0), "AAA": (18.0, 1.0)}, 1, ("BUY", 2)),
+    ({"CASH": (250.0, 1.0)}, 1, ("BUY", 2)),
+    ({"CASH": (50.0, 1.0)}, 1, ("STAY", 0)),
+    ({"CASH": (1000.0, 1.0), "AAA": (20.0, 1.0)}, 1, ("STAY", 0)),
+    # SELL capped by trade_size and by the holding
+    ({"CASH": (0.0, 1.0), "AAA": (9.0, 1.0)}, -1, ("SELL", 5)),
+    ({"CASH": (0.0, 1.0), "AAA": (2.5, 1.0)}, -1, ("SELL", 2)),
+    ({"CASH": (0.0, 1.0)}, -1, ("STAY", 0)),
+    ({"CASH": (1000.0, 1.0), "AAA": (5.0, 1.0)}, 0, ("STAY", 0)),
+])
+def test_orders_respect_the_position_limits(positions, signal, expected):
+    tick = make_tick(positions=positions, market={"AAA": 100.0})
+
+    decision, = strategies.orders(tick, [signal], trade_size=5, max_position=20)
+
+    assert (decision["action"], decision["quantity"]) == expected
+
+
+def test_cash_is_shared_between_buys_and_never_traded():
+    tick = make_tick(positions={"CASH": (300.0, 1.0)}, market={"AAA": 100.0, "CASH": 1.0, "BBB": 100.0})
+
+    assert strategies.orders(tick, [1, 1, 1], trade_size=2, max_position=10) == [
+        {"action": "BUY", "ticker": "AAA", "quantity": 2},
+        {"action": "BUY", "ticker": "BBB", "quantity": 1},
+    ]
+
+
+def test_stay_answers_stay_for_every_position():
+    assert strategies.get_strategy("stay")(make_tick()) == [
+        {"action": "STAY", "ticker": "CASH", "quantity": 0},
+        {"action": "STAY", "ticker": "AAA", "quantity": 0},
+    ]
+
+
+def test_registry_builds_each_strategy_once(monkeypatch):
+    monkeypatch.setattr(strategies, "STRATEGIES", dict(strategies.STRATEGIES))
+    monkeypatch.setattr(strategies, "_instances", {})
+    built = []
+    strategies.register_strategy("always_buy", lambda: built.append(1) or (lambda tick: ["buy"]))
+
+    assert strategies.get_strategy("always_buy") is strategies.get_strategy("always_buy")
+    assert strategies.get_strategy("always_buy")(make_tick()) == ["buy"]
+    assert len(built) == 1
+    assert strategies.strategy_names()[0] == "llm" and "always_buy" in strategies.strategy_names()
+    with pytest.raises(KeyError):
+        strategies.get_strategy("llm")
+
+
+def test_validate_strategy():
+    assert validate_strategy(None) == (True, None)
+    assert validate_strategy("llm") == (True, None)
+    assert validate_strategy("momentum") == (True, None)
+    valid, message = validate_strategy("magic")
+    assert not valid and message.startswith("strategy must be one of llm, stay, momentum")
+
+
+def test_tick_picks_the_requested_strategy(client):
+    payload = make_payload(market={"AAA": 110.0}, history=history(AAA=[100.0]))
+
+    data = client.post("/tick/t1?strategy=momentum", json=payload, headers=API_HEADERS).get_json()
+
+    assert data["strategy"] == "momentum" and data["fallback"] is False
+    assert data["decisions"] == [{"action": "BUY", "ticker": "AAA", "quantity": 5}]
+
+
+def test_unknown_strategy_is_a_400(client):
+    response = client.post("/tick/t1?strategy=magic", json=make_payload(), headers=API_HEADERS)
+
+    assert response.status_code == 400
+    assert response.get_json()["message"].startswith("strategy must be one of")
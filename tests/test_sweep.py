@@ -0,0 +1,45 @@
+import replay
+import sweep
+from conftest import make_payload
+
+
+# --- parallel parameter sweeps (user-018) ------------------------------------
+
+def recorded(prices):
+    return [(f"t{i}", make_payload(market={"AAA": price})) for i, price in enumerate(prices)]
+
+
+def without_timing(results):
+    return [{name: value for name, value in result.items() if name != "ticks_per_sec"} for result in results]
+
+
+def test_parameter_grid_is_every_combination():
+    assert sweep.parameter_grid(buy_below=[0.9, 0.95], size=[1.0]) == [
+        {"buy_below": 0.9, "size": 1.0},
+        {"buy_below": 0.95, "size": 1.0},
+    ]
+    assert len(sweep.parameter_grid(buy_below=[1, 2], sell_above=[1, 2, 3], size=[1], lookback=[0, 5])) == 12
+
+
+def test_each_run_matches_a_replay_and_the_best_return_comes_first():
+    ticks = recorded([100.0, 97.0, 101.0, 95.0, 104.0])
+    grid = sweep.parameter_grid(buy_below=[0.96, 0.98], sell_above=[1.02], size=[1.0, 5.0], lookback=[0])
+
+    results = sweep.run_sweep(ticks, grid, workers=1)
+
+    assert len(results) == 4
+    assert [r["return_pct"] for r in results] == sorted((r["return_pct"] for r in results), reverse=True)
+    for result in results:
+        params = {name: result[name] for name in sweep.PARAMETERS}
+        report = replay.replay(ticks, advisor=replay.threshold_advisor(**params))
+        assert (result["return_pct"], result["fills"], result["ticks"]) == (report.return_pct, report.fills, 5)
+
+
+def test_process_pool_gives_the_same_results_as_one_process():
+    ticks = recorded([100.0, 97.0, 101.0, 95.0, 104.0, 99.0])
+    grid = sweep.parameter_grid(buy_below=[0.97, 0.99], sell_above=[1.01, 1.03], size=[1.0], lookback=[0, 2])
+
+    parallel = sweep.run_sweep(ticks, grid, workers=2)
+
+    assert without_timing(parallel) == without_timing(sweep.run_sweep(ticks, grid, workers=1))
+    assert set(parallel[0]) == {*sweep.PARAMETERS, *sweep.RESULT_COLUMNS}
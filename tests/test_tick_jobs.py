@@ -0,0 +1,209 @@
+import os
+import threading
+import time
+
+import pytest
+
+import indicators
+import tick_jobs
+import timeseries
+from conftest import API_HEADERS, make_payload
+from tick_jobs import PoolUnavailable, QueueFull, TickInFlight, TickJobs
+
+
+@pytest.fixture
+def make_jobs(tmp_path):
+    pools = []
+
+    def make(**kwargs):
+        kwargs.setdefault("results_dir", str(tmp_path / "jobs"))
+        pools.append(TickJobs(**kwargs))
+        return pools[-1]
+
+    yield make
+    for pool in pools:
+        pool.shutdown(wait=False)
+
+
+def wait_for(pool, tick_id, status="done"):
+    deadline = time.monotonic() + 5
+    while pool.status(tick_id)["status"] != status:
+        assert time.monotonic() < deadline, pool.status(tick_id)
+        time.sleep(0.01)
+    return pool.status(tick_id)
+
+
+def test_job_runs_and_publishes_its_decisions(make_jobs):
+    pool = make_jobs()
+    decisions = [{"action": "STAY", "ticker": "AAA", "quantity": 0}]
+
+    job = pool.submit("t1", {"positions_evaluated": 1}, lambda: {"decisions": decisions})
+
+    assert job["status"] == "queued" and job["summary"] == {"positions_evaluated": 1}
+    assert wait_for(pool, "t1")["decisions"] == decisions
+    # Another worker process only has the result file to go on
+    assert make_jobs().status("t1")["decisions"] == decisions
+    assert pool.status("unknown") is None
+
+
+def test_queued_and_running_jobs_are_visible_to_other_workers(make_jobs):
+    pool, other = make_jobs(workers=1), make_jobs()
+    release = threading.Event()
+    pool.submit("t1", {}, lambda: release.wait(5) and {})
+    pool.submit("t2", {}, dict)
+
+    wait_for(other, "t1", "running")
+    assert other.status("t2")["status"] == "queued"
+    release.set()
+    assert wait_for(other, "t2")["status"] == "done"
+
+
+def test_failed_work_is_published_as_failed(make_jobs):
+    pool = make_jobs()
+
+    def work():
+        raise RuntimeError("make_trade down")
+
+    pool.submit("t1", {}, work)
+
+    assert wait_for(pool, "t1", "failed")["message"] == "make_trade down"
+    assert pool.stats()["failed"] == 1
+
+
+def test_full_queue_is_rejected_then_saturation_makes_the_pool_unavailable(make_jobs):
+    pool = make_jobs(workers=1, max_queue=1, saturation_s=0.1)
+    release = threading.Event()
+    pool.submit("t1", {}, lambda: release.wait(5) and {})
+
+    with pytest.raises(QueueFull):
+        pool.submit("t2", {}, dict)
+    time.sleep(0.15)
+    with pytest.raises(PoolUnavailable):
+        pool.submit("t3", {}, dict)
+
+    release.set()
+    wait_for(pool, "t1")
+    pool.submit("t4", {}, dict)
+    stats = pool.stats()
+    assert (stats["rejected"], stats["unavailable"], stats["accepted"]) == (1, 1, 2)
+
+
+def test_tick_id_in_flight_is_rejected(make_jobs):
+    pool = make_jobs()
+    release = threading.Event()
+    pool.submit("t1", {}, lambda: release.wait(5) and {})
+
+    with pytest.raises(TickInFlight):
+        pool.submit("t1", {}, dict)
+
+    release.set()
+    wait_for(pool, "t1")
+    pool.submit("t1", {}, dict)
+    assert pool.stats()["duplicates"] == 1
+
+
+def test_shutdown_fails_queued_ticks_and_refuses_new_ones(make_jobs):
+    pool = make_jobs(workers=1)
+    release = threading.Event()
+    pool.submit("running", {}, lambda: release.wait(5) and {})
+    pool.submit("queued", {}, dict)
+
+    threading.Timer(0.1, release.set).start()
+    pool.shutdown()
+
+    assert pool.status("running")["status"] == "done"
+    queued = pool.status("queued")
+    assert queued["status"] == "failed" and "shut down" in queued["message"]
+    assert pool.depth() == 0
+    with pytest.raises(PoolUnavailable):
+        pool.submit("late", {}, dict)
+
+
+def test_reserved_slot_counts_until_submitted_or_released(make_jobs):
+    pool = make_jobs(max_queue=1, saturation_s=0)
+    pool.reserve("t1")
+
+    with pytest.raises(QueueFull):
+        pool.reserve("t2")
+    with pytest.raises(TickInFlight):
+        pool.submit("t1", {}, dict)
+
+    pool.release("t1")
+    pool.reserve("t2")
+    pool.submit("t2", {}, dict, reserved=True)
+    wait_for(pool, "t2")
+    assert pool.depth() == 0
+    with pytest.raises(ValueError):
+        pool.submit("t3", {}, dict, reserved=True)
+
+
+def test_reserved_slot_is_refused_after_shutdown(make_jobs):
+    pool = make_jobs()
+    pool.reserve("t1")
+    pool.shutdown()
+
+    with pytest.raises(PoolUnavailable):
+        pool.submit("t1", {}, dict, reserved=True)
+    assert pool.depth() == 0
+
+
+def test_old_result_files_are_swept_at_start(make_jobs, tmp_path):
+    results_dir = tmp_path / "jobs"
+    results_dir.mkdir()
+    old, fresh, other = results_dir / "old.json", results_dir / "fresh.json", results_dir / "notes.txt"
+    for path in (old, fresh, other):
+        path.write_text("{}")
+    os.utime(old, (time.time() - 7200, time.time() - 7200))
+    os.utime(other, (time.time() - 7200, time.time() - 7200))
+
+    pool = make_jobs(result_ttl=3600)
+
+    assert sorted(os.listdir(results_dir)) == ["fresh.json", "notes.txt"]
+    assert pool.stats()["results_swept"] == 1
+
+
+# --- /tick?mode=async ---------------------------------------------------------
+
+def test_async_tick_answers_202_and_reports_status(client):
+    response = client.post("/tick/a1?mode=async&strategy=stay", json=make_payload(), headers=API_HEADERS)
+
+    assert response.status_code == 202
+    body = response.get_json()
+    assert body["status_url"] == "/tick/a1/status"
+    assert body["summary"]["positions_evaluated"] == 1
+    wait_for(tick_jobs.get_tick_jobs(), "a1")
+    status = client.get("/tick/a1/status", headers=API_HEADERS).get_json()
+    assert status["status"] == "done" and len(status["decisions"]) == 2
+
+    assert client.get("/tick/nope/status", headers=API_HEADERS).status_code == 404
+
+
+@pytest.mark.parametrize("pool_kwargs, closed, code", [
+    ({"max_queue": 0, "saturation_s": 0}, False, 429),
+    ({}, True, 503),
+])
+def test_async_tick_backpressure_codes(client, make_jobs, monkeypatch, pool_kwargs, closed, code):
+    pool = make_jobs(**pool_kwargs)
+    if closed:
+        pool.shutdown()
+    monkeypatch.setattr(tick_jobs, "_jobs", pool)
+
+    response = client.post("/tick/a1?mode=async&strategy=stay", json=make_payload(), headers=API_HEADERS)
+
+    assert response.status_code == code
+    assert "Retry-After" in response.headers
+
+
+def test_rejected_async_tick_leaves_price_history_and_indicators_alone(client, make_jobs, monkeypatch):
+    monkeypatch.setattr(tick_jobs, "_jobs", make_jobs(max_queue=0, saturation_s=0))
+    payload = make_payload(history=[{"ticker": "AAA", "price": 100.0, "day": "2025-04-01"}])
+
+    assert client.post("/tick/a1?mode=async&strategy=stay", json=payload, headers=API_HEADERS).status_code == 429
+
+    assert timeseries.get_timeseries().tickers() == []
+    assert indicators.get_indicators().snapshot(["AAA"])["count"].tolist() == [0]
+    pool = make_jobs()
+    monkeypatch.setattr(tick_jobs, "_jobs", pool)
+    assert client.post("/tick/a1?mode=async&strategy=stay", json=payload, headers=API_HEADERS).status_code == 202
+    assert indicators.get_indicators().snapshot(["AAA"])["count"].tolist() == [1]
+    wait_for(pool, "a1")
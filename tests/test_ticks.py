@@ -0,0 +1,176 @@
+import io
+import threading
+
+import pytest
+
+import business
+import codec
+import storage
+from app import read_lines
+from conftest import API_HEADERS, make_payload, make_tick
+
+
+def item(tick_id, payload=None):
+    return {"id": tick_id, "payload": make_payload() if payload is None else payload}
+
+
+# --- /ticks batch endpoint (user-015) ----------------------------------------
+
+def test_batch_answers_every_tick_in_request_order(client):
+    batch = [item(f"t{i}", make_payload(market={"AAA": 100.0 + i})) for i in range(6)]
+
+    response = client.post("/ticks?strategy=stay", json=batch, headers=API_HEADERS)
+
+    assert response.status_code == 200
+    results = response.get_json()["results"]
+    assert [r["id"] for r in results] == [f"t{i}" for i in range(6)]
+    assert all(r["result"] == "success" and r["strategy"] == "stay" and not r["replayed"] for r in results)
+    assert [r["summary"]["unrealized_pnl"] for r in results] == [0.0, 10.0, 20.0, 30.0, 40.0, 50.0]
+    # Two positions logged as TICK_UPDATE plus two STAY decisions per tick
+    assert storage.get_store().count_trading_log() == 6 * 4
+
+
+def test_invalid_items_fail_alone(client):
+    bad = make_payload()
+    del bad["Positions"][0]["quantity"]
+    batch = [item("ok1"), item("bad", bad), "not an object", {"id": "", "payload": {}}, {"id": "nopayload"}, item("ok2")]
+
+    results = client.post("/ticks?strategy=stay", json=batch, headers=API_HEADERS).get_json()["results"]
+
+    assert [r["id"] for r in results] == ["ok1", "bad", None, None, "nopayload", "ok2"]
+    assert [r["result"] for r in results] == ["success", "failure", "failure", "failure", "failure", "success"]
+    assert results[1]["errors"] == ["Positions[0] missing required field: quantity"]
+    assert results[2]["message"] == "[2] must be an object"
+    assert results[3]["message"] == "[3].id must be a non-empty string"
+    assert results[4]["message"] == "[4] missing required field: payload"
+
+
+def test_repeated_tick_in_a_batch_is_replayed(client):
+    client.post("/tick/t1?strategy=stay", json=make_payload(), headers=API_HEADERS)
+
+    results = client.post("/ticks?strategy=stay", json=[item("t1"), item("t2")], headers=API_HEADERS).get_json()["results"]
+
+    assert [r["replayed"] for r in results] == [True, False]
+
+
+@pytest.mark.parametrize("body, message", [
+    ({"id": "t1"}, "Batch must be a JSON array of {id, payload} objects"),
+    ([], "Batch must be a non-empty array"),
+    ([{"id": f"t{i}", "payload": {}} for i in range(501)], "Batch has 501 ticks; at most 500 are allowed"),
+])
+def test_malformed_batch_is_a_400(client, body, message):
+    response = client.post("/ticks", json=body, headers=API_HEADERS)
+
+    assert response.status_code == 400
+    assert response.get_json()["message"] == message
+
+
+def test_batch_needs_the_api_key_and_a_known_strategy(client):
+    assert client.post("/ticks", json=[item("t1")]).status_code == 401
+    assert client.post("/ticks?strategy=nope", json=[item("t1")], headers=API_HEADERS).status_code == 400
+
+
+def test_one_failing_tick_does_not_fail_the_batch(monkeypatch):
+    complete_tick = business.complete_tick
+
+    def fail_t2(tick, tick_id, evaluation, strategy=None):
+        if tick_id == "t2":
+            raise RuntimeError("boom")
+        return complete_tick(tick, tick_id, evaluation, strategy)
+
+    monkeypatch.setattr(business, "complete_tick", fail_t2)
+
+    results = business.process_tick_batch([(f"t{i}", make_tick()) for i in range(1, 4)], "stay")
+
+    assert [r["result"] for r in results] == ["success", "failure", "success"]
+    assert results[1] == {"id": "t2", "result": "failure", "message": "Processing error: boom"}
+
+
+def test_batch_decides_ticks_concurrently(monkeypatch):
+    monkeypatch.setattr(business, "BATCH_TICK_PARALLELISM", 3)
+    barrier = threading.Barrier(3, timeout=5)
+
+    def decide(tick, tick_id, evaluation, strategy=None):
+        barrier.wait()
+        return {"result": "success"}
+
+    monkeypatch.setattr(business, "complete_tick", decide)
+
+    results = business.process_tick_batch([(f"t{i}", make_tick()) for i in range(3)], "stay")
+
+    assert [r["result"] for r in results] == ["success"] * 3
+
+
+# --- /ticks/stream NDJSON endpoint (user-016) --------------------------------
+
+def ndjson(*lines):
+    return b"".join((line if isinstance(line, bytes) else codec.dumpb(line)) + b"\n" for line in lines)
+
+
+def test_stream_answers_each_line_in_order(client):
+    body = ndjson(*(item(f"t{i}", make_payload(market={"AAA": 100.0 + i})) for i in range(10)))
+
+    response = client.post("/ticks/stream?strategy=stay", data=body, headers=API_HEADERS)
+
+    assert response.status_code == 200
+    assert response.mimetype == "application/x-ndjson"
+    results = [codec.loads(line) for line in response.data.splitlines()]
+    assert [(r["id"], r["line"], r["result"]) for r in results] == [(f"t{i}", i + 1, "success") for i in range(10)]
+    assert [r["summary"]["unrealized_pnl"] for r in results] == [10.0 * i for i in range(10)]
+
+
+def test_bad_lines_fail_alone_and_blank_lines_are_skipped(client):
+    bad = make_payload()
+    bad["Market_Summary"] = []
+    body = ndjson(item("t1"), b"{not json", b"", item("bad", bad), ["x"], item("t2"))
+
+    response = client.post("/ticks/stream?strategy=stay", data=body, headers=API_HEADERS)
+
+    results = [codec.loads(line) for line in response.data.splitlines()]
+    assert [(r["id"], r["line"], r["result"]) for r in results] == [
+        ("t1", 1, "success"), (None, 2, "failure"), ("bad", 4, "failure"), (None, 5, "failure"), ("t2", 6, "success"),
+    ]
+    assert results[1]["errors"] == ["line 2 is not valid JSON"]
+    assert results[2]["message"] == "Market Summary must be a non-empty list"
+    assert results[3]["message"] == "line 5 must be an object"
+
+
+def test_overlong_line_is_skipped_without_buffering_it():
+    lines = list(read_lines(io.BytesIO(b'{"id":"a"}\n' + b"x" * 100 + b"\n" + b'{"id":"b"}'), max_bytes=16))
+
+    assert lines == [b'{"id":"a"}\n', b"<line too long>", b'{"id":"b"}']
+    results = list(business.process_tick_stream([lines[1]]))
+    assert results[0]["errors"] == ["line 1 is not valid JSON"]
+
+
+def test_stream_reads_at_most_window_lines_ahead(monkeypatch):
+    release = threading.Event()
+    read = []
+
+    def slow(tick, tick_id, strategy=None):
+        release.wait(5)
+        return {"result": "success"}, False
+
+    def lines():
+        for i in range(10):
+            read.append(i)
+            yield codec.dumpb(item(f"t{i}"))
+
+    monkeypatch.setattr(business, "process_tick", slow)
+    stream = business.process_tick_stream(lines(), window=3)
+    first = threading.Thread(target=lambda: next(stream))
+    first.start()
+    first.join(0.2)
+
+    # The window is full: the fourth line is read only once the first result is out
+    assert len(read) == 4
+    release.set()
+    first.join(5)
+    assert [r["id"] for r in stream] == [f"t{i}" for i in range(1, 10)]
+
+
+def test_stream_needs_the_api_key_and_a_known_strategy(client):
+    body = ndjson(item("t1"))
+
+    assert client.post("/ticks/stream", data=body).status_code == 401
+    assert client.post("/ticks/stream?strategy=nope", data=body, headers=API_HEADERS).status_code == 400
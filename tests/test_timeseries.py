@@ -0,0 +1,145 @@
+import os
+import time
+
+import strategies
+import timeseries
+from conftest import API_HEADERS, make_payload, make_tick
+from timeseries import TimeSeriesStore
+
+
+def history(ticker, *points):
+    return [{"ticker": ticker, "price": price, "day": day} for day, price in points]
+
+
+def series(store, ticker):
+    days, prices = store.window(ticker)
+    return list(zip(days, prices.tolist()))
+
+
+# --- accumulated per-ticker price history (user-021) -------------------------
+
+def test_merge_dedupes_on_day_with_the_latest_price_winning():
+    store = TimeSeriesStore(path="")
+
+    store.merge([("AAA", "2025-04-02", 2.0), ("AAA", "2025-04-01", 1.0), ("BBB", "2025-04-01", 5.0)])
+    store.merge([("AAA", "2025-04-02", 2.5), ("AAA", "2025-04-03", 3.0)])
+
+    assert series(store, "AAA") == [("2025-04-01", 1.0), ("2025-04-02", 2.5), ("2025-04-03", 3.0)]
+    assert store.tickers() == ["AAA", "BBB"]
+    assert store.stats()["points"] == 4 and store.stats()["merges"] == 2
+
+
+def test_each_series_keeps_the_newest_max_points_days():
+    store = TimeSeriesStore(path="", max_points=3)
+
+    store.merge([("AAA", f"day-{i:02d}", float(i)) for i in range(10)])
+    store.merge([("AAA", "day-00", 0.0), ("AAA", "day-08", 8.5)])
+
+    assert series(store, "AAA") == [("day-07", 7.0), ("day-08", 8.5), ("day-09", 9.0)]
+
+
+def test_window_is_a_view_of_the_newest_prices():
+    store = TimeSeriesStore(path="")
+    store.merge([("AAA", f"day-{i}", float(i)) for i in range(5)])
+
+    days, prices = store.window("AAA", 2)
+
+    assert days == ["day-3", "day-4"] and prices.tolist() == [3.0, 4.0]
+    assert not prices.flags.owndata
+    assert store.prices("AAA", 10).tolist() == [0.0, 1.0, 2.0, 3.0, 4.0]
+    assert store.window("ZZZ", 3)[0] == [] and store.prices("AAA", 0).size == 0
+
+
+def test_merge_tick_files_the_summary_price_under_the_newest_history_day():
+    store = TimeSeriesStore(path="")
+    tick = make_tick(market={"AAA": 103.0},
+                     history=history("AAA", ("2025-04-01", 101.0), ("2025-04-02", 102.0))
+                     + [{"ticker": "AAA", "price": 99.0}])
+
+    store.merge_tick(tick)
+
+    assert series(store, "AAA") == [("2025-04-01", 101.0), ("2025-04-02", 103.0)]
+
+
+def test_save_and_load_round_trip(tmp_path):
+    path = str(tmp_path / "prices.npz")
+    store = TimeSeriesStore(path=path, flush_interval=0)
+    store.merge([("AAA", "d1", 1.0), ("AAA", "d2", 2.0), ("BBB", "d1", 5.0)])
+
+    assert store.save() is True
+
+    loaded = TimeSeriesStore(path=path, flush_interval=0)
+    assert series(loaded, "AAA") == [("d1", 1.0), ("d2", 2.0)] and series(loaded, "BBB") == [("d1", 5.0)]
+    assert TimeSeriesStore(path=path, max_points=1, flush_interval=0).prices("AAA").tolist() == [2.0]
+    assert os.listdir(tmp_path) == ["prices.npz"]
+
+
+def test_unreadable_file_starts_empty(tmp_path):
+    path = tmp_path / "prices.npz"
+    path.write_bytes(b"not an npz")
+
+    assert TimeSeriesStore(path=str(path), flush_interval=0).tickers() == []
+
+
+def test_failed_save_is_counted_and_retried(tmp_path):
+    store = TimeSeriesStore(path=str(tmp_path / "missing" / "prices.npz"), flush_interval=0)
+    store.merge([("AAA", "d1", 1.0)])
+
+    assert store.save() is False
+    assert store.stats()["save_errors"] == 1
+
+    os.mkdir(tmp_path / "missing")
+    store.flush()
+    assert store.stats()["saves"] == 1
+    assert os.listdir(tmp_path / "missing") == ["prices.npz"]
+
+
+def test_background_flush_saves_off_the_request_path(tmp_path):
+    path = str(tmp_path / "prices.npz")
+    store = TimeSeriesStore(path=path, flush_interval=0.02)
+    store.merge([("AAA", "d1", 1.0)])
+    assert store.stats()["saves"] == 0
+
+    deadline = time.monotonic() + 5
+    while store.stats()["saves"] == 0:
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+    store.close()
+
+    assert not store._flusher.is_alive()
+    assert TimeSeriesStore(path=path, flush_interval=0).prices("AAA").tolist() == [1.0]
+
+
+def test_close_saves_unflushed_points(tmp_path):
+    path = str(tmp_path / "prices.npz")
+    store = TimeSeriesStore(path=path, flush_interval=60)
+    store.merge([("AAA", "d1", 1.0)])
+
+    store.close()
+
+    assert store.stats()["saves"] == 1
+    store.close()
+    assert store.stats()["saves"] == 1
+
+
+def test_lookback_strategies_read_the_accumulated_history(monkeypatch):
+    store = TimeSeriesStore(path="")
+    store.merge([("AAA", f"d{i}", price) for i, price in enumerate([90.0, 100.0, 100.0])])
+    monkeypatch.setattr(timeseries, "_timeseries", store)
+
+    # The tick's own history says AAA is flat; the last two accumulated days say it is up 10%
+    tick = make_tick(market={"AAA": 110.0}, history=history("AAA", ("d9", 110.0)))
+
+    assert strategies.momentum(threshold=0.05)(tick)[0]["action"] == "STAY"
+    assert strategies.momentum(threshold=0.05, lookback=2)(tick)[0]["action"] == "BUY"
+
+
+def test_price_history_api(client):
+    payload = make_payload(market={"AAA": 102.0}, history=history("AAA", ("2025-04-01", 101.0), ("2025-04-02", 99.0)))
+    client.post("/tick/t1?strategy=stay", json=payload, headers=API_HEADERS)
+
+    data = client.get("/api/price_history/AAA?limit=1", headers=API_HEADERS).get_json()
+
+    assert data == {"result": "success", "ticker": "AAA", "data": [{"day": "2025-04-02", "price": 102.0}]}
+    assert client.get("/api/price_history/AAA?limit=x", headers=API_HEADERS).status_code == 400
+    assert client.get("/api/price_history/AAA").status_code == 401
@@ -0,0 +1,201 @@
+import pytest
+
+from conftest import API_HEADERS, make_payload
+from validators import TICK_SCHEMA, TickErrors, normalize_tick_payload, validate_tick_payload, validate_trading_log_query
+
+
+# --- single-pass normalizer (user-012) ---------------------------------------
+
+def test_normalizes_every_key_spelling_into_parsed_columns():
+    tick, errors = normalize_tick_payload({
+        "positions": [{"ticker": "AAA", "quantity": "10", "purchaseprice": 100},
+                      {"ticker": "CASH", "quantity": 5.5, "purchase_price": "1"}],
+        "marketSummary": [{"ticker": "AAA", "currentprice": "101.5", "category": "tech"},
+                          {"ticker": "BBB", "current_price": 50}],
+    })
+
+    assert errors == []
+    assert tick.tickers == ["AAA", "CASH"]
+    assert tick.quantity == [10.0, 5.5] and tick.purchase_price == [100.0, 1.0]
+    assert all(type(value) is float for value in tick.quantity + tick.purchase_price + tick.current_price)
+    assert tick.market_tickers == ["AAA", "BBB"]
+    assert tick.current_price == [101.5, 50.0]
+    assert tick.category == ["tech", None]
+    assert tick.market_index == {"AAA": 0, "BBB": 1}
+
+
+def test_later_market_duplicate_overrides_the_earlier_row():
+    payload = make_payload()
+    payload["Market_Summary"] = [
+        {"ticker": "AAA", "current_price": 1.0}, {"ticker": "BBB", "current_price": 2.0},
+        {"ticker": "AAA", "current_price": 3.0, "category": "late"},
+    ]
+
+    tick, _ = normalize_tick_payload(payload)
+
+    assert tick.market_tickers == ["AAA", "BBB"]
+    assert tick.current_price == [3.0, 2.0]
+    assert tick.category == ["late", None]
+
+
+def test_validate_tick_payload_keeps_its_boolean_shape():
+    assert validate_tick_payload(make_payload()) == (True, None)
+    assert validate_tick_payload({"Positions": []}) == (False, "Missing required field: MarketSummary")
+
+
+@pytest.mark.parametrize("ticker", ["", 5, None, ["AAA"], {"t": 1}])
+@pytest.mark.parametrize("key, section", [
+    ("Positions", "Positions"), ("Market_Summary", "MarketSummary"), ("market_history", "market_history"),
+])
+def test_ticker_must_be_a_non_empty_string_in_every_section(client, key, section, ticker):
+    payload = make_payload(history=[{"ticker": "AAA", "price": 1.0, "day": "2025-04-01"}])
+    payload[key][0]["ticker"] = ticker
+
+    response = client.post("/tick/bad?strategy=stay", json=payload, headers=API_HEADERS)
+
+    assert response.status_code == 400
+    assert response.get_json()["errors"] == [f"{section}[0].ticker must be a non-empty string"]
+
+
+# --- trading log query filters (user-007) ------------------------------------
+
+def test_trading_log_query_accepts_padded_dates_and_known_actions():
+    assert validate_trading_log_query("SELL", "2025-01-05", "2025-12-31") == (True, None)
+    assert validate_trading_log_query(None, None, None) == (True, None)
+
+
+@pytest.mark.parametrize("date", ["2025-1-05", "2025-01-5", "25-01-05", "2025-01-05T00:00", "２０２５-01-05", "2025-13-01"])
+def test_trading_log_query_rejects_dates_that_would_sort_wrong(date):
+    is_valid, message = validate_trading_log_query(None, date, None)
+
+    assert not is_valid
+    assert message == "start_date must be a date in YYYY-MM-DD format"
+
+
+# --- schema-driven validation with every error (user-013) --------------------
+
+def position(**fields):
+    return {"ticker": "AAA", "quantity": 1, "purchase_price": 1, **fields}
+
+
+@pytest.mark.parametrize("payload, message", [
+    (None, "Payload must be a JSON object"),
+    ({}, "Missing required field: Positions"),
+    ({"Positions": [position()]}, "Missing required field: MarketSummary"),
+    ({"Positions": {}, "MarketSummary": [{}]}, "Positions must be a list"),
+    ({"Positions": [], "MarketSummary": [{}]}, "Positions must be a non-empty list"),
+    ({"Positions": [1], "MarketSummary": [{}]}, "Each position must be an object"),
+    ({"Positions": [{"ticker": "AAA", "quantity": "x"}], "MarketSummary": []},
+     "Position missing required fields (ticker, quantity, purchaseprice)"),
+    ({"Positions": [position(quantity="x")], "MarketSummary": []}, "Position quantity and purchaseprice must be numeric"),
+    ({"Positions": [position(quantity=None)], "MarketSummary": []}, "Position quantity and purchaseprice must be numeric"),
+    ({"Positions": [position()], "MarketSummary": "x"}, "Market Summary must be a list"),
+    ({"Positions": [position()], "MarketSummary": []}, "Market Summary must be a non-empty list"),
+    ({"Positions": [position()], "MarketSummary": [[]]}, "Each market summary entry must be an object"),
+    ({"Positions": [position()], "MarketSummary": [{"ticker": "AAA"}]},
+     "Market summary missing required fields (ticker, currentprice)"),
+    ({"Positions": [position()], "MarketSummary": [{"ticker": "AAA", "current_price": "x"}]},
+     "Market summary currentprice must be numeric"),
+])
+def test_message_keeps_the_original_wording(payload, message):
+    tick, errors = normalize_tick_payload(payload)
+
+    assert tick is None
+    assert isinstance(errors, TickErrors)
+    assert errors.message == message
+
+
+def test_errors_lists_every_problem_with_its_location():
+    _, errors = normalize_tick_payload({
+        "Positions": [position(), {"ticker": "BBB"}, position(quantity="many", purchase_price="1e400")],
+        "Market_Summary": [{"ticker": "AAA", "current_price": 1, "category": 7}, "row"],
+        "market_history": [{"ticker": "AAA", "price": 1, "Day": 20250401}],
+    })
+
+    assert list(errors) == [
+        "Positions[1] missing required field: quantity",
+        "Positions[1] missing required field: purchase_price",
+        "Positions[2].quantity must be numeric",
+        "Positions[2].purchase_price must be a finite number",
+        "MarketSummary[0].category must be a string",
+        "MarketSummary[1] must be an object",
+        "market_history[0].day must be a string",
+    ]
+    assert errors.message == "Position missing required fields (ticker, quantity, purchaseprice)"
+
+
+def test_market_history_is_optional_but_checked_when_present():
+    assert normalize_tick_payload(make_payload())[1] == []
+
+    _, errors = normalize_tick_payload(make_payload(history=[{"ticker": "AAA"}]))
+
+    assert list(errors) == ["market_history[0] missing required field: price"]
+
+
+def test_market_history_becomes_typed_columns():
+    tick, _ = normalize_tick_payload(make_payload(history=[
+        {"ticker": "AAA", "price": "99.5", "day": "2025-04-01"},
+        {"ticker": "BBB", "price": 50, "Day": "2025-04-02"},
+        {"ticker": "AAA", "price": 100},
+    ]))
+
+    assert tick.history_tickers == ["AAA", "BBB", "AAA"]
+    assert tick.history_price == [99.5, 50.0, 100.0]
+    assert tick.history_day == ["2025-04-01", "2025-04-02", None]
+
+
+def test_preferred_spelling_wins_when_items_mix_them():
+    tick, _ = normalize_tick_payload({
+        "Positions": [
+            {"ticker": "AAA", "quantity": 1, "purchase_price": 5},
+            {"ticker": "BBB", "quantity": 2, "purchase_price": 7, "purchaseprice": 6},
+            {"ticker": "CCC", "quantity": 3, "purchaseprice": 8},
+        ],
+        "MarketSummary": [{"ticker": "AAA", "current_price": 1, "currentprice": 2}, {"ticker": "BBB", "current_price": 3}],
+    })
+
+    assert tick.purchase_price == [5.0, 6.0, 8.0]
+    assert tick.current_price == [2.0, 3.0]
+    assert tick.category == [None, None]
+
+
+@pytest.mark.parametrize("field, value", [
+    ("ticker", None), ("ticker", ""), ("ticker", 5), ("quantity", None), ("quantity", "x"), ("quantity", True),
+    ("quantity", "1e400"), ("quantity", 10 ** 400), ("purchase_price", float("nan")), ("category", 1),
+    ("category", None), ("category", ""),
+])
+def test_compiled_fast_path_agrees_with_the_detailed_checks(field, value):
+    # A large valid section with one changed value: either it converts, or the error is found and reported
+    tickers = [f"T{i}" for i in range(200)]
+    payload = make_payload(positions=dict.fromkeys(tickers, (1.0, 1.0)), market=dict.fromkeys(tickers, 1.0))
+    section = payload["Market_Summary"] if field == "category" else payload["Positions"]
+    section[150][field] = value
+
+    tick, errors = normalize_tick_payload(payload)
+
+    assert (tick is None) == bool(errors)
+    if tick is not None:
+        column = tick.category if field == "category" else getattr(tick, field if field != "ticker" else "tickers")
+        assert column[150] == (value if field in ("ticker", "category") else float(value))
+
+
+def test_every_schema_section_declares_its_fields():
+    for section, spec in TICK_SCHEMA.items():
+        assert spec["keys"], section
+        assert spec["fields"]["ticker"] == {"type": "string", "required": True, "non_empty": True}
+        assert all(rule["type"] in ("number", "string") for rule in spec["fields"].values())
+
+
+def test_bad_tick_answers_400_with_message_and_errors(client):
+    payload = make_payload()
+    payload["Positions"][0]["quantity"] = "lots"
+    payload["Market_Summary"][0]["current_price"] = None
+
+    response = client.post("/tick/bad", json=payload, headers=API_HEADERS)
+
+    assert response.status_code == 400
+    assert response.get_json() == {
+        "result": "failure",
+        "message": "Position quantity and purchaseprice must be numeric",
+        "errors": ["Positions[0].quantity must be numeric", "MarketSummary[0].current_price must be numeric"],
+    }
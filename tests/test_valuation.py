@@ -0,0 +1,88 @@
+import math
+import random
+
+import numpy as np
+import pytest
+
+import valuation
+from conftest import make_tick
+from valuation import join_rows, loop_value, value_arrays, value_portfolio, value_tick, value_ticks
+
+
+def assert_same_valuation(actual, expected):
+    assert actual.tickers == expected.tickers
+    for field in ("priced", "quantity", "purchase_price", "current_price", "market_value",
+                  "cost_basis", "unrealized_pnl", "weights"):
+        np.testing.assert_allclose(getattr(actual, field), getattr(expected, field), err_msg=field)
+    assert actual.total_market_value == pytest.approx(expected.total_market_value)
+    assert actual.total_unrealized_pnl == pytest.approx(expected.total_unrealized_pnl)
+    assert actual.positions_evaluated == expected.positions_evaluated
+
+
+def random_book(n, seed=0):
+    rng = random.Random(seed)
+    tickers = [f"T{i}" for i in range(n)]
+    # About one position in five has no market price; MKT keeps the summary non-empty
+    market = {ticker: round(rng.uniform(1, 500), 2) for ticker in tickers if rng.random() < 0.8}
+    market["MKT"] = 1.0
+    positions = {ticker: (float(rng.randint(1, 100)), round(rng.uniform(1, 500), 2)) for ticker in tickers}
+    return make_tick(positions=positions, market=market)
+
+
+def test_values_a_book_against_the_market_summary():
+    result = value_portfolio(
+        [
+            {"ticker": "AAA", "quantity": 10, "purchaseprice": 100},
+            {"ticker": "BBB", "quantity": 5, "purchase_price": "20"},
+            {"ticker": "CCC", "quantity": 1, "purchase_price": 1},   # no market price
+            {"ticker": "AAA", "quantity": 2},                        # no purchase price
+        ],
+        [{"ticker": "AAA", "current_price": 90}, {"ticker": "BBB", "currentprice": 25},
+         {"ticker": "AAA", "current_price": 110}],                   # later duplicate wins
+    )
+
+    assert result.priced.tolist() == [True, True, False, False]
+    assert result.current_price[:2].tolist() == [110.0, 25.0]
+    assert math.isnan(result.current_price[2])
+    assert result.unrealized_pnl.tolist() == [100.0, 25.0, 0.0, 0.0]
+    assert result.total_market_value == 1100.0 + 125.0
+    assert result.total_unrealized_pnl == 125.0
+    assert result.positions_evaluated == 2
+    assert result.weights.sum() == pytest.approx(1.0)
+
+
+@pytest.mark.parametrize("n", [1, 10, 200])
+def test_loop_and_array_pass_agree(n):
+    tick = random_book(n, seed=n)
+    prices = np.array(tick.current_price, dtype=np.float64)
+
+    arrays = value_arrays(tick.tickers, join_rows(tick.tickers, tick.market_index),
+                          np.array(tick.quantity), np.array(tick.purchase_price), prices)
+    loop = loop_value(tick.tickers, tick.quantity, tick.purchase_price, tick.market_index, tick.current_price)
+
+    assert_same_valuation(loop, arrays)
+
+
+def test_value_tick_gives_the_same_result_on_either_side_of_the_crossover(monkeypatch):
+    tick = random_book(valuation.LOOP_MAX_POSITIONS)
+    small = value_tick(tick)
+
+    monkeypatch.setattr(valuation, "LOOP_MAX_POSITIONS", 0)
+
+    assert_same_valuation(value_tick(tick), small)
+
+
+def test_no_market_value_gives_zero_weights():
+    result = value_tick(make_tick(positions={"AAA": (1.0, 10.0)}, market={"BBB": 5.0}))
+
+    assert result.weights.tolist() == [0.0]
+    assert result.positions_evaluated == 0
+
+
+def test_value_ticks_matches_valuing_each_tick_alone():
+    ticks = [random_book(5, seed=1), random_book(1, seed=2), random_book(80, seed=3),
+             make_tick(positions={"AAA": (1.0, 10.0)}, market={"BBB": 5.0})]
+
+    for batched, tick in zip(value_ticks(ticks), ticks):
+        assert_same_valuation(batched, value_tick(tick))
+    assert value_ticks([]) == []
@@ -0,0 +1,292 @@
+"""
+Asynchronous /tick processing.
+
+In async mode the request thread only runs the fast valuation stage and answers
+202 with the summary. The slow decision stage (ChatGPT + make_trade) runs on a
+bounded worker pool and its result is published for /tick/<tick_id>/status.
+
+Every job record is also written to TICK_JOBS_DIR, when it is queued, when it
+starts running and when it finishes, so that with several gunicorn workers any
+worker can answer the status call. The queue itself stays with the worker that
+accepted the tick. Record files older than TICK_JOB_RESULT_TTL_S, e.g. left
+behind by earlier processes, are swept when the pool starts.
+
+Backpressure: a full queue answers 429 while the pool is still finishing
+ticks. A queue that has stayed full with nothing finishing for
+TICK_ASYNC_SATURATION_S, or a pool that is shutting down (at process exit),
+answers 503. A tick is admitted (TickJobs.reserve) before its valuation stage
+runs, so a rejected tick leaves no trace in the price history or indicators
+and its retry is not counted twice.
+"""
+import atexit
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import codec
+from config import (
+    TICK_ASYNC_WORKERS, TICK_ASYNC_QUEUE_SIZE, TICK_ASYNC_SATURATION_S,
+    TICK_JOB_RETENTION, TICK_JOBS_DIR, TICK_JOB_RESULT_TTL_S,
+)
+
+
+class QueueFull(Exception):
+    """Raised when the async pool already holds its maximum number of ticks (HTTP 429)."""
+
+
+class PoolUnavailable(Exception):
+    """Raised when the async pool is shutting down or has stayed saturated (HTTP 503)."""
+
+
+class TickInFlight(Exception):
+    """Raised when a tick_id is submitted again while its first job is still queued or running (HTTP 409)."""
+
+
+class TickJobs:
+    """Bounded worker pool plus a registry of recent async tick results."""
+
+    def __init__(self, workers=TICK_ASYNC_WORKERS, max_queue=TICK_ASYNC_QUEUE_SIZE,
+                 retention=TICK_JOB_RETENTION, results_dir=TICK_JOBS_DIR,
+                 saturation_s=TICK_ASYNC_SATURATION_S, result_ttl=TICK_JOB_RESULT_TTL_S):
+        self.max_queue = max_queue
+        self.retention = retention
+        self.results_dir = results_dir
+        self.saturation_s = saturation_s
+        self.result_ttl = result_ttl
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="tick-worker")
+        self._lock = threading.Lock()
+        self._jobs = OrderedDict()
+        # tick_id -> Future of a job not finished yet
+        self._futures = {}
+        # tick_ids holding a slot from reserve() that submit() has not used yet
+        self._reserved = set()
+        self._depth = 0
+        self._closed = False
+        # First rejection since a job last finished; None while the pool is making progress
+        self._full_since = None
+        self.accepted = 0
+        self.rejected = 0
+        self.unavailable = 0
+        self.duplicates = 0
+        self.completed = 0
+        self.failed = 0
+        self.swept = 0
+        if result_ttl > 0:
+            self._sweep_results()
+
+    def reserve(self, tick_id):
+        """
+        Admit tick_id before anything is done for it: takes a queue slot, or
+        raises what submit() would. Follow with submit(..., reserved=True),
+        or release(tick_id) if the tick is not submitted after all.
+        """
+        with self._lock:
+            self._admit(tick_id)
+            self._reserved.add(tick_id)
+
+    def release(self, tick_id):
+        """Give back the slot of a reserve() that will not be submitted."""
+        with self._lock:
+            if tick_id in self._reserved:
+                self._reserved.discard(tick_id)
+                self._depth -= 1
+
+    def submit(self, tick_id, summary, work, reserved=False):
+        """
+        Queue work() for tick_id and return the job record to send back.
+        work() must return the final /tick response dict. With reserved,
+        tick_id already holds the slot taken by reserve().
+
+        Raises:
+            QueueFull: queue depth has reached max_queue
+            PoolUnavailable: the pool is shutting down, or the queue has been
+                full for saturation_s without a job finishing
+            TickInFlight: tick_id already has a queued or running job
+        """
+        with self._lock:
+            if not reserved:
+                self._admit(tick_id)
+            elif tick_id not in self._reserved:
+                raise ValueError(f"Tick {tick_id} has no reserved slot")
+            else:
+                self._reserved.discard(tick_id)
+                if self._closed:
+                    self._depth -= 1
+                    self.unavailable += 1
+                    raise PoolUnavailable("Async tick pool is shutting down")
+            self.accepted += 1
+            job = {"tick_id": tick_id, "status": "queued", "summary": summary, "submitted_at": time.time()}
+            self._jobs[tick_id] = job
+            self._jobs.move_to_end(tick_id)
+            self._evict()
+            # Published before the job can start, so a "running" record is never overwritten by this one
+            snapshot = dict(job)
+            self._save_result(snapshot)
+            # Under the lock, so shutdown() cannot close the executor in between
+            self._futures[tick_id] = self._executor.submit(self._run, job, work)
+        return snapshot
+
+    def _admit(self, tick_id):
+        """Take a queue slot for tick_id or raise why not; caller holds _lock."""
+        if self._closed:
+            self.unavailable += 1
+            raise PoolUnavailable("Async tick pool is shutting down")
+        if tick_id in self._futures or tick_id in self._reserved:
+            self.duplicates += 1
+            status = self._jobs[tick_id]["status"] if tick_id in self._futures else "being submitted"
+            raise TickInFlight(f"Tick {tick_id} is already {status}")
+        if self._depth >= self.max_queue:
+            now = time.monotonic()
+            if self._full_since is None:
+                self._full_since = now
+            if self.saturation_s > 0 and now - self._full_since >= self.saturation_s:
+                self.unavailable += 1
+                raise PoolUnavailable(
+                    f"Async tick queue has been full for {now - self._full_since:.1f}s with no tick finishing"
+                )
+            self.rejected += 1
+            raise QueueFull(f"Async tick queue is full ({self._depth} pending)")
+        self._depth += 1
+
+    def _run(self, job, work):
+        with self._lock:
+            job["status"] = "running"
+            snapshot = dict(job)
+        self._save_result(snapshot)
+        try:
+            result = work()
+            with self._lock:
+                job.update(status="done", decisions=result.get("decisions", []), finished_at=time.time())
+                self.completed += 1
+        except Exception as e:
+            print(f"[ERROR] Async tick {job['tick_id']} failed: {str(e)}")
+            with self._lock:
+                job.update(status="failed", message=str(e), finished_at=time.time())
+                self.failed += 1
+        finally:
+            with self._lock:
+                self._depth -= 1
+                self._full_since = None
+                self._futures.pop(job["tick_id"], None)
+                snapshot = dict(job)
+            self._save_result(snapshot)
+
+    def status(self, tick_id):
+        """Job record for tick_id, or None if this process has never seen it."""
+        with self._lock:
+            job = self._jobs.get(tick_id)
+            if job is not None:
+                return dict(job)
+        return self._load_result(tick_id)
+
+    def depth(self):
+        with self._lock:
+            return self._depth
+
+    def stats(self):
+        with self._lock:
+            return {
+                "queue_depth": self._depth,
+                "queue_capacity": self.max_queue,
+                "accepted": self.accepted,
+                "rejected": self.rejected,
+                "unavailable": self.unavailable,
+                "duplicates": self.duplicates,
+                "completed": self.completed,
+                "failed": self.failed,
+                "results_swept": self.swept,
+            }
+
+    def shutdown(self, wait=True):
+        """
+        Stop accepting ticks (PoolUnavailable from then on) and cancel the
+        queued ones, which are published as failed; running ticks finish
+        (waited for when wait is True). Registered with atexit.
+        """
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+        with self._lock:
+            cancelled = []
+            for tick_id, future in list(self._futures.items()):
+                if future.cancelled():
+                    job = self._jobs[tick_id]
+                    job.update(status="failed", message="Async tick pool shut down before the tick ran",
+                               finished_at=time.time())
+                    self._depth -= 1
+                    self.failed += 1
+                    del self._futures[tick_id]
+                    cancelled.append(dict(job))
+        for job in cancelled:
+            self._save_result(job)
+
+    def _evict(self):
+        """Drop the oldest finished jobs beyond the retention limit; caller holds _lock."""
+        for tick_id in list(self._jobs):
+            if len(self._jobs) <= self.retention:
+                break
+            if self._jobs[tick_id]["status"] in ("done", "failed"):
+                del self._jobs[tick_id]
+                try:
+                    os.remove(self._result_path(tick_id))
+                except OSError:
+                    pass
+
+    def _result_path(self, tick_id):
+        # tick_id comes from the URL, so hash it rather than use it as a filename
+        return os.path.join(self.results_dir, hashlib.sha1(tick_id.encode("utf-8")).hexdigest() + ".json")
+
+    def _save_result(self, job):
+        try:
+            os.makedirs(self.results_dir, exist_ok=True)
+            path = self._result_path(job["tick_id"])
+            tmp_file = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_file, "wb") as f:
+                f.write(codec.dumpb(job))
+            os.replace(tmp_file, path)
+        except Exception as e:
+            print(f"[ERROR] Failed to save async tick result: {str(e)}")
+
+    def _load_result(self, tick_id):
+        try:
+            with open(self._result_path(tick_id), "rb") as f:
+                return codec.loads(f.read())
+        except (OSError, codec.JSONDecodeError):
+            return None
+
+    def _sweep_results(self):
+        """Delete result (and leftover temp) files not modified for result_ttl seconds."""
+        cutoff = time.time() - self.result_ttl
+        try:
+            names = os.listdir(self.results_dir)
+        except OSError:
+            return
+        for name in names:
+            if not (name.endswith(".json") or name.endswith(".tmp")):
+                continue
+            path = os.path.join(self.results_dir, name)
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+                    self.swept += 1
+            except OSError:
+                pass
+
+
+_jobs = None
+_jobs_lock = threading.Lock()
+
+def get_tick_jobs():
+    """Return the process-wide async tick pool, created on first use."""
+    global _jobs
+    if _jobs is None:
+        with _jobs_lock:
+            if _jobs is None:
+                _jobs = TickJobs()
+                atexit.register(_jobs.shutdown)
+    return _jobs
@@ -0,0 +1,240 @@
+"""
+Per-ticker price history accumulated across ticks.
+
+A tick only carries the last couple of days of market_history. Every tick's
+history rows and Market_Summary prices are merged into a TimeSeriesStore, one
+series per ticker, deduplicated on (ticker, day) with the latest price for a
+day winning. The Market_Summary price is filed under the newest day of the
+tick's market_history (today's date when the tick has none). Each series
+keeps at most TIMESERIES_MAX_POINTS days; the oldest are dropped.
+
+Prices sit in a float64 buffer with room to append, so window() hands out the
+last n prices as a contiguous array view without copying. A view reflects
+later same-day updates; copy it to keep a snapshot.
+
+With TIMESERIES_FILE set the store is loaded from that file at start-up and
+saved back by a background thread every TIMESERIES_FLUSH_INTERVAL_S when
+anything changed (and at exit), as one columnar .npz: tickers and per-ticker
+counts, then every day and price concatenated. Saving never runs on a request
+thread, and a failed save is only logged and counted (the next flush retries),
+so persistence problems cannot fail a tick. With several gunicorn workers each
+process keeps its own series and the file holds the one saved last.
+"""
+import atexit
+import os
+import threading
+from bisect import bisect_left
+from datetime import datetime
+
+import numpy as np
+
+from config import TIMESERIES_FILE, TIMESERIES_MAX_POINTS, TIMESERIES_FLUSH_INTERVAL_S
+
+
+class _Series:
+    """Days in ascending order and their prices, at most max_points of them."""
+
+    __slots__ = ("days", "buffer", "start", "max_points")
+
+    def __init__(self, max_points, days=(), prices=()):
+        self.max_points = max_points
+        self.days = list(days)[-max_points:]
+        self.buffer = np.empty(2 * max_points, dtype=np.float64)
+        self.start = 0
+        self.buffer[:len(self.days)] = np.asarray(prices, dtype=np.float64)[len(prices) - len(self.days):]
+
+    @property
+    def end(self):
+        return self.start + len(self.days)
+
+    def prices(self):
+        return self.buffer[self.start:self.end]
+
+    def put(self, day, price):
+        days = self.days
+        if days and day == days[-1]:
+            self.buffer[self.end - 1] = price
+        elif not days or day > days[-1]:
+            if self.end == len(self.buffer):
+                self._rebuild(days, self.prices())
+                days = self.days
+            self.buffer[self.end] = price
+            days.append(day)
+            if len(days) > self.max_points:
+                del days[0]
+                self.start += 1
+        else:
+            i = bisect_left(days, day)
+            if days[i] == day:
+                self.buffer[self.start + i] = price
+            elif i > 0 or len(days) < self.max_points:
+                # An older day filled in late: rare, so rebuild rather than shift in place
+                self._rebuild(days[:i] + [day] + days[i:],
+                              np.concatenate((self.prices()[:i], [price], self.prices()[i:])))
+
+    def _rebuild(self, days, prices):
+        # A new buffer, so views handed out before stay valid
+        keep = min(len(days), self.max_points)
+        days, prices = days[len(days) - keep:], prices[len(prices) - keep:]
+        self.buffer = np.empty(2 * self.max_points, dtype=np.float64)
+        self.buffer[:len(days)] = prices
+        self.days = days
+        self.start = 0
+
+
+class TimeSeriesStore:
+    """Bounded per-ticker price series, in memory with optional .npz persistence."""
+
+    def __init__(self, path=TIMESERIES_FILE, max_points=TIMESERIES_MAX_POINTS,
+                 flush_interval=TIMESERIES_FLUSH_INTERVAL_S):
+        self.path = path
+        self.max_points = max(1, max_points)
+        self.flush_interval = flush_interval
+        self._series = {}
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self._dirty = False
+        self._closed = threading.Event()
+        self._flusher = None
+        self.merges = 0
+        self.saves = 0
+        self.save_errors = 0
+        if path:
+            self._load(path)
+            if flush_interval > 0:
+                self._flusher = threading.Thread(target=self._flush_loop, name="timeseries-flush", daemon=True)
+                self._flusher.start()
+
+    def merge_tick(self, tick):
+        """Merge a normalized tick's market_history rows and Market_Summary prices."""
+        points = [
+            (ticker, day, price)
+            for ticker, price, day in zip(tick.history_tickers, tick.history_price, tick.history_day)
+            if day is not None
+        ]
+        # The summary price is the latest quote of the tick's newest history day
+        today = max((day for _, day, _ in points), default=None) or datetime.now().strftime("%Y-%m-%d")
+        points.extend((ticker, today, price) for ticker, price in zip(tick.market_tickers, tick.current_price))
+        self.merge(points)
+
+    def merge(self, points):
+        """Merge (ticker, day, price) points; a later point for the same day wins."""
+        with self._lock:
+            for ticker, day, price in points:
+                series = self._series.get(ticker)
+                if series is None:
+                    series = self._series[ticker] = _Series(self.max_points)
+                series.put(day, price)
+            self.merges += 1
+            self._dirty = True
+
+    def window(self, ticker, n=None):
+        """
+        The last n (default all) days and prices of a ticker, oldest first, as
+        (list of days, float64 array view); ([], empty array) if unknown.
+        """
+        with self._lock:
+            series = self._series.get(ticker)
+            if series is None:
+                return [], np.empty(0, dtype=np.float64)
+            count = len(series.days) if n is None else min(n, len(series.days))
+            if count <= 0:
+                return [], np.empty(0, dtype=np.float64)
+            return series.days[-count:], series.prices()[-count:]
+
+    def prices(self, ticker, n=None):
+        """The last n (default all) prices of a ticker as a float64 array view."""
+        return self.window(ticker, n)[1]
+
+    def tickers(self):
+        with self._lock:
+            return sorted(self._series)
+
+    def save(self, path=None):
+        """
+        Write every series to one columnar .npz (atomically replaced).
+        Returns True if it was written; a failure is logged, never raised.
+        """
+        path = path or self.path
+        with self._save_lock:
+            with self._lock:
+                tickers = sorted(self._series)
+                counts = np.array([len(self._series[t].days) for t in tickers], dtype=np.int64)
+                days = [day for t in tickers for day in self._series[t].days]
+                prices = np.concatenate([self._series[t].prices() for t in tickers]) if tickers else np.empty(0)
+                self._dirty = False
+            tmp_file = f"{path}.{os.getpid()}.tmp"
+            try:
+                with open(tmp_file, "wb") as f:
+                    np.savez(f, tickers=np.array(tickers, dtype=str), counts=counts,
+                             days=np.array(days, dtype=str), prices=prices)
+                os.replace(tmp_file, path)
+            except Exception as e:
+                print(f"[ERROR] Failed to save price history: {str(e)}")
+                with self._lock:
+                    self._dirty = True
+                    self.save_errors += 1
+                try:
+                    os.remove(tmp_file)
+                except OSError:
+                    pass
+                return False
+            with self._lock:
+                self.saves += 1
+            return True
+
+    def flush(self):
+        """Save if anything was merged since the last save."""
+        if self.path and self._dirty:
+            self.save()
+
+    def _flush_loop(self):
+        while not self._closed.wait(self.flush_interval):
+            self.flush()
+
+    def close(self):
+        """Stop the background flush and save what it has not."""
+        self._closed.set()
+        if self._flusher is not None:
+            self._flusher.join()
+        self.flush()
+
+    def _load(self, path):
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                tickers, counts = data["tickers"].tolist(), data["counts"]
+                days, prices = data["days"].tolist(), data["prices"]
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError, KeyError) as e:
+            print(f"[WARNING] Ignoring unreadable price history {path}: {str(e)}")
+            return
+        offsets = np.concatenate(([0], np.cumsum(counts)))
+        for i, ticker in enumerate(tickers):
+            lo, hi = offsets[i], offsets[i + 1]
+            self._series[ticker] = _Series(self.max_points, days[lo:hi], prices[lo:hi])
+
+    def stats(self):
+        with self._lock:
+            return {
+                "tickers": len(self._series),
+                "points": sum(len(series.days) for series in self._series.values()),
+                "max_points_per_ticker": self.max_points,
+                "merges": self.merges,
+                "saves": self.saves,
+                "save_errors": self.save_errors,
+            }
+
+
+_timeseries = None
+_timeseries_lock = threading.Lock()
+
+def get_timeseries():
+    """Return the process-wide price history, loaded from TIMESERIES_FILE on first use."""
+    global _timeseries
+    if _timeseries is None:
+        with _timeseries_lock:
+            if _timeseries is None:
+                _timeseries = TimeSeriesStore()
+                atexit.register(_timeseries.close)
+    return _timeseries
@@ -1,72 +1,421 @@
-﻿def validate_tick_payload(data):
+﻿import re
+from collections import namedtuple
+from datetime import datetime
+from itertools import repeat
+from math import isfinite
+from operator import contains, itemgetter
+
+from strategies import strategy_names
+
+LOG_ACTIONS = ("TICK_UPDATE", "BUY", "SELL", "STAY")
+
+# Zero-padded only: the stores compare dates as strings, so "2025-1-5" would sort wrong
+_DATE = re.compile(r"\d{4}-\d{2}-\d{2}", re.ASCII)
+
+# Declarative schema of a tick payload. Each section is a top-level list of
+# objects; "keys" are the accepted spellings in order of preference. Field
+# types: "number" (converted with float, which must give a finite value) and
+# "string" ("non_empty" also rejects ""); every ticker is a required non-empty
+# string.
+# The schema is compiled once at import into one validator per section
+# (_SECTIONS); it is not read again per payload.
+# "messages" keeps the wording /tick used for a section's errors before the
+# schema existed (see TickErrors), by kind of error or, for a string field, by
+# field name; an error without one uses the detailed text.
+TICK_SCHEMA = {
+    "Positions": {
+        "keys": ("Positions", "positions"),
+        "required": True,
+        "non_empty": True,
+        "fields": {
+            "ticker": {"type": "string", "required": True, "non_empty": True},
+            "quantity": {"type": "number", "required": True},
+            "purchase_price": {"type": "number", "required": True, "keys": ("purchaseprice", "purchase_price")},
+        },
+        "messages": {
+            "list": "Positions must be a list",
+            "non_empty": "Positions must be a non-empty list",
+            "item": "Each position must be an object",
+            "missing": "Position missing required fields (ticker, quantity, purchaseprice)",
+            "number": "Position quantity and purchaseprice must be numeric",
+            "ticker": "Position ticker must be a non-empty string",
+        },
+    },
+    "MarketSummary": {
+        "keys": ("MarketSummary", "Market_Summary", "marketSummary"),
+        "required": True,
+        "non_empty": True,
+        "fields": {
+            "ticker": {"type": "string", "required": True, "non_empty": True},
+            "current_price": {"type": "number", "required": True, "keys": ("currentprice", "current_price")},
+            "category": {"type": "string", "required": False},
+        },
+        "messages": {
+            "list": "Market Summary must be a list",
+            "non_empty": "Market Summary must be a non-empty list",
+            "item": "Each market summary entry must be an object",
+            "missing": "Market summary missing required fields (ticker, currentprice)",
+            "number": "Market summary currentprice must be numeric",
+            "ticker": "Market summary ticker must be a non-empty string",
+        },
+    },
+    "market_history": {
+        "keys": ("market_history",),
+        "required": False,
+        "non_empty": False,
+        "fields": {
+            "ticker": {"type": "string", "required": True, "non_empty": True},
+            "price": {"type": "number", "required": True},
+            "day": {"type": "string", "required": False, "keys": ("day", "Day")},
+        },
+    },
+}
+
+# Normalized tick payload. Position fields are parallel lists in payload order;
+# the market fields hold one row per ticker (a later duplicate wins) and
+# market_index maps a ticker to its row. The history fields are market_history
+# as parallel lists in payload order (history_day is None for a row without one).
+Tick = namedtuple("Tick", [
+    "tickers",
+    "quantity",
+    "purchase_price",
+    "market_tickers",
+    "current_price",
+    "category",
+    "market_index",
+    "history_tickers",
+    "history_price",
+    "history_day",
+])
+
+_MISSING = object()
+
+
+class TickErrors(list):
     """
-    Validates the tick payload structure and required fields.
-    Returns (True, None) if valid, otherwise (False, error_message).
+    Every problem found in a tick payload, in order, each naming where it is
+    (e.g. "Positions[3].quantity must be numeric"). `message` is the first
+    problem in the wording /tick has always used (e.g. "Position quantity and
+    purchaseprice must be numeric"), which existing clients may match on; a
+    400 sends it as "message" and the whole list as "errors".
     """
-    if not isinstance(data, dict):
-        return False, "Payload must be a JSON object"
-    
-    # Check Positions key, allow both "Positions" and "positions"
-    if "Positions" in data:
-        positions = data.get("Positions")
-    elif "positions" in data:
-        positions = data.get("positions")
+
+    def __init__(self, errors=(), message=None):
+        super().__init__(errors)
+        self.message = message if message is not None else (self[0] if self else None)
+
+    def add(self, error, message=None):
+        if not self:
+            self.message = message or error
+        self.append(error)
+
+
+def _compile_column(field, rule):
+    """
+    Builds the fast path for one field: a function from a section's items to
+    the field's converted column (list of values), or None at the first
+    problem of any kind, without working out what it was. The key lookups,
+    converter and checks are fixed here, once, from the field's rule.
+    """
+    keys = rule.get("keys", (field,))
+    required = rule["required"]
+    non_empty = rule.get("non_empty", False)
+    # (getter, spellings preferred over it) per accepted spelling
+    spellings = [(itemgetter(key), keys[:i]) for i, key in enumerate(keys)]
+
+    def lookup(item):
+        for key in keys:
+            if key in item:
+                return item[key]
+        return _MISSING
+
+    def gather(items, convert=None):
+        """The field's values, converted if convert is given, or None when a required one is missing."""
+        # Usually every item spells the field the same way: one C-level pass per spelling tried
+        for get, preferred in spellings:
+            try:
+                values = list(map(convert, map(get, items))) if convert else list(map(get, items))
+            except KeyError:
+                continue
+            # A later spelling only counts when no item uses a preferred one
+            for key in preferred:
+                if any(map(contains, items, repeat(key))):
+                    break
+            else:
+                return values
+            break
+        values = list(map(lookup, items))
+        if _MISSING in values:
+            if required:
+                return None
+            values = [None if value is _MISSING else value for value in values]
+        return list(map(convert, values)) if convert else values
+
+    if rule["type"] == "number":
+        def column(items):
+            try:
+                if not required:
+                    values = gather(items)
+                    if None in values:
+                        values = [None if value is None else float(value) for value in values]
+                        return values if all(value is None or isfinite(value) for value in values) else None
+                    values = list(map(float, values))
+                else:
+                    values = gather(items, float)
+                    if values is None:
+                        return None
+            except (TypeError, ValueError, OverflowError):
+                # An item that is not an object, or a value float() refuses
+                return None
+            # A finite sum means finite values; only an infinite or NaN one needs the full check
+            if not isfinite(sum(values)) and not all(map(isfinite, values)):
+                return None
+            return values
+    elif rule["type"] == "string":
+        def column(items):
+            try:
+                values = gather(items)
+            except TypeError:
+                return None
+            if values is None:
+                return None
+            try:
+                "".join(values)
+            except TypeError:
+                # Something other than a string; only None, for an optional field, may pass
+                if required or non_empty or not all(type(value) is str for value in values if value is not None):
+                    return None
+            if non_empty and not all(values):
+                return None
+            return values
     else:
-        return False, "Missing required field: Positions"
+        raise ValueError(f"Unknown field type in TICK_SCHEMA: {rule['type']}")
+    return column
+
+
+def _section_errors(section, spec, items, errors):
+    """
+    Adds every problem in a section's items to errors, item by item; within an
+    item missing fields are reported before bad values, as before.
+    """
+    messages = spec.get("messages", {})
+    fields = spec["fields"].items()
+    for i, item in enumerate(items):
+        if not isinstance(item, dict):
+            errors.add(f"{section}[{i}] must be an object", messages.get("item"))
+            continue
+
+        values = []
+        for field, rule in fields:
+            value = next((item[key] for key in rule.get("keys", (field,)) if key in item), _MISSING)
+            if value is _MISSING and rule["required"]:
+                errors.add(f"{section}[{i}] missing required field: {field}", messages.get("missing"))
+            values.append(value)
+
+        for (field, rule), value in zip(fields, values):
+            if value is _MISSING or (value is None and not rule["required"]):
+                continue
+            if rule["type"] == "number":
+                try:
+                    number = float(value)
+                except (ValueError, TypeError, OverflowError):
+                    errors.add(f"{section}[{i}].{field} must be numeric", messages.get("number"))
+                else:
+                    if not isfinite(number):
+                        errors.add(f"{section}[{i}].{field} must be a finite number", messages.get("number"))
+            elif rule["type"] == "string":
+                if rule.get("non_empty") and (not isinstance(value, str) or not value):
+                    errors.add(f"{section}[{i}].{field} must be a non-empty string", messages.get(field))
+                elif not isinstance(value, str):
+                    errors.add(f"{section}[{i}].{field} must be a string", messages.get(field))
+
+
+def _compile_section(section, spec):
+    """
+    Builds the validator of one section: a function that checks the
+    section's items and converts their fields into columns ({field: list of
+    values}), or returns None, with every problem added to errors, when the
+    section is invalid.
+    """
+    messages = spec.get("messages", {})
+    non_empty = spec["non_empty"]
+    columns = [(field, _compile_column(field, rule)) for field, rule in spec["fields"].items()]
+
+    def validate(items, errors):
+        if not isinstance(items, list):
+            errors.add(f"{section} must be a list", messages.get("list"))
+            return None
+        if non_empty and not items:
+            errors.add(f"{section} must be a non-empty list", messages.get("non_empty"))
+            return None
+        if not items:
+            return {field: [] for field, _ in columns}
+        converted = {}
+        for field, column in columns:
+            values = column(items)
+            if values is None:
+                # Slow path, only for an invalid section: find and report every problem
+                _section_errors(section, spec, items, errors)
+                return None
+            converted[field] = values
+        return converted
+    return validate
+
+
+# TICK_SCHEMA compiled once at import: (section, accepted keys, required, field names, validator)
+_SECTIONS = [
+    (section, spec["keys"], spec["required"], list(spec["fields"]), _compile_section(section, spec))
+    for section, spec in TICK_SCHEMA.items()
+]
+
+
+def _validate_tick(data):
+    """
+    Checks a payload against the compiled TICK_SCHEMA. Returns (columns,
+    errors): columns maps each section to its converted fields (None for a
+    section with errors; empty lists for a missing optional one) and errors
+    is a TickErrors, empty when the payload is valid.
+    """
+    errors = TickErrors()
+    if not isinstance(data, dict):
+        errors.add("Payload must be a JSON object")
+        return None, errors
+
+    # Missing sections first, as the hand-written checks reported them
+    sections = []
+    for section, keys, required, fields, validate in _SECTIONS:
+        items = next((data[key] for key in keys if key in data), _MISSING)
+        if items is _MISSING and required:
+            errors.add(f"Missing required field: {section}")
+        sections.append(items)
+
+    columns = {}
+    for (section, keys, required, fields, validate), items in zip(_SECTIONS, sections):
+        if items is _MISSING:
+            columns[section] = None if required else {field: [] for field in fields}
+        else:
+            columns[section] = validate(items, errors)
+    return columns, errors
+
+
+def normalize_tick_payload(data):
+    """
+    Validates a tick payload against TICK_SCHEMA and converts it in the same
+    pass into a Tick, so the key variants are resolved and every number is
+    parsed exactly once.
+    Returns (tick, []) if valid, otherwise (None, TickErrors of every error found).
+    """
+    columns, errors = _validate_tick(data)
+    if errors:
+        return None, errors
     
-    # Check Market Summary key, allow multiple variants
-    if "MarketSummary" in data:
-        market_summary = data.get("MarketSummary")
-    elif "Market_Summary" in data:
-        market_summary = data.get("Market_Summary")
-    elif "marketSummary" in data:
-        market_summary = data.get("marketSummary")
-    else:
-        return False, "Missing required field: MarketSummary"
+    positions = columns["Positions"]
+    market = columns["MarketSummary"]
+    history = columns["market_history"]
     
-    # Validate Positions
-    if not isinstance(positions, list):
-        return False, "Positions must be a list"
-    if len(positions) == 0:
-        return False, "Positions must be a non-empty list"
+    # Market rows are keyed by ticker; a later duplicate overrides an earlier one
+    market_tickers, current_price, category, market_index = [], [], [], {}
+    for ticker, price, price_category in zip(market["ticker"], market["current_price"], market["category"]):
+        row = market_index.get(ticker)
+        if row is None:
+            market_index[ticker] = len(market_tickers)
+            market_tickers.append(ticker)
+            current_price.append(price)
+            category.append(price_category)
+        else:
+            current_price[row] = price
+            category[row] = price_category
     
-    for pos in positions:
-        if not isinstance(pos, dict):
-            return False, "Each position must be an object"
-        
-        # Accept 'ticker', 'quantity', 'purchaseprice' or 'purchase_price'
-        if "ticker" not in pos or "quantity" not in pos or not ("purchaseprice" in pos or "purchase_price" in pos):
-            return False, "Position missing required fields (ticker, quantity, purchaseprice)"
-        
-        try:
-            float(pos["quantity"])
-            if "purchaseprice" in pos:
-                float(pos["purchaseprice"])
-            else:
-                float(pos["purchase_price"])
-        except (ValueError, TypeError):
-            return False, "Position quantity and purchaseprice must be numeric"
+    return Tick(
+        tickers=positions["ticker"],
+        quantity=positions["quantity"],
+        purchase_price=positions["purchase_price"],
+        market_tickers=market_tickers,
+        current_price=current_price,
+        category=category,
+        market_index=market_index,
+        history_tickers=history["ticker"],
+        history_price=history["price"],
+        history_day=history["day"],
+    ), []
+
+
+def validate_tick_payload(data):
+    """
+    Validates the tick payload structure and required fields.
+    Returns (True, None) if valid, otherwise (False, error_message) with the
+    first error found, in the original wording.
+    """
+    tick, errors = normalize_tick_payload(data)
+    return tick is not None, errors.message if errors else None
+
+
+def normalize_tick_batch(data, max_items):
+    """
+    Validates a /ticks body: a non-empty array of at most max_items
+    {"id": <tick id>, "payload": <tick payload>} objects. Each payload is
+    normalized on its own, so a bad item only fails itself.
+    Returns (items, None) with items a list of (tick_id, tick, errors) in
+    request order (tick is None when errors is not empty), otherwise
+    (None, error_message) when the batch as a whole is malformed.
+    """
+    if not isinstance(data, list):
+        return None, "Batch must be a JSON array of {id, payload} objects"
+    if len(data) == 0:
+        return None, "Batch must be a non-empty array"
+    if len(data) > max_items:
+        return None, f"Batch has {len(data)} ticks; at most {max_items} are allowed"
     
-    # Validate Market Summary
-    if not isinstance(market_summary, list):
-        return False, "Market Summary must be a list"
-    if len(market_summary) == 0:
-        return False, "Market Summary must be a non-empty list"
+    return [normalize_tick_item(item, f"[{i}]") for i, item in enumerate(data)], None
+
+
+def normalize_tick_item(item, label):
+    """
+    Validates one {"id", "payload"} item of a batch or stream; label names
+    it in error messages. Returns (tick_id, tick, errors) like
+    normalize_tick_batch, errors being a TickErrors (tick_id is None when
+    the item has no usable id).
+    """
+    if not isinstance(item, dict):
+        return None, None, TickErrors([f"{label} must be an object"])
+    tick_id = item.get("id")
+    if not isinstance(tick_id, str) or not tick_id:
+        return None, None, TickErrors([f"{label}.id must be a non-empty string"])
+    if "payload" not in item:
+        return tick_id, None, TickErrors([f"{label} missing required field: payload"])
+    tick, errors = normalize_tick_payload(item["payload"])
+    return tick_id, tick, errors
+
+
+def validate_trading_log_query(action, start_date, end_date):
+    """
+    Validates trading log query filters (ticker needs no validation).
+    Returns (True, None) if valid, otherwise (False, error_message).
+    """
+    if action is not None and action not in LOG_ACTIONS:
+        return False, f"action must be one of {', '.join(LOG_ACTIONS)}"
     
-    for summary in market_summary:
-        if not isinstance(summary, dict):
-            return False, "Each market summary entry must be an object"
-        
-        # Accept 'ticker' and either 'currentprice' or 'current_price'
-        if "ticker" not in summary or not ("currentprice" in summary or "current_price" in summary):
-            return False, "Market summary missing required fields (ticker, currentprice)"
-        
+    for name, value in (("start_date", start_date), ("end_date", end_date)):
+        if value is None:
+            continue
         try:
-            if "currentprice" in summary:
-                float(summary["currentprice"])
-            else:
-                float(summary["current_price"])
-        except (ValueError, TypeError):
-            return False, "Market summary currentprice must be numeric"
+            if not _DATE.fullmatch(value):
+                raise ValueError(value)
+            datetime.strptime(value, "%Y-%m-%d")
+        except ValueError:
+            return False, f"{name} must be a date in YYYY-MM-DD format"
+    
+    if start_date and end_date and start_date > end_date:
+        return False, "start_date must not be after end_date"
     
     return True, None
+
+
+def validate_strategy(name):
+    """
+    Validates a ?strategy= override; None means the deployment default.
+    Returns (True, None) if valid, otherwise (False, error_message).
+    """
+    if name is not None and name not in strategy_names():
+        return False, f"strategy must be one of {', '.join(strategy_names())}"
+    return True, None
@@ -0,0 +1,251 @@
+"""
+Vectorized portfolio valuation.
+
+Positions and the market summary are loaded into NumPy arrays once and joined
+on ticker through a precomputed ticker -> price-row index. Per-position and
+total unrealized P&L, market value, cost basis and weights then come out of a
+handful of array operations instead of a Python loop per position.
+
+The array pass has a fixed cost of a few microseconds per NumPy call, so it
+only pays off on large books. value_tick values books of up to
+LOOP_MAX_POSITIONS positions (a typical tick) with a plain loop instead;
+benchmarks.py valuation shows the crossover.
+
+value_tick is the production path: it starts from a tick that
+validators.normalize_tick_payload has already parsed. value_portfolio, which
+starts from raw position and market dicts, spends most of its time building
+lists and arrays from those dicts and is slower than a plain loop over the
+same dicts at every book size (about 0.2x at 10 positions, 0.8x at 100k). It is kept
+only as a convenience wrapper for tests and one-off scripts; hot paths should
+go through normalize_tick_payload + value_tick.
+"""
+import math
+from collections import namedtuple
+from itertools import chain
+
+import numpy as np
+
+
+# Below this many positions value_tick's plain loop beats the array pass
+LOOP_MAX_POSITIONS = 50
+
+Valuation = namedtuple("Valuation", [
+    "tickers",             # list of position tickers, in payload order
+    "priced",              # bool mask: position has a market price and a purchase price
+    "quantity",
+    "purchase_price",
+    "current_price",       # NaN where not priced
+    "market_value",        # quantity * current_price (0 where not priced)
+    "cost_basis",          # quantity * purchase_price
+    "unrealized_pnl",      # (current - purchase) * quantity (0 where not priced)
+    "weights",             # share of total market value
+    "total_market_value",
+    "total_unrealized_pnl",
+    "positions_evaluated",
+])
+
+
+def price_index(market_summary):
+    """
+    Builds the ticker -> row index and price array for a market summary.
+    Later duplicates of a ticker win, matching the dict the loop used to build.
+    Part of the dict path (see value_portfolio); normalized ticks carry their
+    own market index.
+    """
+    index = {}
+    prices = []
+    for item in market_summary:
+        ticker = item.get("ticker")
+        current_price = item.get("currentprice", item.get("current_price"))
+        if ticker and current_price is not None:
+            if ticker in index:
+                prices[index[ticker]] = float(current_price)
+            else:
+                index[ticker] = len(prices)
+                prices.append(float(current_price))
+    return index, np.asarray(prices, dtype=np.float64)
+
+
+def position_arrays(positions):
+    """
+    Loads positions into (tickers, quantity, purchase_price) arrays. A missing
+    purchase price becomes NaN so the position is reported as not priced.
+    """
+    tickers = [position.get("ticker") for position in positions]
+    quantity = np.array([float(position.get("quantity", 0)) for position in positions], dtype=np.float64)
+    costs = [position.get("purchaseprice", position.get("purchase_price")) for position in positions]
+    purchase_price = np.array([np.nan if cost is None else float(cost) for cost in costs], dtype=np.float64)
+    return tickers, quantity, purchase_price
+
+
+def join_rows(tickers, index):
+    """Price-array row of each position's ticker, or -1 when the market has no price for it."""
+    return np.fromiter((index.get(ticker, -1) for ticker in tickers), dtype=np.intp, count=len(tickers))
+
+
+def value_arrays(tickers, rows, quantity, purchase_price, prices):
+    """
+    Values already-loaded position arrays in one vectorized pass. `rows` comes
+    from join_rows(), so a book can be revalued against new prices for the same
+    tickers without repeating the join.
+    """
+    count = len(tickers)
+    has_cost = ~np.isnan(purchase_price)
+    priced = (rows >= 0) & has_cost
+
+    # rows of -1 pick an arbitrary price here; the priced mask discards them below
+    looked_up = prices[rows] if len(prices) else np.zeros(count)
+    current_price = np.where(priced, looked_up, np.nan)
+    cost_basis = quantity * np.where(has_cost, purchase_price, 0.0)
+    market_value = np.where(priced, quantity * looked_up, 0.0)
+    unrealized_pnl = np.where(priced, (looked_up - purchase_price) * quantity, 0.0)
+
+    total_market_value = float(market_value.sum())
+    weights = market_value / total_market_value if total_market_value else np.zeros(count)
+
+    return Valuation(
+        tickers=tickers,
+        priced=priced,
+        quantity=quantity,
+        purchase_price=purchase_price,
+        current_price=current_price,
+        market_value=market_value,
+        cost_basis=cost_basis,
+        unrealized_pnl=unrealized_pnl,
+        weights=weights,
+        total_market_value=total_market_value,
+        total_unrealized_pnl=float(unrealized_pnl.sum()),
+        positions_evaluated=int(priced.sum()),
+    )
+
+
+def value_portfolio(positions, market_summary):
+    """
+    Values a list of position dicts against a market summary list.
+
+    Convenience wrapper only: loading the dicts into arrays costs more than
+    the array pass saves, so this is slower than a plain loop over the dicts.
+    Callers that value ticks should use normalize_tick_payload + value_tick.
+
+    Returns:
+        Valuation namedtuple of per-position arrays and portfolio totals
+    """
+    index, prices = price_index(market_summary)
+    tickers, quantity, purchase_price = position_arrays(positions)
+    return value_arrays(tickers, join_rows(tickers, index), quantity, purchase_price, prices)
+
+
+def loop_value(tickers, quantity, purchase_price, index, prices):
+    """
+    Same Valuation as value_arrays, from plain lists with one Python loop:
+    faster than the array pass for small books.
+    """
+    current_price, market_value, cost_basis, unrealized_pnl, priced = [], [], [], [], []
+    for ticker, position_quantity, cost in zip(tickers, quantity, purchase_price):
+        row = index.get(ticker)
+        has_cost = cost == cost  # not NaN
+        cost_basis.append(position_quantity * cost if has_cost else 0.0)
+        if row is None or not has_cost:
+            current_price.append(math.nan)
+            market_value.append(0.0)
+            unrealized_pnl.append(0.0)
+            priced.append(False)
+        else:
+            price = prices[row]
+            current_price.append(price)
+            market_value.append(position_quantity * price)
+            unrealized_pnl.append((price - cost) * position_quantity)
+            priced.append(True)
+
+    total_market_value = sum(market_value)
+    return Valuation(
+        tickers=tickers,
+        priced=np.array(priced, dtype=bool),
+        quantity=np.array(quantity, dtype=np.float64),
+        purchase_price=np.array(purchase_price, dtype=np.float64),
+        current_price=np.array(current_price, dtype=np.float64),
+        market_value=np.array(market_value, dtype=np.float64),
+        cost_basis=np.array(cost_basis, dtype=np.float64),
+        unrealized_pnl=np.array(unrealized_pnl, dtype=np.float64),
+        weights=np.array([value / total_market_value for value in market_value] if total_market_value
+                         else [0.0] * len(market_value), dtype=np.float64),
+        total_market_value=total_market_value,
+        total_unrealized_pnl=sum(unrealized_pnl),
+        positions_evaluated=sum(priced),
+    )
+
+
+def value_tick(tick):
+    """
+    Values a normalized tick (validators.Tick). Its numbers are already parsed
+    and its market index already built, so only the array pass remains (a
+    plain loop for books of up to LOOP_MAX_POSITIONS positions).
+    """
+    if len(tick.tickers) <= LOOP_MAX_POSITIONS:
+        return loop_value(tick.tickers, tick.quantity, tick.purchase_price, tick.market_index, tick.current_price)
+    prices = np.array(tick.current_price, dtype=np.float64)
+    quantity = np.array(tick.quantity, dtype=np.float64)
+    purchase_price = np.array(tick.purchase_price, dtype=np.float64)
+    rows = join_rows(tick.tickers, tick.market_index)
+    return value_arrays(tick.tickers, rows, quantity, purchase_price, prices)
+
+
+def value_ticks(ticks):
+    """
+    Values many normalized ticks in one vectorized pass. Every tick's positions
+    and prices are concatenated, each tick's join rows are offset into the
+    combined price array, and per-tick totals come from np.bincount over a
+    segment id per position.
+
+    Returns:
+        List of Valuation, one per tick, in order
+    """
+    if not ticks:
+        return []
+    counts = np.array([len(tick.tickers) for tick in ticks], dtype=np.intp)
+    segment = np.repeat(np.arange(len(ticks)), counts)
+
+    row_parts = []
+    price_offset = 0
+    for tick in ticks:
+        rows = join_rows(tick.tickers, tick.market_index)
+        row_parts.append(np.where(rows >= 0, rows + price_offset, -1))
+        price_offset += len(tick.market_tickers)
+
+    tickers = list(chain.from_iterable(tick.tickers for tick in ticks))
+    combined = value_arrays(
+        tickers,
+        np.concatenate(row_parts),
+        np.fromiter(chain.from_iterable(tick.quantity for tick in ticks), dtype=np.float64, count=len(tickers)),
+        np.fromiter(chain.from_iterable(tick.purchase_price for tick in ticks), dtype=np.float64, count=len(tickers)),
+        np.fromiter(chain.from_iterable(tick.current_price for tick in ticks), dtype=np.float64, count=price_offset),
+    )
+
+    total_market_value = np.bincount(segment, weights=combined.market_value, minlength=len(ticks))
+    total_unrealized_pnl = np.bincount(segment, weights=combined.unrealized_pnl, minlength=len(ticks))
+    positions_evaluated = np.bincount(segment, weights=combined.priced, minlength=len(ticks))
+    # Weights are shares of each tick's own market value
+    segment_total = total_market_value[segment]
+    weights = np.divide(combined.market_value, segment_total,
+                        out=np.zeros(len(tickers)), where=segment_total != 0)
+
+    valuations = []
+    start = 0
+    for i, count in enumerate(counts.tolist()):
+        part = slice(start, start + count)
+        valuations.append(Valuation(
+            tickers=tickers[part],
+            priced=combined.priced[part],
+            quantity=combined.quantity[part],
+            purchase_price=combined.purchase_price[part],
+            current_price=combined.current_price[part],
+            market_value=combined.market_value[part],
+            cost_basis=combined.cost_basis[part],
+            unrealized_pnl=combined.unrealized_pnl[part],
+            weights=weights[part],
+            total_market_value=float(total_market_value[i]),
+            total_unrealized_pnl=float(total_unrealized_pnl[i]),
+            positions_evaluated=int(positions_evaluated[i]),
+        ))
+        start += count
+    return valuations